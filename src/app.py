@@ -0,0 +1,415 @@
+# src/app.py
+# Servidor Flask usado pela interface (index.html / script.js).
+# Carrega o classificador e o detector uma única vez, agrupa as requisições de imagem
+# concorrentes em micro-lotes e processa os vídeos em um pool de workers.
+# Uso: python src/app.py
+
+import base64
+import os
+import queue
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+
+import inference_backend
+import predict_video
+import startup_profile
+from face_localization import DetectionFrontend, FaceLocalizer, MultiFaceLocalizer, main_face_box
+from prediction_cache import PredictionCache, content_hash, file_content_hash
+
+# --- CONFIGURAÇÕES ---
+MODEL_PATH = predict_video.MODEL_PATH
+UPLOAD_FOLDER = 'uploads'
+MAX_BATCH_SIZE = 16       # Máximo de imagens classificadas juntas
+MAX_BATCH_WAIT_MS = 10    # Tempo máximo que a primeira imagem do lote espera por companhia
+VIDEO_WORKERS = 2
+MAX_STORED_JOBS = 500     # Resultados de vídeo mantidos para consulta em /results
+LATENCY_WINDOW = 1000     # Quantidade de requisições recentes usadas para p50/p99
+IMAGE_XAI = True          # Gera o Grad-CAM do rosto na resposta de /predict
+VIDEO_XAI = True          # Gera o Grad-CAM dos frames mais suspeitos (predict_video.XAI_TOP_K) dos vídeos
+USE_PREDICTION_CACHE = True
+# --------------------
+
+
+class MicroBatcher:
+    """Junta rostos enviados por threads diferentes e os classifica em um único lote.
+
+    O primeiro item de um lote espera no máximo `max_wait_seconds` por outros itens.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_seconds=MAX_BATCH_WAIT_MS / 1000):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, face):
+        future = Future()
+        self._queue.put((face, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                predictions = self.predict_batch([face for face, _ in batch])
+                for (_, future), prediction in zip(batch, predictions):
+                    future.set_result(float(prediction))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+class LatencyTracker:
+    """Guarda as latências mais recentes de cada endpoint e calcula percentis."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self._window)).append(seconds)
+
+    def report(self):
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        return {
+            name: {
+                'count': len(values),
+                'p50_ms': float(np.percentile(values, 50) * 1000),
+                'p99_ms': float(np.percentile(values, 99) * 1000),
+            }
+            for name, values in samples.items() if values
+        }
+
+
+class JobStore:
+    """Estado dos trabalhos de vídeo consultado por /results/<job_id>.
+
+    Acima de `max_jobs`, os trabalhos terminados mais antigos são descartados; os que ainda
+    estão na fila ou rodando nunca são, para que o cliente que consulta não receba 404.
+    """
+
+    FINISHED = ('complete', 'error')
+
+    def __init__(self, max_jobs=MAX_STORED_JOBS):
+        self._jobs = OrderedDict()
+        self._max_jobs = max_jobs
+        self._lock = threading.Lock()
+
+    def create(self):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {'status': 'pending', 'result': None}
+            self._evict()
+        return job_id
+
+    def _evict(self):
+        excess = len(self._jobs) - self._max_jobs
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in self.FINISHED]
+        for job_id in finished[:excess]:  # Ordem de criação: os mais antigos primeiro
+            del self._jobs[job_id]
+
+    def update(self, job_id, status, result=None):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id] = {'status': status, 'result': result}
+                if status in self.FINISHED:
+                    self._evict()  # Pode haver excesso acumulado enquanto todos rodavam
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def count(self, status):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] == status)
+
+
+def encode_jpeg_b64(image_bgr):
+    ok, buffer = cv2.imencode('.jpg', image_bgr)
+    return base64.b64encode(buffer).decode('ascii') if ok else None
+
+
+def format_confidence(value):
+    return f"{value:.1%}"
+
+
+def create_mtcnn():
+    """Detector padrão. O MTCNN (e o TensorFlow) só são importados quando o serviço é criado."""
+    return startup_profile.timed_import('mtcnn').MTCNN()
+
+
+def log_xai_failure(what):
+    """O Grad-CAM é opcional na resposta, mas a falha não pode passar em silêncio."""
+    print(f"[AVISO] Grad-CAM {what} falhou; a resposta segue sem ele.")
+    traceback.print_exc()
+
+
+class DetectionService:
+    """Modelos carregados uma vez e compartilhados pelas requisições."""
+
+    def __init__(self, classifier_model, detector_factory=create_mtcnn, model_name=None, cache=None):
+        self.classifier_model = classifier_model
+        self.cache = cache
+        self.detector_factory = detector_factory
+        self.model_name = model_name or os.path.basename(predict_video.inference_model_path())
+        self.frontend = DetectionFrontend(detector_factory())
+        self._detect_lock = threading.Lock()
+        self._video_local = threading.local()
+        self.batcher = MicroBatcher(lambda faces: predict_video.classify_faces(self.classifier_model, faces))
+        self.video_pool = ThreadPoolExecutor(max_workers=VIDEO_WORKERS, thread_name_prefix='video')
+        self.jobs = JobStore()
+        self.latency = LatencyTracker()
+
+    def warm_up(self):
+        """Executa uma inferência de cada modelo para compilar os grafos antes da primeira requisição."""
+        blank = np.zeros((predict_video.IMG_HEIGHT, predict_video.IMG_WIDTH, 3), dtype=np.float32)
+        predict_video.classify_faces(self.classifier_model, [blank])
+        self.frontend.detect(np.zeros((160, 160, 3), dtype=np.uint8))
+
+    def predict_image_bytes(self, data):
+        """Classifica a imagem enviada, consultando o cache antes de decodificá-la."""
+        kind = 'image:xai' if IMAGE_XAI else 'image'
+        media_hash = content_hash(data) if self.cache is not None else None
+        if self.cache is not None:
+            cached = self.cache.get(kind, media_hash)
+            if cached is not None:
+                return cached
+        image_bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image_bgr is None:
+            raise ValueError("Arquivo de imagem inválido.")
+        result = self.predict_image(image_bgr)
+        if result is not None and self.cache is not None:
+            self.cache.put(kind, media_hash, result)
+        return result
+
+    def predict_image(self, image_bgr):
+        with self._detect_lock:
+            box = main_face_box(self.frontend.detect(image_bgr))
+        if box is None:
+            return None
+        face = predict_video.prepare_face(image_bgr, box)
+        prediction = self.batcher.submit(face).result()
+        result = {
+            'verdict': 'REAL' if prediction > 0.5 else 'FAKE',
+            'confidence': format_confidence(prediction if prediction > 0.5 else 1 - prediction),
+            'real_score': prediction,
+        }
+        if IMAGE_XAI:
+            result.update(self._explain_face(image_bgr, box, face))
+        return result
+
+    def _explain_face(self, image_bgr, box, face):
+        xai_utils = startup_profile.timed_import('xai_utils')
+        try:
+            batch = predict_video.preprocess_faces([face])  # O preprocess_input da EfficientNet é a identidade
+            heatmap = xai_utils.generate_gradcam_heatmap(batch, inference_backend.keras_model_of(self.classifier_model))
+        except Exception:
+            log_xai_failure("da imagem")
+            return {}
+        x, y, w, h = box
+        face_bgr = image_bgr[y:y+h, x:x+w]
+        heatmap_colored = cv2.applyColorMap(np.uint8(255 * cv2.resize(heatmap, (w, h))), cv2.COLORMAP_JET)
+        return {
+            'original_face_b64': encode_jpeg_b64(face_bgr),
+            'heatmap_b64': encode_jpeg_b64(heatmap_colored),
+            'overlaid_b64': encode_jpeg_b64(xai_utils.overlay_heatmap_on_image(face_bgr, heatmap)),
+        }
+
+    def _video_localizer(self, multi_face=False):
+        # Um detector por thread do pool de vídeo, criado na primeira tarefa da thread e
+        # compartilhado pelos localizadores de rosto principal e de todos os rostos
+        name = 'multi_localizer' if multi_face else 'localizer'
+        localizer = getattr(self._video_local, name, None)
+        if localizer is None:
+            if getattr(self._video_local, 'detector', None) is None:
+                self._video_local.detector = self.detector_factory()
+            if multi_face:
+                localizer = MultiFaceLocalizer(self._video_local.detector, redetect_interval=predict_video.REDETECT_INTERVAL,
+                                               max_faces=predict_video.MAX_FACES_PER_FRAME)
+            else:
+                localizer = FaceLocalizer(self._video_local.detector, redetect_interval=predict_video.REDETECT_INTERVAL)
+            setattr(self._video_local, name, localizer)
+        localizer.reset()
+        return localizer
+
+    def video_stats(self, video_path):
+        """Votos do vídeo (mesmo formato de predict_video.main), consultando o cache antes."""
+        kind = predict_video.video_cache_kind()
+        media_hash = file_content_hash(video_path) if self.cache is not None else None
+        if self.cache is not None:
+            cached = self.cache.get(kind, media_hash)
+            if cached is not None:
+                return cached
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Não foi possível abrir o vídeo enviado.")
+        try:
+            if predict_video.FACE_MODE == 'all':
+                stats = predict_video.analyze_video_multi(cap, None, self._video_localizer(multi_face=True), self.classifier_model)
+            elif predict_video.SAMPLING_MODE == 'adaptive':
+                stats = predict_video.analyze_video_adaptive(cap, self._video_localizer(), self.classifier_model)
+            else:
+                stats = predict_video.analyze_video(cap, None, self._video_localizer(), self.classifier_model)
+        finally:
+            cap.release()
+        stats = predict_video.cacheable_stats(stats)  # O mesmo subconjunto do CLI, com ou sem cache
+        if self.cache is not None:
+            self.cache.put(kind, media_hash, stats)
+        return stats
+
+    def analyze_video_file(self, video_path):
+        stats = self.video_stats(video_path)
+        summary = predict_video.video_verdict(stats)
+        if summary is None:
+            raise ValueError("Nenhum rosto encontrado no vídeo.")
+        return {
+            'verdict': summary['verdict'],
+            'confidence': f"{summary['confidence_percent']:.1f}%",
+            'real_percent': summary['real_percent'],
+            'fake_percent': summary['fake_percent'],
+            'frames_analyzed': stats['faces_classified'],
+            'frames_decoded': stats.get('decode_cost', stats['frames']),  # Inclui os frames pulados com grab()
+            'identities': summary.get('identities', []),
+            'xai_frames': self._explain_video(video_path, stats.get('suspicious_frames')) if VIDEO_XAI else [],
+        }
+
+    def _explain_video(self, video_path, suspicious_frames):
+        try:
+            explanations = predict_video.explain_suspicious_frames(video_path, self.classifier_model, suspicious_frames)
+        except Exception:
+            log_xai_failure("do vídeo")
+            return []
+        return [{
+            'frame': explanation['frame'],
+            'real_score': explanation['real_score'],
+            'original_b64': encode_jpeg_b64(explanation['face']),
+            'xai_b64': encode_jpeg_b64(explanation['overlay']),
+        } for explanation in explanations]
+
+    def submit_video(self, video_path):
+        job_id = self.jobs.create()
+
+        def run():
+            self.jobs.update(job_id, 'processing')
+            start = time.perf_counter()
+            try:
+                self.jobs.update(job_id, 'complete', self.analyze_video_file(video_path))
+            except Exception as e:
+                self.jobs.update(job_id, 'error', {'error': str(e)})
+            finally:
+                self.latency.record('video_job', time.perf_counter() - start)
+                if os.path.exists(video_path):
+                    os.remove(video_path)
+
+        self.video_pool.submit(run)
+        return job_id
+
+    def status(self):
+        backend = inference_backend.as_backend(self.classifier_model)
+        if backend.name == 'keras':
+            trainable = f"{int(sum(np.prod(w.shape) for w in backend.keras_model.trainable_weights)):,}"
+        else:
+            trainable = "n/d"  # O modelo exportado não guarda a marcação de pesos treináveis
+        return {
+            'model_name': self.model_name,
+            'inference_backend': backend.name,
+            'trainable_parameters': trainable,
+            'image_queue_depth': self.batcher.queue_depth,
+            'video_jobs_pending': self.jobs.count('pending'),
+            'video_jobs_processing': self.jobs.count('processing'),
+            'latency': self.latency.report(),
+            'cache': self.cache.stats() if self.cache is not None else None,
+        }
+
+
+def create_app(service=None):
+    """Cria o app Flask. Sem `service`, carrega o backend de predict_video.INFERENCE_BACKEND e o MTCNN e aquece os dois."""
+    if service is None:
+        cache = PredictionCache(predict_video.inference_model_path()) if USE_PREDICTION_CACHE else None
+        service = DetectionService(predict_video.load_inference_backend(), cache=cache)
+        service.warm_up()
+
+    app = Flask(__name__)
+    CORS(app)
+    app.config['service'] = service
+
+    @app.route('/status', methods=['GET'])
+    def status():
+        return jsonify(service.status())
+
+    @app.route('/predict', methods=['POST'])
+    def predict():
+        start = time.perf_counter()
+        uploaded = request.files.get('file')
+        if uploaded is None:
+            return jsonify({'error': 'Nenhum arquivo enviado.'}), 400
+        try:
+            result = service.predict_image_bytes(uploaded.read())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        service.latency.record('predict', time.perf_counter() - start)
+        if result is None:
+            return jsonify({'error': 'Nenhum rosto encontrado na imagem.'}), 422
+        return jsonify(result)
+
+    @app.route('/predict_video', methods=['POST'])
+    def predict_video_route():
+        uploaded = request.files.get('file')
+        if uploaded is None:
+            return jsonify({'error': 'Nenhum arquivo enviado.'}), 400
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        suffix = os.path.splitext(uploaded.filename or '')[1] or '.mp4'
+        fd, video_path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_FOLDER)
+        with os.fdopen(fd, 'wb') as f:
+            uploaded.save(f)
+        return jsonify({'job_id': service.submit_video(video_path)}), 202
+
+    @app.route('/results/<job_id>', methods=['GET'])
+    def results(job_id):
+        job = service.jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Trabalho não encontrado.'}), 404
+        return jsonify(job)
+
+    return app
+
+
+if __name__ == '__main__':
+    if not os.path.exists(MODEL_PATH):
+        print(f"Erro: Modelo não encontrado em {MODEL_PATH}. Treine o modelo primeiro.")
+    elif not os.path.exists(predict_video.inference_model_path()):
+        print(f"Erro: Modelo exportado não encontrado em {predict_video.inference_model_path()}. Rode src/export_model.py primeiro.")
+    else:
+        print("--- Carregando e aquecendo os modelos... ---")
+        create_app().run(host='127.0.0.1', port=5000, threaded=True)
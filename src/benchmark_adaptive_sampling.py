@@ -0,0 +1,86 @@
+# src/benchmark_adaptive_sampling.py
+# Quanto a amostragem adaptativa (parada antecipada) economiza em relação ao modo fixo.
+#  1) Simulação da regra de parada: votos FAKE aleatórios com várias frações verdadeiras;
+#     mede os votos usados e a concordância com o veredito da varredura completa.
+#  2) Vídeo sintético longo: custo de decodificação (frames entregues + pulados com grab),
+#     seeks, rostos classificados e tempo nos dois modos.
+# Uso: python src/benchmark_adaptive_sampling.py [--seconds 60] [--trials 200]
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import predict_video
+from face_localization import FaceLocalizer
+from frame_sampling import coarse_to_fine_passes
+from synthetic_media import ColorKeyDetector, build_standin_classifier, write_synthetic_video
+
+
+def simulate(fake_ratio, total_frames, trials, rng):
+    """Aplica a regra de parada a votos simulados. Retorna (votos médios usados, concordância)."""
+    threshold = predict_video.FAKE_THRESHOLD_PERCENT / 100
+    planned = [idx for frame_indices in coarse_to_fine_passes(
+        total_frames, predict_video.FRAME_INTERVAL, predict_video.ADAPTIVE_INITIAL_STRIDE) for idx in frame_indices]
+    used, agree = [], 0
+    for _ in range(trials):
+        votes = rng.random(total_frames) < fake_ratio  # True = voto FAKE
+        full_verdict = votes[planned].mean() > threshold
+        fake, total = 0, 0
+        for start in range(0, len(planned), predict_video.BATCH_SIZE):
+            batch = votes[planned[start:start + predict_video.BATCH_SIZE]]
+            fake, total = fake + int(batch.sum()), total + len(batch)
+            lower, upper = predict_video.wilson_interval(fake, total)
+            if total >= predict_video.ADAPTIVE_MIN_VOTES and (lower > threshold or upper < threshold):
+                break
+        used.append(total)
+        agree += (fake / total > threshold) == full_verdict
+    return float(np.mean(used)), agree / trials, len(planned)
+
+
+def run_video(video_path, adaptive, classifier_model):
+    localizer = FaceLocalizer(ColorKeyDetector(), redetect_interval=predict_video.REDETECT_INTERVAL)
+    cap = cv2.VideoCapture(video_path)
+    start = time.perf_counter()
+    if adaptive:
+        stats = predict_video.analyze_video_adaptive(cap, localizer, classifier_model)
+    else:
+        stats = predict_video.analyze_video(cap, None, localizer, classifier_model)
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return stats.get('decode_cost', stats['frames']), stats.get('seeks', 0), stats['faces_classified'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Amostragem fixa vs adaptativa na análise de vídeo.")
+    parser.add_argument('--seconds', type=int, default=60, help="Duração do vídeo sintético (30 fps)")
+    parser.add_argument('--trials', type=int, default=200)
+    args = parser.parse_args()
+    total_frames = args.seconds * 30
+
+    rng = np.random.default_rng(0)
+    print(f"\nSimulação ({total_frames} frames, limiar {predict_video.FAKE_THRESHOLD_PERCENT}%, "
+          f"z={predict_video.ADAPTIVE_CONFIDENCE_Z}):")
+    print(f"{'fração FAKE':>12} {'votos usados':>13} {'do total':>9} {'concordância':>13}")
+    for fake_ratio in (0.05, 0.2, 0.3, 0.36, 0.44, 0.5, 0.7, 0.95):
+        used, agreement, planned = simulate(fake_ratio, total_frames, args.trials, rng)
+        print(f"{fake_ratio:>12.0%} {used:>13.1f} {used / planned:>9.1%} {agreement:>13.1%}")
+
+    classifier_model = build_standin_classifier()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = write_synthetic_video(os.path.join(tmp_dir, 'long.mp4'), num_frames=total_frames)
+        run_video(video_path, True, classifier_model)  # Aquecimento (traçado do tf.function)
+        results = {name: run_video(video_path, name == 'adaptativo', classifier_model) for name in ('fixo', 'adaptativo')}
+
+    print(f"\nVídeo sintético ({total_frames} frames, classificador aleatório: veredito sem ambiguidade):")
+    print(f"{'modo':<12} {'custo decod.':>13} {'seeks':>6} {'classificados':>14} {'tempo (s)':>10}")
+    for name, (decode_cost, seeks, classified, elapsed) in results.items():
+        print(f"{name:<12} {decode_cost:>13} {seeks:>6} {classified:>14} {elapsed:>10.2f}")
+    print("Custo de decodificação = frames entregues + frames pulados com grab() (que também passam pelo decodificador).")
+
+
+if __name__ == '__main__':
+    main()
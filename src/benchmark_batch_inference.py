@@ -0,0 +1,72 @@
+# src/benchmark_batch_inference.py
+# Compara frames/seg de predict_video.analyze_video com lote 1 vs lotes maiores.
+# Uso: python src/benchmark_batch_inference.py [--mtcnn] [--frames N] [--batch-sizes 1,8,16,32]
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import tensorflow as tf
+
+import predict_video
+from face_localization import FaceLocalizer
+from synthetic_media import ColorKeyDetector, build_standin_classifier, write_synthetic_video
+
+
+def run_once(video_path, face_detector, classifier_model, batch_size, frame_interval):
+    face_localizer = FaceLocalizer(face_detector, redetect_interval=1)
+    cap = cv2.VideoCapture(video_path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        out = cv2.VideoWriter(os.path.join(tmp_dir, 'out.mp4'), cv2.VideoWriter_fourcc(*'mp4v'), 30, (width, height))
+        start = time.perf_counter()
+        stats = predict_video.analyze_video(
+            cap, out, face_localizer, classifier_model,
+            batch_size=batch_size, frame_interval=frame_interval
+        )
+        elapsed = time.perf_counter() - start
+        out.release()
+    cap.release()
+    return stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inferência em lote do predict_video.")
+    parser.add_argument('--frames', type=int, default=240)
+    parser.add_argument('--frame-interval', type=int, default=1)
+    parser.add_argument('--batch-sizes', default='1,4,8,16,32')
+    parser.add_argument('--mtcnn', action='store_true', help="Usa o MTCNN real em vez do detector sintético.")
+    args = parser.parse_args()
+
+    if os.path.exists(predict_video.MODEL_PATH):
+        classifier_model = tf.keras.models.load_model(predict_video.MODEL_PATH)
+        print(f"Modelo: {predict_video.MODEL_PATH}")
+    else:
+        classifier_model = build_standin_classifier(predict_video.IMG_HEIGHT, predict_video.IMG_WIDTH)
+        print("Modelo real não encontrado. Usando EfficientNetB0 aleatório como substituto.")
+
+    if args.mtcnn:
+        import mtcnn
+        face_detector = mtcnn.MTCNN()
+    else:
+        face_detector = ColorKeyDetector()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = write_synthetic_video(os.path.join(tmp_dir, 'clip.mp4'), num_frames=args.frames)
+        # Aquecimento: compila a função de predição antes de medir
+        run_once(video_path, face_detector, classifier_model, 1, args.frames)
+
+        print(f"\n{'lote':>6} {'frames/s':>10} {'rostos':>8} {'tempo (s)':>10}")
+        baseline_fps = None
+        for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+            stats, elapsed = run_once(video_path, face_detector, classifier_model, batch_size, args.frame_interval)
+            fps = stats['frames'] / elapsed
+            baseline_fps = baseline_fps or fps
+            print(f"{batch_size:>6} {fps:>10.1f} {stats['faces_classified']:>8} {elapsed:>10.2f}  ({fps / baseline_fps:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
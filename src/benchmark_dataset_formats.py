@@ -0,0 +1,76 @@
+# src/benchmark_dataset_formats.py
+# Compara o layout em pastas de JPEGs com os shards .npy: tempo de construção do dataset,
+# espaço em disco e tempo de leitura de uma época pelo pipeline tf.data.
+# Uso: python src/benchmark_dataset_formats.py [--images-per-class 1000]
+
+import argparse
+import os
+import tempfile
+import time
+
+import input_pipeline
+import prepare_final_dataset
+import shard_dataset
+from synthetic_media import build_synthetic_face_tree
+
+
+def disk_usage(folder):
+    """Bytes ocupados em disco (blocos alocados) por todos os arquivos da pasta."""
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            total += os.stat(os.path.join(root, name)).st_blocks * 512
+    return total
+
+
+def epoch_seconds(dataset):
+    start = time.perf_counter()
+    for _ in dataset:
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pastas de JPEGs vs shards .npy.")
+    parser.add_argument('--images-per-class', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_train, _ = build_synthetic_face_tree(os.path.join(tmp_dir, 'source'), args.images_per_class)
+        real_files = prepare_final_dataset.collect_files([os.path.join(source_train, 'real')])
+        fake_files = prepare_final_dataset.collect_files([os.path.join(source_train, 'fake')])
+        datasets = prepare_final_dataset.balance_and_split_data(real_files, fake_files)
+
+        prepare_final_dataset.TRAIN_FOLDER = os.path.join(tmp_dir, 'folders', 'train')
+        prepare_final_dataset.VALIDATION_FOLDER = os.path.join(tmp_dir, 'folders', 'validation')
+        start = time.perf_counter()
+        prepare_final_dataset.copy_files(datasets)
+        folders_build = time.perf_counter() - start
+
+        shards_train = os.path.join(tmp_dir, 'shards', 'train')
+        shards_validation = os.path.join(tmp_dir, 'shards', 'validation')
+        start = time.perf_counter()
+        shard_dataset.write_dataset_shards(datasets, shards_train, shards_validation)
+        shards_build = time.perf_counter() - start
+
+        folders_disk = disk_usage(os.path.join(tmp_dir, 'folders'))
+        shards_disk = disk_usage(os.path.join(tmp_dir, 'shards'))
+
+        folders_data, count, _ = input_pipeline.build_dataset(
+            prepare_final_dataset.TRAIN_FOLDER, training=False, batch_size=args.batch_size
+        )
+        shards_data, _, _ = input_pipeline.build_shard_dataset(shards_train, training=False, batch_size=args.batch_size)
+        epoch_seconds(shards_data.take(1))  # Aquecimento do tf.data
+        folders_epoch = epoch_seconds(folders_data)
+        shards_epoch = epoch_seconds(shards_data)
+
+    print(f"\nImagens de treino: {count}")
+    print(f"{'layout':<16} {'construção (s)':>15} {'disco (MB)':>11} {'época (s)':>10} {'imagens/s':>10}")
+    print(f"{'pastas de JPEG':<16} {folders_build:>15.2f} {folders_disk / 1e6:>11.1f} {folders_epoch:>10.2f} {count / folders_epoch:>10.1f}")
+    print(f"{'shards .npy':<16} {shards_build:>15.2f} {shards_disk / 1e6:>11.1f} {shards_epoch:>10.2f} {count / shards_epoch:>10.1f}")
+    print("Obs.: a construção em shards inclui decodificar e redimensionar cada imagem uma única vez.")
+
+
+if __name__ == '__main__':
+    main()
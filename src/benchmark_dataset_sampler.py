@@ -0,0 +1,96 @@
+# src/benchmark_dataset_sampler.py
+# Compara a montagem antiga do dataset final (glob + listas completas + shuffle + shutil.copy)
+# com a montagem em fluxo de dataset_sampler.py: tempo, memória de pico do Python (tracemalloc)
+# e estabilidade da amostra e da divisão quando a fonte cresce.
+# Uso: python src/benchmark_dataset_sampler.py [--fake-files 20000] [--real-ratio 5] [--folders 20]
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import dataset_sampler
+import prepare_final_dataset
+
+
+def build_tree(root, counts, folders, start=0, file_bytes=2048):
+    """Pastas aninhadas com arquivos .jpg pequenos (o conteúdo não é lido sem deduplicação)."""
+    payload = os.urandom(file_bytes)
+    sources = {}
+    for label, count in counts.items():
+        base = os.path.join(root, label)
+        sources[label] = [base]
+        for idx in range(start, start + count):
+            folder = os.path.join(base, f"video_{idx % folders:04d}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"{label}_{idx:08d}.jpg"), 'wb') as f:
+                f.write(payload)
+    return sources
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def legacy_build(sources, train_folder, validation_folder):
+    real_files = prepare_final_dataset.collect_files(sources['real'])
+    fake_files = prepare_final_dataset.collect_files(sources['fake'])
+    datasets = prepare_final_dataset.balance_and_split_data(real_files, fake_files)
+    prepare_final_dataset.TRAIN_FOLDER, prepare_final_dataset.VALIDATION_FOLDER = train_folder, validation_folder
+    prepare_final_dataset.copy_files(datasets)
+    return datasets
+
+
+def streaming_build(sources, train_folder, validation_folder):
+    datasets = dataset_sampler.split_by_hash(dataset_sampler.sample_classes(sources), prepare_final_dataset.SPLIT_RATIO)
+    dataset_sampler.materialize(datasets, train_folder, validation_folder)
+    return datasets
+
+
+def split_sets(datasets):
+    return {split: {path for splits in datasets.values() for path in splits[split]} for split in ('train', 'validation')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Montagem do dataset final: listas completas vs fluxo.")
+    parser.add_argument('--fake-files', type=int, default=20000)
+    parser.add_argument('--real-ratio', type=int, default=5, help="Arquivos reais por arquivo fake (a classe maior é descartada em parte)")
+    parser.add_argument('--folders', type=int, default=20, help="Subpastas por classe")
+    parser.add_argument('--growth', type=float, default=0.1, help="Fração de arquivos acrescentada para medir a estabilidade")
+    args = parser.parse_args()
+
+    counts = {'real': args.fake_files * args.real_ratio, 'fake': args.fake_files}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sources = build_tree(os.path.join(tmp_dir, 'source'), counts, args.folders)
+        rows = {}
+        for name, build in (('listas + cópia', legacy_build), ('fluxo + links', streaming_build)):
+            out = os.path.join(tmp_dir, name.split()[0])
+            rows[name] = measure(lambda: build(sources, os.path.join(out, 'train'), os.path.join(out, 'validation')))
+
+        # Estabilidade: a mesma fonte com mais arquivos
+        before = split_sets(rows['fluxo + links'][0])
+        build_tree(os.path.join(tmp_dir, 'source'), {label: int(count * args.growth) for label, count in counts.items()},
+                   args.folders, start=max(counts.values()))
+        after = split_sets(dataset_sampler.split_by_hash(dataset_sampler.sample_classes(sources),
+                                                         prepare_final_dataset.SPLIT_RATIO))
+
+    print(f"\n{counts['real']} arquivos reais e {counts['fake']} fakes em {args.folders} subpastas por classe")
+    print(f"{'montagem':<16} {'tempo (s)':>10} {'pico Python (MB)':>17}")
+    for name, (_, seconds, peak) in rows.items():
+        print(f"{name:<16} {seconds:>10.2f} {peak:>17.1f}")
+    moved = len(before['train'] & after['validation']) + len(before['validation'] & after['train'])
+    kept = len((before['train'] | before['validation']) & (after['train'] | after['validation']))
+    total = len(before['train']) + len(before['validation'])
+    print(f"\nCom {args.growth:.0%} de arquivos novos: {kept / total:.1%} da amostra anterior mantida, "
+          f"{moved} arquivos trocaram de divisão (a montagem antiga sorteia tudo de novo).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# src/benchmark_face_detectors.py
+# Compara a extração em massa do face_detector.py com cada backend de detecção
+# (detector_backends.py): o modo atual (MTCNN imagem a imagem, uma tarefa por imagem), o MTCNN
+# com o estágio 1 em lote e o YuNet. Mede recortes/s, memória de cada worker e a concordância
+# das caixas com o MTCNN imagem a imagem (IoU do rosto principal).
+# Uso: python src/benchmark_face_detectors.py [--images pasta] [--count 64] [--workers 2] [--backends mtcnn,mtcnn_batched,yunet]
+
+import argparse
+import os
+import tempfile
+import time
+from multiprocessing import cpu_count
+
+import cv2
+import numpy as np
+
+import face_detector
+from face_localization import box_iou
+from synthetic_media import synthetic_frame
+
+
+def process_memory_mb(pid, field):
+    """Campo de memória de /proc/<pid>/status (Linux), em MB: VmRSS = atual, VmHWM = pico."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def write_images(folder, count, seed=0):
+    """Grava `count` frames sintéticos (dois tamanhos, como num dataset misto) em JPEG."""
+    os.makedirs(folder, exist_ok=True)
+    for idx in range(count):
+        width, height = (640, 480) if idx % 4 else (960, 720)
+        cv2.imwrite(os.path.join(folder, f"{idx:05d}.jpg"), synthetic_frame(idx * 3, width, height, seed))
+    return folder
+
+
+def run_backend(backend, paths, output_dir, workers):
+    """Processa as imagens com `backend` num pool novo. Retorna ({caminho: caixa}, segundos, memória por worker)."""
+    face_detector.DETECTOR_BACKEND = backend
+    os.makedirs(output_dir, exist_ok=True)
+    if backend == 'mtcnn':
+        # Modo atual: uma tarefa por imagem, detect_faces imagem a imagem
+        tasks, worker_fn = [(path, output_dir) for path in paths], face_detector.process_single_image
+        chunksize = face_detector.CHUNK_SIZE
+    else:
+        files = [(path, os.path.getsize(path)) for path in paths]
+        tasks, worker_fn, chunksize = face_detector.batch_tasks([(output_dir, files)]), face_detector.process_image_batch, 1
+
+    boxes, memory = {}, {}
+    with face_detector.create_worker_pool(workers, initargs=(backend,)) as pool:
+        start = time.perf_counter()
+        for results in pool.imap_unordered(worker_fn, tasks, chunksize=chunksize):
+            for result in results if isinstance(results, list) else [results]:
+                boxes[result['path']] = result['box'] if result['status'] == face_detector.STATUS_SAVED else None
+                memory[result['worker'][0]] = None
+        seconds = time.perf_counter() - start
+        for pid in memory:
+            memory[pid] = (process_memory_mb(pid, 'VmRSS'), process_memory_mb(pid, 'VmHWM'))
+    return boxes, seconds, list(memory.values())
+
+
+def agreement(reference, boxes):
+    """(fração de imagens com o mesmo resultado rosto/sem rosto, IoU médio do rosto principal quando ambos acham)."""
+    same_presence = np.mean([(reference[p] is None) == (boxes.get(p) is None) for p in reference])
+    ious = [box_iou(reference[p], boxes[p]) for p in reference if reference[p] is not None and boxes.get(p) is not None]
+    return float(same_presence), (float(np.mean(ious)) if ious else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração em massa: recortes/s, memória por worker e concordância das caixas.")
+    parser.add_argument('--images', help="Pasta de imagens. Sem ela, frames sintéticos são gerados.")
+    parser.add_argument('--count', type=int, default=64, help="Imagens sintéticas geradas (sem --images)")
+    parser.add_argument('--workers', type=int, default=max(1, cpu_count() - 1))
+    parser.add_argument('--backends', default='mtcnn,mtcnn_batched,yunet')
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        folder = args.images or write_images(os.path.join(tmp_dir, 'in'), args.count)
+        paths = [path for path, _, _ in face_detector.list_images(folder)]
+        print(f"{len(paths)} imagens, {args.workers} workers ({face_detector.WORKER_START_METHOD}), "
+              f"lote de {face_detector.CHUNK_SIZE}")
+
+        results = {}
+        for backend in backends:
+            print(f"Medindo {backend}...")
+            try:
+                results[backend] = run_backend(backend, paths, os.path.join(tmp_dir, backend), args.workers)
+            except (ImportError, FileNotFoundError, ValueError) as e:
+                print(f"[AVISO] {backend} ignorado: {e}")
+
+    reference = results.get('mtcnn', (None,))[0]
+    print(f"\n{'backend':<14} {'tempo s':>8} {'imagens/s':>10} {'recortes':>9} {'recortes/s':>11} "
+          f"{'RSS/worker MB':>14} {'pico/worker MB':>15} {'mesmo resultado':>16} {'IoU médio':>10}")
+    for backend, (boxes, seconds, memory) in results.items():
+        crops = sum(box is not None for box in boxes.values())
+        rss = np.mean([m[0] for m in memory]) if memory else 0.0
+        peak = max((m[1] for m in memory), default=0.0)
+        line = (f"{backend:<14} {seconds:>8.2f} {len(boxes) / seconds:>10.1f} {crops:>9} {crops / seconds:>11.1f} "
+                f"{rss:>14.0f} {peak:>15.0f}")
+        if reference is not None:
+            same, iou = agreement(reference, boxes)
+            line += f" {same:>15.0%} {iou if iou is not None else float('nan'):>10.3f}"
+        print(line)
+    print("Concordância em relação ao MTCNN imagem a imagem; o tempo inclui o preparo dos workers; "
+          "RSS/pico medidos em cada worker ao fim do processamento.")
+
+
+if __name__ == '__main__':
+    main()
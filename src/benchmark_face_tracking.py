@@ -0,0 +1,78 @@
+# src/benchmark_face_tracking.py
+# Mede quantas chamadas ao detector o rastreamento economiza e quanto as caixas
+# rastreadas se afastam da detecção feita em todos os frames.
+# Uso: python src/benchmark_face_tracking.py [--video clip.mp4] [--mtcnn] [--intervals 2,5,10]
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from face_localization import FaceLocalizer, TRACKER_TYPE, create_tracker
+from synthetic_media import ColorKeyDetector, write_synthetic_video
+
+
+def box_iou(a, b):
+    ax2, ay2, bx2, by2 = a[0] + a[2], a[1] + a[3], b[0] + b[2], b[1] + b[3]
+    inter_w = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    inter_h = max(0, min(ay2, by2) - max(a[1], b[1]))
+    inter = inter_w * inter_h
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def center_distance(a, b):
+    return float(np.hypot((a[0] + a[2] / 2) - (b[0] + b[2] / 2), (a[1] + a[3] / 2) - (b[1] + b[3] / 2)))
+
+
+def collect_boxes(video_path, face_localizer):
+    cap = cv2.VideoCapture(video_path)
+    boxes = []
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        boxes.append(face_localizer.locate(frame))
+    cap.release()
+    return boxes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Economia e deriva do rastreamento de rostos.")
+    parser.add_argument('--video', help="Clipe de teste. Sem ele, um clipe sintético é gerado.")
+    parser.add_argument('--mtcnn', action='store_true', help="Usa o MTCNN real em vez do detector sintético.")
+    parser.add_argument('--intervals', default='2,5,10,20')
+    parser.add_argument('--tracker', default=TRACKER_TYPE)
+    args = parser.parse_args()
+
+    if args.mtcnn:
+        import mtcnn
+        face_detector = mtcnn.MTCNN()
+    else:
+        face_detector = ColorKeyDetector()
+    print(f"Rastreador: {type(create_tracker(args.tracker)).__name__}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = args.video or write_synthetic_video(os.path.join(tmp_dir, 'clip.mp4'), num_frames=150)
+        reference, reference_seconds = collect_boxes(video_path, FaceLocalizer(face_detector, redetect_interval=1))
+        print(f"Referência (detecção em todo frame): {len(reference)} frames em {reference_seconds:.2f}s")
+
+        print(f"\n{'intervalo':>9} {'detecções':>10} {'economia':>9} {'IoU médio':>10} {'deriva média':>13} {'deriva máx':>11} {'tempo':>7}")
+        for interval in [int(i) for i in args.intervals.split(',')]:
+            localizer = FaceLocalizer(face_detector, redetect_interval=interval, tracker_type=args.tracker)
+            boxes, seconds = collect_boxes(video_path, localizer)
+            pairs = [(a, b) for a, b in zip(reference, boxes) if a is not None and b is not None]
+            ious = [box_iou(a, b) for a, b in pairs]
+            drifts = [center_distance(a, b) for a, b in pairs]
+            calls = localizer.stats['detector_calls']
+            saved = 1 - calls / max(1, len(reference))
+            print(f"{interval:>9} {calls:>10} {saved:>8.0%} {np.mean(ious) if ious else 0:>10.3f} "
+                  f"{np.mean(drifts) if drifts else 0:>11.1f}px {max(drifts, default=0):>9.1f}px {seconds:>6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# src/benchmark_github_miner.py
+# Compara o download antigo do github_miner (requests.get sem sessão, uma imagem por vez, grava
+# no disco antes de verificar duplicatas) com o downloader concorrente, contra um servidor HTTP
+# local que imita as páginas de repositório e o raw.githubusercontent.com (com latência,
+# duplicatas e respostas 429 quando há conexões simultâneas demais).
+# Uso: python src/benchmark_github_miner.py [--repos 6] [--images-per-repo 20] [--latency-ms 30]
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin
+
+import cv2
+import requests
+
+import github_miner
+from hash_store import HashStore
+from synthetic_media import synthetic_frame
+
+
+class FakeGithub:
+    """Conteúdo e regras do servidor local: páginas de repositório e imagens "raw"."""
+
+    def __init__(self, repos, images_per_repo, duplicate_every, latency, max_concurrent):
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+        self.pages, self.images = {}, {}
+        for r in range(repos):
+            links = []
+            for i in range(images_per_repo):
+                # A cada `duplicate_every` imagens, repete a imagem anterior (publicada com outro nome)
+                source = r * images_per_repo + i - (i % duplicate_every == duplicate_every - 1)
+                ok, jpeg = cv2.imencode('.jpg', synthetic_frame(source, 320, 240, seed=source * 7919))
+                self.images[f"/owner/repo{r}/main/img_{r}_{i}.jpg"] = jpeg.tobytes()
+                links.append(f'<a class="Link--primary" href="/owner/repo{r}/blob/main/img_{r}_{i}.jpg">img</a>')
+            self.pages[f"/owner/repo{r}"] = f"<html><body>{''.join(links)}</body></html>".encode()
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.in_flight += 1
+                    busy = server.in_flight > server.max_concurrent
+                    if busy:
+                        server.rate_limited += 1
+                try:
+                    if busy:
+                        self.send_response(429)
+                        self.send_header('Retry-After', '0.2')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    time.sleep(server.latency)
+                    body = server.pages.get(self.path) or server.images.get(self.path)
+                    self.send_response(200 if body else 404)
+                    body = body or b''
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def legacy_mine(repo_urls, store, pause):
+    """Reprodução do fluxo antigo: download sequencial, grava, relê para o hash e apaga se repetido."""
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    new_count = 0
+    for repo_url in repo_urls:
+        page = requests.get(repo_url, headers=headers)
+        for raw_url in github_miner.find_image_urls(page.content):
+            img_path = os.path.join(github_miner.OUTPUT_FOLDER, os.path.basename(raw_url))
+            img_data = requests.get(raw_url, headers=headers).content
+            with open(img_path, 'wb') as f:
+                f.write(img_data)
+            with open(img_path, 'rb') as f:
+                hashes = github_miner.calculate_hashes(f.read())
+            if hashes:
+                if store.is_duplicate(*hashes):
+                    os.remove(img_path)
+                else:
+                    store.add(*hashes)
+                    new_count += 1
+        time.sleep(pause)
+    return new_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Downloader antigo vs concorrente do github_miner.")
+    parser.add_argument('--repos', type=int, default=6)
+    parser.add_argument('--images-per-repo', type=int, default=20)
+    parser.add_argument('--duplicate-every', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--max-concurrent', type=int, default=6, help="Conexões simultâneas antes de o servidor responder 429")
+    parser.add_argument('--legacy-pause', type=float, default=0.0, help="Pausa entre repositórios no fluxo antigo (era 2s)")
+    parser.add_argument('--workers', type=int, default=github_miner.DOWNLOAD_WORKERS)
+    parser.add_argument('--max-per-host', type=int, default=github_miner.MAX_PER_HOST,
+                        help="Acima de --max-concurrent, exercita o backoff com Retry-After")
+    args = parser.parse_args()
+
+    fake = FakeGithub(args.repos, args.images_per_repo, args.duplicate_every, args.latency_ms / 1000, args.max_concurrent)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), fake.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    github_miner.RAW_BASE_URL = base_url
+    repo_urls = [urljoin(base_url, path) for path in sorted(fake.pages)]
+
+    results = {}
+    try:
+        for name in ('antigo', 'concorrente'):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                github_miner.OUTPUT_FOLDER = os.path.join(tmp_dir, 'images')
+                os.makedirs(github_miner.OUTPUT_FOLDER)
+                store = HashStore(os.path.join(tmp_dir, 'hashes.sqlite'))
+                fake.rate_limited = 0
+                start = time.perf_counter()
+                if name == 'antigo':
+                    new_count = legacy_mine(repo_urls, store, args.legacy_pause)
+                else:
+                    new_count = github_miner.mine_repositories(
+                        repo_urls, store, workers=args.workers, max_per_host=args.max_per_host
+                    )
+                elapsed = time.perf_counter() - start
+                store.close()
+                results[name] = (elapsed, new_count, len(os.listdir(github_miner.OUTPUT_FOLDER)), fake.rate_limited)
+    finally:
+        server.shutdown()
+
+    total = args.repos * args.images_per_repo
+    print(f"\n{total} imagens em {args.repos} repositórios, latência {args.latency_ms:.0f} ms")
+    print(f"{'downloader':<12} {'tempo (s)':>10} {'imagens/s':>10} {'novas':>6} {'no disco':>9} {'429s':>5}")
+    for name, (elapsed, new_count, on_disk, limited) in results.items():
+        print(f"{name:<12} {elapsed:>10.2f} {total / elapsed:>10.1f} {new_count:>6} {on_disk:>9} {limited:>5}")
+
+
+if __name__ == '__main__':
+    main()
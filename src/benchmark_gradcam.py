@@ -0,0 +1,82 @@
+# src/benchmark_gradcam.py
+# Mapas de calor Grad-CAM por segundo: a função antiga (monta um tf.keras.Model novo a cada
+# chamada, uma imagem por vez) contra o GradCAMEngine (modelo de gradiente compilado uma vez),
+# imagem a imagem e em lotes. Também compara o overlay por imagem com a versão em lote.
+# Uso: python src/benchmark_gradcam.py [--images 32] [--batch-size 16] [--model modelo.keras]
+
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+
+import xai_utils
+from synthetic_media import build_standin_classifier
+
+
+def legacy_gradcam_heatmap(img_array_preprocessed, model, last_conv_layer_name='top_conv'):
+    """Implementação anterior de xai_utils.generate_gradcam_heatmap, mantida para comparação."""
+    grad_model = tf.keras.models.Model(
+        model.inputs, [model.get_layer(last_conv_layer_name).output, model.output]
+    )
+    with tf.GradientTape() as tape:
+        last_conv_layer_output, preds = grad_model(img_array_preprocessed)
+        class_output = preds[0]
+    grads = tape.gradient(class_output, last_conv_layer_output)
+    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
+    last_conv_layer_output = last_conv_layer_output[0]
+    heatmap = last_conv_layer_output @ pooled_grads[..., tf.newaxis]
+    heatmap = tf.squeeze(heatmap)
+    max_val = tf.math.reduce_max(heatmap)
+    if max_val > 0:
+        heatmap = tf.maximum(heatmap, 0) / max_val
+    return heatmap.numpy()
+
+
+def rate(fn, count):
+    fn()  # Aquecimento (compilação/traçado)
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do Grad-CAM por imagem vs em lote.")
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--model', default=None, help="Modelo .keras (padrão: EfficientNetB0 aleatório)")
+    parser.add_argument('--layer', default='top_conv')
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model) if args.model else build_standin_classifier()
+    height, width = model.inputs[0].shape[1:3]
+    images = np.random.default_rng(0).uniform(0, 255, (args.images, height, width, 3)).astype(np.float32)
+    engine = xai_utils.get_gradcam_engine(model, args.layer)
+
+    legacy_maps = []
+    legacy_rate = rate(lambda: legacy_maps.__setitem__(slice(None), [
+        legacy_gradcam_heatmap(images[i:i + 1], model, args.layer) for i in range(args.images)
+    ]), args.images)
+    single_rate = rate(lambda: [engine.heatmaps(images[i:i + 1]) for i in range(args.images)], args.images)
+    batched_maps = []
+    batched_rate = rate(lambda: batched_maps.__setitem__(slice(None), np.concatenate([
+        engine.heatmaps(images[i:i + args.batch_size]) for i in range(0, args.images, args.batch_size)
+    ])), args.images)
+    max_diff = float(np.max(np.abs(np.stack(legacy_maps) - batched_maps)))
+
+    faces = np.random.default_rng(1).integers(0, 256, (args.images, 160, 160, 3), dtype=np.uint8)
+    overlay_rate = rate(lambda: [xai_utils.overlay_heatmap_on_image(f, h) for f, h in zip(faces, legacy_maps)], args.images)
+    batch_overlay_rate = rate(lambda: xai_utils.overlay_heatmaps_on_images(faces, batched_maps), args.images)
+
+    print(f"\n{'Grad-CAM':<30} {'mapas/s':>10}")
+    print(f"{'função antiga (por chamada)':<30} {legacy_rate:>10.1f}")
+    print(f"{'engine, 1 imagem por vez':<30} {single_rate:>10.1f}  ({single_rate / legacy_rate:.1f}x)")
+    print(f"{f'engine, lotes de {args.batch_size}':<30} {batched_rate:>10.1f}  ({batched_rate / legacy_rate:.1f}x)")
+    print(f"Diferença máxima entre os mapas: {max_diff:.2e}")
+    print(f"\n{'overlay':<30} {'imagens/s':>10}")
+    print(f"{'por imagem':<30} {overlay_rate:>10.1f}")
+    print(f"{'em lote':<30} {batch_overlay_rate:>10.1f}  ({batch_overlay_rate / overlay_rate:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
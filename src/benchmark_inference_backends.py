@@ -0,0 +1,193 @@
+# src/benchmark_inference_backends.py
+# Compara os backends de inferência (inference_backend.py) com o modelo Keras float32:
+# tempo de carga, memória do processo, latência por lote, rostos/s e desvio das probabilidades
+# (diferença máxima/média e vereditos que mudam de lado em 0.5). Cada backend roda num processo
+# novo, para que a memória medida seja só a dele.
+# Uso: python src/benchmark_inference_backends.py [--model modelo.keras] [--images 64] [--threads 0]
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# --- CONFIGURAÇÕES ---
+BATCH_SIZES = (1, 16)
+REPEATS = 20  # Lotes medidos por tamanho (depois de um aquecimento)
+# --------------------
+
+
+def memory_mb(field):
+    """Campo de memória de /proc/self/status (Linux), em MB: VmRSS = atual, VmHWM = pico.
+
+    O ru_maxrss do getrusage não serve aqui: no Linux o processo filho herda o pico do pai.
+    """
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_backend(backend, keras_path, images_path, threads, queue):
+    """Executado num processo novo: carrega o backend, mede latência e devolve as probabilidades."""
+    import inference_backend
+    import tensorflow as tf
+
+    images = np.load(images_path)
+    batch = tf.keras.applications.efficientnet.preprocess_input(images.copy())
+    base_rss = memory_mb('VmRSS')
+    start = time.perf_counter()
+    instance = inference_backend.load_backend(backend, keras_path, intra_op_threads=threads, inter_op_threads=threads)
+    load_seconds = time.perf_counter() - start
+
+    latency = {}
+    for batch_size in BATCH_SIZES:
+        chunk = batch[:batch_size]
+        instance.predict(chunk)  # Aquecimento (traçado/alocação para este tamanho)
+        samples = []
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            instance.predict(chunk)
+            samples.append(time.perf_counter() - t0)
+        latency[batch_size] = float(np.median(samples))
+    scores = np.concatenate([instance.predict(batch[i:i + 16]) for i in range(0, len(batch), 16)])
+    queue.put({
+        'load_seconds': load_seconds,
+        'rss_mb': memory_mb('VmRSS') - base_rss,
+        'peak_rss_mb': memory_mb('VmHWM'),
+        'latency': latency,
+        'scores': scores,
+        'file_mb': os.path.getsize(instance.model_path) / 1e6 if os.path.isfile(instance.model_path) else None,
+    })
+
+
+def measure(backend, keras_path, images_path, threads):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=run_backend, args=(backend, keras_path, images_path, threads, queue))
+    process.start()
+    try:
+        return queue.get(timeout=1800)
+    finally:
+        process.join()
+
+
+def calibrate_standin(model, images, logit_std=2.0):
+    """Deixa o substituto aleatório com ativações e saídas parecidas com as de um modelo treinado.
+
+    Com pesos aleatórios e as estatísticas padrão do BatchNorm, as ativações encolhem camada a
+    camada (~1e-6 no fim) e qualquer arredondamento float16/int8 vira ruído puro. Uma passada em
+    modo de treino com momentum 0 copia as estatísticas do lote para o BatchNorm, e a camada final
+    é reescalada para que as probabilidades se espalhem entre 0 e 1.
+    """
+    import tensorflow as tf
+
+    batch = tf.keras.applications.efficientnet.preprocess_input(images[:16].copy())  # Lote pequeno: modo de treino usa muita memória
+    norms = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.BatchNormalization)]
+    momentums = [layer.momentum for layer in norms]
+    for layer in norms:
+        layer.momentum = 0.0
+    model(batch, training=True)
+    for layer, momentum in zip(norms, momentums):
+        layer.momentum = momentum
+
+    dense = model.layers[-1]
+    features = tf.keras.Model(model.input, dense.input)(batch)
+    kernel, bias = dense.get_weights()
+    logits = features.numpy() @ kernel + bias
+    scale = logit_std / max(float(logits.std()), 1e-12)
+    dense.set_weights([kernel * scale, -float(np.mean(logits)) * scale * np.ones_like(bias)])
+
+
+def benchmark_images(count, seed=0):
+    """Rostos sintéticos variados (RGB float32 224x224) para calibrar e medir."""
+    import cv2
+    from synthetic_media import synthetic_frame, face_box_for_frame
+
+    images = []
+    for idx in range(count):
+        frame = synthetic_frame(idx * 7, seed=seed)
+        x, y, w, h = face_box_for_frame(idx * 7, frame.shape[1], frame.shape[0])
+        face = cv2.cvtColor(frame[max(0, y):y + h, max(0, x):x + w], cv2.COLOR_BGR2RGB)
+        images.append(cv2.resize(face, (224, 224)).astype(np.float32))
+    return np.stack(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backends de inferência: latência, memória e desvio em relação ao Keras.")
+    parser.add_argument('--model', default=None, help="Modelo .keras (padrão: predict_video.MODEL_PATH ou EfficientNetB0 aleatório)")
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=0, help="Threads intra/inter-op de todos os backends (0 = padrão)")
+    parser.add_argument('--backends', default='keras,tflite_fp16,tflite_int8,onnx')
+    args = parser.parse_args()
+
+    import export_model
+    import inference_backend
+    import predict_video
+    import tensorflow as tf
+    from synthetic_media import build_standin_classifier
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        keras_path = args.model or predict_video.MODEL_PATH
+        if os.path.exists(keras_path):
+            print(f"Modelo: {keras_path}")
+            model = tf.keras.models.load_model(keras_path)
+        else:
+            print("Modelo real não encontrado. Usando EfficientNetB0 aleatório como substituto "
+                  "(BatchNorm e camada final calibrados nas imagens de calibração).")
+            model = build_standin_classifier()
+            keras_path = os.path.join(tmp_dir, 'standin.keras')  # Os exportados ficam ao lado, no diretório temporário
+
+        if os.path.isdir(export_model.CALIBRATION_DIR):
+            calibration = export_model.load_calibration_images()
+            images = export_model.load_calibration_images(count=args.images, seed=export_model.CALIBRATION_SEED + 1)
+        else:
+            calibration = benchmark_images(export_model.CALIBRATION_SAMPLES, seed=1)
+            images = benchmark_images(args.images)
+        if keras_path.startswith(tmp_dir):
+            calibrate_standin(model, calibration)
+            model.save(keras_path)
+        images_path = os.path.join(tmp_dir, 'images.npy')
+        np.save(images_path, images)
+
+        backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+        missing = [b for b in backends if b != 'keras'
+                   and not os.path.exists(inference_backend.exported_model_path(keras_path, b))]
+        if missing:
+            print(f"--- Exportando: {', '.join(missing)} ---")
+            export_model.export_model(model, keras_path, missing, calibration)
+        del model
+
+        results = {}
+        for backend in backends:
+            if backend != 'keras' and not os.path.exists(inference_backend.exported_model_path(keras_path, backend)):
+                continue
+            print(f"Medindo {backend}...")
+            results[backend] = measure(backend, keras_path, images_path, args.threads)
+
+    baseline = results.get('keras')
+    print(f"\n{len(images)} rostos, threads={args.threads or 'padrão'}")
+    header = f"{'backend':<12} {'arquivo MB':>10} {'carga s':>8} {'RSS MB':>8} {'pico MB':>8}"
+    header += ''.join(f" {f'lote {b} ms':>10}" for b in BATCH_SIZES)
+    header += f" {'rostos/s':>9} {'dif. máx':>9} {'dif. média':>10} {'vereditos':>10}"
+    print(header)
+    for backend, result in results.items():
+        largest = max(BATCH_SIZES)
+        line = (f"{backend:<12} {result['file_mb'] or 0:>10.1f} {result['load_seconds']:>8.3f} "
+                f"{result['rss_mb']:>8.0f} {result['peak_rss_mb']:>8.0f}")
+        line += ''.join(f" {result['latency'][b] * 1000:>10.1f}" for b in BATCH_SIZES)
+        line += f" {largest / result['latency'][largest]:>9.1f}"
+        if baseline is not None:
+            diff = np.abs(result['scores'] - baseline['scores'])
+            flips = int(np.sum((result['scores'] > 0.5) != (baseline['scores'] > 0.5)))
+            line += f" {diff.max():>9.2e} {diff.mean():>10.2e} {flips:>10}"
+        print(line)
+    print("RSS = memória residente acrescentada pela carga e inferência; vereditos = rostos que mudaram de lado em 0.5 "
+          "em relação ao Keras.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# src/benchmark_suite.py
+# Suíte de benchmarks reprodutível dos caminhos críticos, sobre mídia sintética determinística
+# (synthetic_media.py): detecção + classificação de uma imagem, frames/s do predict_video com
+# vários FRAME_INTERVAL, recortes/s da extração em massa e imagens/s do carregador do treino.
+# Os resultados vão para um JSON com as informações da máquina; com --baseline, cada métrica é
+# comparada com um resultado salvo e as regressões acima da tolerância são apontadas (código de saída 1).
+# Sem o modelo .keras real, usa o classificador substituto aleatório (mesma entrada/saída).
+# Cada caso exige rosto detectado em MIN_DETECTION_RATE das amostras antes de registrar os tempos.
+# Uso: python src/benchmark_suite.py [--cases image,video,extraction,loader] [--output resultado.json]
+#                                    [--baseline base.json] [--tolerance 0.10] [--detector mtcnn|colorkey]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import cpu_count
+
+import cv2
+import numpy as np
+
+import face_detector
+import predict_video
+from benchmark_face_detectors import run_backend, write_images
+from face_localization import DetectionFrontend, FaceLocalizer, main_face_box
+from synthetic_media import (ColorKeyDetector, build_standin_classifier, build_synthetic_face_tree,
+                             synthetic_frame, write_synthetic_video)
+
+# --- CONFIGURAÇÕES ---
+CASES = ('extraction', 'image', 'video', 'loader')  # A extração roda antes: o pool usa fork e o TF não pode ter rodado
+RESULTS_PATH = 'benchmark_results.json'
+REGRESSION_TOLERANCE = 0.10   # Piora relativa aceita antes de apontar uma regressão
+REPEATS = 3                   # Repetições de cada medição; o resultado é a mediana
+MIN_DETECTION_RATE = 0.9      # Fração mínima de imagens/frames com rosto; abaixo disso a medição é descartada
+IMAGE_COUNT = 20              # Imagens do caso 'image' (uma detecção + uma classificação cada)
+VIDEO_FRAMES = 90
+VIDEO_FRAME_INTERVALS = (1, 3, 6)
+EXTRACTION_IMAGES = 32
+EXTRACTION_WORKERS = max(1, cpu_count() - 1)
+LOADER_IMAGES_PER_CLASS = 64
+LOADER_BATCH_SIZE = 32
+LOADER_BATCHES = 8
+SEED = 0
+# --------------------
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def hardware_info():
+    """Máquina e versões das bibliotecas que influenciam os números."""
+    import tensorflow as tf
+
+    memory_gb = None
+    if hasattr(os, 'sysconf') and 'SC_PHYS_PAGES' in os.sysconf_names:
+        memory_gb = round(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3, 1)
+    cpu_model = platform.processor()
+    if os.path.exists('/proc/cpuinfo'):
+        with open('/proc/cpuinfo') as f:
+            cpu_model = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')), cpu_model)
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_model': cpu_model,
+        'cpu_count': cpu_count(),
+        'memory_gb': memory_gb,
+        'gpus': len(tf.config.list_physical_devices('GPU')),
+        'python': platform.python_version(),
+        'tensorflow': tf.__version__,
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def metric(value, unit, higher_is_better=True):
+    return {'value': round(float(value), 3), 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def median_of(repeats, fn):
+    """Mediana de `fn()` (um número) em `repeats` execuções."""
+    return statistics.median(fn() for _ in range(repeats))
+
+
+def check_detection_rate(case, found, total, min_rate=MIN_DETECTION_RATE):
+    """Falha se o detector achou rosto em poucas amostras: o tempo mediria o caminho sem rosto,
+    e uma queda na detecção apareceria como ganho de velocidade."""
+    rate = found / total if total else 0.0
+    if rate < min_rate:
+        raise RuntimeError(f"{case}: rosto detectado em {found} de {total} amostras ({rate:.0%}); "
+                           f"o mínimo para medir é {min_rate:.0%}.")
+    return rate
+
+
+def load_model():
+    """(modelo, descrição): o classificador real se existir, senão o substituto aleatório."""
+    if os.path.exists(predict_video.MODEL_PATH):
+        return predict_video.load_classifier(predict_video.MODEL_PATH), predict_video.MODEL_PATH
+    print("Modelo real não encontrado. Usando EfficientNetB0 aleatório como substituto.")
+    return build_standin_classifier(predict_video.IMG_HEIGHT, predict_video.IMG_WIDTH, seed=SEED), 'standin'
+
+
+def create_detector(name):
+    if name == 'colorkey':
+        return ColorKeyDetector()
+    import mtcnn
+    return mtcnn.MTCNN()
+
+
+def bench_extraction(tmp_dir, repeats):
+    """Recortes/s do face_detector.py (pool de workers, DETECTOR_BACKEND atual)."""
+    folder = write_images(os.path.join(tmp_dir, 'extraction_in'), EXTRACTION_IMAGES, seed=SEED)
+    paths = [path for path, _, _ in face_detector.list_images(folder)]
+    crop_rates, image_rates, detection_rates = [], [], []
+    for idx in range(repeats):
+        boxes, seconds, _ = run_backend(face_detector.DETECTOR_BACKEND, paths,
+                                        os.path.join(tmp_dir, f'extraction_out_{idx}'), EXTRACTION_WORKERS)
+        crops = sum(box is not None for box in boxes.values())
+        detection_rates.append(check_detection_rate('extraction', crops, len(paths)))
+        crop_rates.append(crops / seconds)
+        image_rates.append(len(boxes) / seconds)
+    return {'extraction.crops_per_s': metric(statistics.median(crop_rates), 'recortes/s'),
+            'extraction.images_per_s': metric(statistics.median(image_rates), 'imagens/s'),
+            'extraction.detection_rate': metric(min(detection_rates), 'fração')}
+
+
+def bench_image(model, detector, repeats):
+    """Uma imagem por vez: detecção do rosto principal + classificação (o caminho do /predict)."""
+    frontend = DetectionFrontend(detector)
+    images = [synthetic_frame(idx * 7, 640, 480, SEED) for idx in range(IMAGE_COUNT)]
+    predict_video.classify_faces(model, [np.zeros((predict_video.IMG_HEIGHT, predict_video.IMG_WIDTH, 3), np.float32)])
+    frontend.detect(images[0])  # Aquecimento dos dois modelos
+
+    latencies, found = [], 0
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            box = main_face_box(frontend.detect(image))
+            if box is not None:
+                predict_video.classify_faces(model, [predict_video.prepare_face(image, box)])
+            latencies.append(time.perf_counter() - start)
+            found += box is not None
+    detection_rate = check_detection_rate('image', found, len(latencies))
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'image.detection_rate': metric(detection_rate, 'fração'),
+        'image.latency_p50_ms': metric(np.percentile(latencies_ms, 50), 'ms', higher_is_better=False),
+        'image.latency_p95_ms': metric(np.percentile(latencies_ms, 95), 'ms', higher_is_better=False),
+        'image.images_per_s': metric(len(latencies) / latencies_ms.sum() * 1000, 'imagens/s'),
+    }
+
+
+def bench_video(model, detector, tmp_dir, repeats):
+    """Frames do vídeo percorridos por segundo no predict_video.analyze_video, por FRAME_INTERVAL."""
+    video_path = write_synthetic_video(os.path.join(tmp_dir, 'clip.mp4'), num_frames=VIDEO_FRAMES, seed=SEED)
+
+    def run(frame_interval):
+        cap = cv2.VideoCapture(video_path)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        out = cv2.VideoWriter(os.path.join(tmp_dir, 'out.mp4'), cv2.VideoWriter_fourcc(*'mp4v'), 30, (width, height))
+        localizer = FaceLocalizer(detector, redetect_interval=predict_video.REDETECT_INTERVAL)
+        start = time.perf_counter()
+        stats = predict_video.analyze_video(cap, out, localizer, model, frame_interval=frame_interval, top_k=0)
+        elapsed = time.perf_counter() - start
+        out.release()
+        cap.release()
+        check_detection_rate(f'video (intervalo {frame_interval})', stats['faces_classified'],
+                             len(range(0, VIDEO_FRAMES, frame_interval)))
+        return VIDEO_FRAMES / elapsed
+
+    run(VIDEO_FRAMES)  # Aquecimento (traçado do grafo do lote)
+    return {f'video.interval_{interval}.frames_per_s': metric(median_of(repeats, lambda: run(interval)), 'frames/s')
+            for interval in VIDEO_FRAME_INTERVALS}
+
+
+def bench_loader(tmp_dir, repeats):
+    """Imagens/s do carregador tf.data do treino (com aumento de dados) numa árvore sintética."""
+    import input_pipeline
+    from benchmark_input_pipeline import measure
+
+    train_dir, _ = build_synthetic_face_tree(os.path.join(tmp_dir, 'loader'), LOADER_IMAGES_PER_CLASS, seed=SEED)
+    dataset, _, _ = input_pipeline.build_dataset(train_dir, training=True, batch_size=LOADER_BATCH_SIZE, seed=SEED)
+    return {'loader.images_per_s': metric(
+        median_of(repeats, lambda: measure(iter(dataset.repeat()), LOADER_BATCHES, LOADER_BATCH_SIZE)), 'imagens/s')}
+
+
+def run_suite(cases, detector_name, repeats):
+    """Executa os casos pedidos. Retorna o documento de resultados (pronto para JSON)."""
+    results, model, model_name = {}, None, None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for case in [case for case in CASES if case in cases]:
+            print(f"Medindo {case}...")
+            start = time.perf_counter()
+            if case == 'extraction':
+                results.update(bench_extraction(tmp_dir, repeats))
+            elif case == 'loader':
+                results.update(bench_loader(tmp_dir, repeats))
+            else:
+                if model is None:
+                    model, model_name = load_model()
+                    detector = create_detector(detector_name)
+                if case == 'image':
+                    results.update(bench_image(model, detector, repeats))
+                else:
+                    results.update(bench_video(model, detector, tmp_dir, repeats))
+            print(f"  {case}: {time.perf_counter() - start:.1f}s")
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'hardware': hardware_info(),
+        'config': {
+            'model': model_name, 'detector': detector_name, 'extraction_backend': face_detector.DETECTOR_BACKEND,
+            'repeats': repeats, 'seed': SEED, 'image_count': IMAGE_COUNT, 'video_frames': VIDEO_FRAMES,
+            'extraction_images': EXTRACTION_IMAGES, 'extraction_workers': EXTRACTION_WORKERS,
+            'loader_batch_size': LOADER_BATCH_SIZE, 'loader_batches': LOADER_BATCHES,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Linhas (métrica, base, atual, variação relativa, regressão?) das métricas presentes nos dois."""
+    rows = []
+    for name, entry in current['results'].items():
+        if name not in baseline.get('results', {}):
+            continue
+        old, new = baseline['results'][name]['value'], entry['value']
+        change = (new - old) / old if old else 0.0
+        worse = -change if entry['higher_is_better'] else change  # Positivo = piorou
+        rows.append((name, old, new, change, worse > tolerance))
+    return rows
+
+
+def warn_if_not_comparable(current, baseline):
+    """Avisa quando a base foi medida em outra máquina ou com outra configuração."""
+    for section, keys in (('hardware', ('cpu_model', 'cpu_count', 'gpus', 'tensorflow')),
+                          ('config', ('model', 'detector', 'extraction_backend', 'repeats'))):
+        for key in keys:
+            old, new = baseline.get(section, {}).get(key), current[section].get(key)
+            if old != new:
+                print(f"[AVISO] {section}.{key} difere da base ({old} -> {new}); a comparação pode não ser justa.")
+
+
+def print_results(document):
+    print(f"\n{'métrica':<34} {'valor':>10}  unidade")
+    for name, entry in document['results'].items():
+        print(f"{name:<34} {entry['value']:>10.2f}  {entry['unit']}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"\n{'métrica':<34} {'base':>10} {'atual':>10} {'variação':>9}")
+    for name, old, new, change, regression in rows:
+        print(f"{name:<34} {old:>10.2f} {new:>10.2f} {change:>+9.1%}{'  <<< REGRESSÃO' if regression else ''}")
+    regressions = sum(row[4] for row in rows)
+    print(f"\n{regressions} regressão(ões) acima de {tolerance:.0%}." if regressions
+          else f"\nNenhuma regressão acima de {tolerance:.0%}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks com mídia sintética e comparação com uma base.")
+    parser.add_argument('--cases', default=','.join(CASES), help=f"Casos separados por vírgula ({', '.join(CASES)})")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Arquivo JSON dos resultados")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--detector', choices=['mtcnn', 'colorkey'], default='mtcnn',
+                        help="Detector dos casos image/video ('colorkey' mede só o resto do caminho)")
+    args = parser.parse_args()
+
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"caso(s) desconhecido(s): {', '.join(sorted(unknown))}")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)  # Lida antes de medir: um caminho errado falha logo
+
+    document = run_suite(cases, args.detector, args.repeats)
+    print_results(document)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {args.output}")
+
+    if baseline is not None:
+        warn_if_not_comparable(document, baseline)
+        rows = compare(document, baseline, args.tolerance)
+        print_comparison(rows, args.tolerance)
+        if any(row[4] for row in rows):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# src/benchmark_video_sampling.py
+# Custo de decodificação por rosto salvo e diversidade dos recortes na extração de rostos de
+# vídeos (video_data_processor.extract_faces): frames seguidos desde o início (antigo) contra
+# frames espalhados (uniforme) e um frame por cena, num vídeo sintético com vários cortes.
+# Uso: python src/benchmark_video_sampling.py [--seconds 60] [--scenes 6] [--faces 5]
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import video_data_processor
+from face_localization import FaceLocalizer
+from perceptual_hash import dhash
+from synthetic_media import ColorKeyDetector, face_box_for_frame, synthetic_frame
+
+
+def write_scene_video(path, num_frames, scenes, width=640, height=480, fps=30):
+    """Vídeo sintético com `scenes` cortes: cada cena tem outro fundo, o rosto em outra posição e outra marca."""
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for frame_idx in range(num_frames):
+        scene = scene_of(frame_idx, num_frames, scenes)
+        shifted = frame_idx // 4 + scene * 997  # Movimento lento dentro da cena, salto no corte
+        frame = synthetic_frame(shifted, width, height, seed=scene * 100003)
+        frame[np.all(frame < 60, axis=2)] += np.uint8(50 * (scene % 3))  # Brilho do fundo muda a cada cena
+        x, y, w, h = face_box_for_frame(shifted, width, height)
+        # Faixa na testa, em altura diferente por cena, para que os rostos de cenas distintas difiram
+        band_y = y + h // 8 + (scene % 4) * h // 16
+        cv2.rectangle(frame, (x + w // 4, band_y), (x + 3 * w // 4, band_y + h // 20), (30, 30 + 35 * (scene % 6), 200), -1)
+        out.write(frame)
+    out.release()
+    return path
+
+
+def scene_of(frame_idx, num_frames, scenes):
+    return min(scenes - 1, frame_idx * scenes // num_frames)
+
+
+def crop_diversity(faces):
+    """Distância de Hamming média e mínima entre os dHash dos recortes (0 = idênticos, 64 = máximo)."""
+    hashes = [dhash(cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)) for _, face in faces]
+    distances = [(a ^ b).bit_count() for a, b in itertools.combinations(hashes, 2)]
+    if not distances:
+        return 0.0, 0
+    return float(np.mean(distances)), min(distances)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Amostragem de frames na extração de rostos de vídeos.")
+    parser.add_argument('--seconds', type=int, default=60, help="Duração do vídeo sintético (30 fps)")
+    parser.add_argument('--scenes', type=int, default=6)
+    parser.add_argument('--faces', type=int, default=video_data_processor.MAX_FACES_PER_VIDEO)
+    args = parser.parse_args()
+    num_frames = args.seconds * 30
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = write_scene_video(os.path.join(tmp_dir, 'scenes.mp4'), num_frames, args.scenes)
+        for mode in ('consecutive', 'uniform', 'scene'):
+            localizer = FaceLocalizer(ColorKeyDetector(), redetect_interval=video_data_processor.REDETECT_INTERVAL)
+            cap = cv2.VideoCapture(video_path)
+            start = time.perf_counter()
+            faces, cost = video_data_processor.extract_faces(cap, localizer, args.faces, mode)
+            elapsed = time.perf_counter() - start
+            cap.release()
+            frames_touched = cost['decoded'] + cost['grabbed']
+            mean_distance, min_distance = crop_diversity(faces)
+            scenes_covered = len({scene_of(i, num_frames, args.scenes) for i, _ in faces})
+            rows.append((mode, len(faces), cost, frames_touched / max(1, len(faces)),
+                         elapsed * 1000 / max(1, len(faces)), mean_distance, min_distance, scenes_covered))
+
+    print(f"\nVídeo sintético: {num_frames} frames, {args.scenes} cenas, até {args.faces} rostos")
+    print(f"{'modo':<12} {'rostos':>6} {'decod.':>7} {'grab':>6} {'seeks':>6} {'frames/rosto':>13} "
+          f"{'ms/rosto':>9} {'dHash médio':>12} {'dHash mín.':>11} {'cenas':>6}")
+    for mode, count, cost, per_face, ms_per_face, mean_distance, min_distance, scenes_covered in rows:
+        print(f"{mode:<12} {count:>6} {cost['decoded']:>7} {cost['grabbed']:>6} {cost['seeks']:>6} "
+              f"{per_face:>13.1f} {ms_per_face:>9.1f} {mean_distance:>12.1f} {min_distance:>11} {scenes_covered:>6}")
+    print("frames/rosto = frames decodificados + pulados com grab, por rosto salvo; "
+          "dHash = distância entre os recortes (0 = idênticos); cenas = cenas distintas entre os rostos salvos.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# src/dataset_sampler.py
+# Montagem do dataset final em fluxo, sem listas com todos os arquivos das fontes:
+# - as pastas são percorridas com os.scandir por várias threads, em blocos de caminhos;
+# - a amostra de cada classe são os k arquivos de menor hash da identidade (bottom-k): determinística,
+#   estável entre execuções e, quando a fonte cresce, os arquivos novos só deslocam os de hash maior;
+# - treino/validação é decidido por outro hash da identidade, então um arquivo nunca troca de lado;
+# - a saída usa hardlink ou reflink (FICLONE) quando possível, e cópia só como último recurso.
+# A memória de pico depende do tamanho da amostra (k por classe), não do tamanho das fontes.
+
+import errno
+import hashlib
+import heapq
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+# --- CONFIGURAÇÕES ---
+SCAN_WORKERS = 8           # Threads percorrendo diretórios (o os.scandir libera o GIL)
+SCAN_CHUNK = 1024          # Caminhos entregues de uma vez por cada thread
+SAMPLING_SEED = 0          # Mude para sortear outra amostra/divisão (ainda determinística)
+MAX_SAMPLES_PER_CLASS = None  # Teto da amostra por classe (None = tamanho da menor classe)
+LINK_WORKERS = 8
+# --------------------
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+FICLONE = 0x40049409  # ioctl do Linux (btrfs, XFS, ...) que cria um reflink do arquivo inteiro
+
+
+def scan_images(folders, workers=SCAN_WORKERS, chunk_size=SCAN_CHUNK):
+    """Gera os caminhos das imagens em `folders` (recursivo), em blocos de até `chunk_size`.
+
+    Cada thread lista um diretório por vez e entrega blocos numa fila limitada, então nem
+    um diretório com milhões de arquivos vira uma lista inteira na memória. A ordem é arbitrária.
+    """
+    folders = [folder for folder in folders if os.path.isdir(folder)]
+    if not folders:
+        return
+    directories = queue.Queue()
+    chunks = queue.Queue(maxsize=workers * 4)
+    outstanding = [len(folders)]  # Diretórios na fila ou sendo listados
+    lock = threading.Lock()
+    done = object()
+    for folder in folders:
+        directories.put(folder)
+
+    def scan_directory(path):
+        batch = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            with lock:
+                                outstanding[0] += 1
+                            directories.put(entry.path)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            batch.append(entry.path)
+                            if len(batch) >= chunk_size:
+                                chunks.put(batch)
+                                batch = []
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"  [AVISO] Não foi possível listar {path}: {e}")
+        if batch:
+            chunks.put(batch)
+
+    def worker():
+        while True:
+            path = directories.get()
+            if path is None:
+                return
+            scan_directory(path)
+            with lock:
+                outstanding[0] -= 1
+                finished = outstanding[0] == 0
+            if finished:
+                for _ in range(workers):
+                    directories.put(None)
+                chunks.put(done)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    while True:
+        batch = chunks.get()
+        if batch is done:
+            break
+        yield batch
+    for thread in threads:
+        thread.join()
+
+
+def identity_hash(path, purpose, seed=SAMPLING_SEED):
+    """Hash de 64 bits estável da identidade do arquivo (o caminho normalizado) para `purpose`."""
+    identity = os.path.normpath(path).replace(os.sep, '/')
+    digest = hashlib.blake2b(identity.encode('utf-8'), digest_size=8, key=f"{purpose}:{seed}".encode('utf-8'))
+    return int.from_bytes(digest.digest(), 'big')
+
+
+def count_images(folders, workers=SCAN_WORKERS):
+    return sum(len(batch) for batch in scan_images(folders, workers))
+
+
+def bottom_k(folders, k, workers=SCAN_WORKERS, desc=None):
+    """Os `k` caminhos de menor identity_hash(..., 'sample'), em ordem crescente de hash."""
+    heap = []  # Heap de máximo (hash negativo) com os k menores vistos até agora
+    with tqdm(desc=desc, unit=' arquivos') as pbar:
+        for batch in scan_images(folders, workers):
+            for path in batch:
+                item = (-identity_hash(path, 'sample'), path)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            pbar.update(len(batch))
+    return [path for _, path in sorted(heap, reverse=True)]
+
+
+def sample_classes(source_folders, max_per_class=MAX_SAMPLES_PER_CLASS, workers=SCAN_WORKERS):
+    """Amostra balanceada {classe: [caminhos]} em duas passadas: contagem e seleção bottom-k.
+
+    Retorna None se alguma classe não tiver imagens.
+    """
+    counts = {}
+    for label, folders in source_folders.items():
+        for folder in folders:
+            if not os.path.isdir(folder):
+                print(f"  [AVISO] Pasta não encontrada: {folder}. Pulando.")
+        counts[label] = count_images(folders, workers)
+        print(f"Classe '{label}': {counts[label]} imagens encontradas.")
+    k = min(counts.values())
+    if max_per_class:
+        k = min(k, max_per_class)
+    if k == 0:
+        print("[ERRO] Uma das classes (real ou fake) não tem imagens. Abortando.")
+        return None
+    print(f"\nAmostrando {k} imagens de cada classe (hash determinístico, semente {SAMPLING_SEED}).")
+    return {label: bottom_k(folders, k, workers, desc=f"Amostra {label}") for label, folders in source_folders.items()}
+
+
+def rebalance(samples):
+    """Corta todas as classes para o tamanho da menor, mantendo a ordem de hash (após a deduplicação)."""
+    k = min(len(paths) for paths in samples.values())
+    return {label: paths[:k] for label, paths in samples.items()}
+
+
+def split_by_hash(samples, split_ratio):
+    """{classe: {'train': [...], 'validation': [...]}} pela identity_hash(..., 'split')."""
+    threshold = int(split_ratio * 2 ** 64)
+    datasets = {}
+    for label, paths in samples.items():
+        datasets[label] = {'train': [], 'validation': []}
+        for path in paths:
+            datasets[label]['train' if identity_hash(path, 'split') < threshold else 'validation'].append(path)
+    return datasets
+
+
+def link_or_copy(source, destination):
+    """Cria `destination` com o conteúdo de `source`: hardlink, reflink ou cópia. Retorna o método usado."""
+    try:
+        os.link(source, destination)
+        return 'hardlink'
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            raise
+    try:
+        import fcntl
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return 'reflink'
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(source, destination)
+    return 'copy'
+
+
+def materialize(datasets, train_folder, validation_folder, workers=LINK_WORKERS):
+    """Monta as pastas de treino/validação por classe. Retorna a contagem por método (hardlink/reflink/copy)."""
+    methods = {}
+    for label, splits in datasets.items():
+        for split_name, files in splits.items():
+            dest_folder = os.path.join(train_folder if split_name == 'train' else validation_folder, label)
+            os.makedirs(dest_folder, exist_ok=True)
+            # Nomes repetidos entre fontes ganham um sufixo do hash da identidade (a cópia antiga sobrescrevia)
+            targets, used = [], set(os.listdir(dest_folder))
+            for path in files:
+                name = os.path.basename(path)
+                if name in used:
+                    stem, ext = os.path.splitext(name)
+                    name = f"{stem}_{identity_hash(path, 'name'):016x}{ext}"
+                used.add(name)
+                targets.append((path, os.path.join(dest_folder, name)))
+            with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(total=len(targets), desc=f"Montando {label} {split_name}") as pbar:
+                for start in range(0, len(targets), SCAN_CHUNK):  # Em blocos: pool.map cria todas as tarefas de uma vez
+                    for method in pool.map(lambda item: link_or_copy(*item), targets[start:start + SCAN_CHUNK]):
+                        methods[method] = methods.get(method, 0) + 1
+                    pbar.update(min(SCAN_CHUNK, len(targets) - start))
+    return methods
@@ -0,0 +1,196 @@
+# src/detector_backends.py
+# Backends de detecção de rostos com a interface do MTCNN: detect_faces(imagem RGB) devolve
+# [{'box': [x, y, w, h], 'confidence': c, 'keypoints': {...}}]. Além dele:
+# - 'mtcnn_batched': o mesmo MTCNN, com o estágio 1 (P-Net) rodando de uma vez sobre uma pilha
+#   de imagens do mesmo tamanho, em vez de uma chamada por imagem e por escala da pirâmide;
+# - 'yunet': o detector YuNet do OpenCV (cv2.FaceDetectorYN), leve e sem TensorFlow.
+# detect_batch(detector, imagens) usa o lote quando o backend oferece e cai para uma imagem por vez.
+
+import os
+
+import cv2
+import numpy as np
+
+from startup_profile import timed_import
+
+# --- CONFIGURAÇÕES ---
+DETECTOR_BACKEND = 'mtcnn_batched'  # 'mtcnn', 'mtcnn_batched' ou 'yunet'
+MTCNN_STACK_MAX_PIXELS = 1_000_000  # Pixels da maior escala da pirâmide por pilha do estágio 1 (limita a memória)
+YUNET_MODEL_PATH = 'models/face_detection_yunet_2023mar.onnx'  # opencv_zoo/models/face_detection_yunet
+YUNET_SCORE_THRESHOLD = 0.6
+YUNET_NMS_THRESHOLD = 0.3
+YUNET_TOP_K = 50
+# --------------------
+
+BACKENDS = ('mtcnn', 'mtcnn_batched', 'yunet')
+
+
+class BatchedMTCNN:
+    """MTCNN com o estágio 1 em lote. As caixas são as mesmas do MTCNN imagem a imagem.
+
+    A P-Net é totalmente convolucional: numa mesma escala da pirâmide, imagens do mesmo tamanho
+    viram um único tensor (N, h, w, 3) e uma única chamada ao modelo. Os estágios 2 e 3 (R-Net e
+    O-Net, sobre os candidatos de cada imagem) continuam por imagem. Usa funções internas do
+    mtcnn 0.1.x; em outras versões, detect_batch roda o detect_faces original imagem a imagem.
+    """
+
+    def __init__(self, detector=None):
+        self.detector = detector if detector is not None else timed_import('mtcnn').MTCNN()
+        self.batched = all(hasattr(self.detector, name) for name in (
+            '_pnet', '_MTCNN__compute_scale_pyramid', '_MTCNN__scale_image', '_MTCNN__generate_bounding_box',
+            '_MTCNN__nms', '_MTCNN__rerec', '_MTCNN__pad', '_MTCNN__stage2', '_MTCNN__stage3'))
+
+    def detect_faces(self, img_rgb):
+        return self.detector.detect_faces(img_rgb)
+
+    def detect_batch(self, images_rgb):
+        """Detecta rostos em várias imagens RGB. Agrupa por tamanho; devolve as detecções na ordem de entrada."""
+        if not self.batched:
+            return [self.detector.detect_faces(image) for image in images_rgb]
+        groups = {}
+        for idx, image in enumerate(images_rgb):
+            groups.setdefault(image.shape, []).append(idx)
+        results = [None] * len(images_rgb)
+        for (height, width, _), indices in groups.items():
+            # As ativações da P-Net crescem com a pilha: ela é cortada para caber em MTCNN_STACK_MAX_PIXELS
+            largest_scale = min(1.0, 12 / self.detector.min_face_size)
+            stack_size = max(1, int(MTCNN_STACK_MAX_PIXELS // (height * width * largest_scale ** 2)))
+            for start in range(0, len(indices), stack_size):
+                chunk = indices[start:start + stack_size]
+                for idx, detections in zip(chunk, self._detect_same_size([images_rgb[i] for i in chunk])):
+                    results[idx] = detections
+        return results
+
+    def _detect_same_size(self, images):
+        mtcnn = self.detector
+        height, width = images[0].shape[:2]
+        m = 12 / mtcnn.min_face_size
+        scales = mtcnn._MTCNN__compute_scale_pyramid(m, min(height, width) * m)
+        candidates = [np.empty((0, 9)) for _ in images]
+        for scale in scales:
+            stack = np.stack([mtcnn._MTCNN__scale_image(image, scale) for image in images]).astype(np.float32)
+            # Chamada direta (modo eager): cada escala tem outro tamanho e o predict retraçaria o grafo
+            out = mtcnn._pnet(np.transpose(stack, (0, 2, 1, 3)), training=False)
+            regressions = np.transpose(np.asarray(out[0]), (0, 2, 1, 3))
+            scores = np.transpose(np.asarray(out[1]), (0, 2, 1, 3))
+            for i in range(len(images)):
+                boxes, _ = mtcnn._MTCNN__generate_bounding_box(scores[i, :, :, 1].copy(), regressions[i].copy(),
+                                                               scale, mtcnn._steps_threshold[0])
+                pick = mtcnn._MTCNN__nms(boxes.copy(), 0.5, 'Union')
+                if boxes.size > 0 and pick.size > 0:
+                    candidates[i] = np.append(candidates[i], boxes[pick, :], axis=0)
+
+        results = []
+        for image, total_boxes in zip(images, candidates):
+            total_boxes, status = self._finish_stage1(total_boxes, width, height)
+            total_boxes, status = mtcnn._MTCNN__stage2(image, total_boxes, status)
+            total_boxes, points = mtcnn._MTCNN__stage3(image, total_boxes, status)
+            results.append(_format_detections(total_boxes, points))
+        return results
+
+    def _finish_stage1(self, total_boxes, width, height):
+        # Final do estágio 1 do mtcnn 0.1.x: NMS entre escalas, regressão e quadrado das caixas
+        mtcnn = self.detector
+        status_class = timed_import('mtcnn.mtcnn').StageStatus
+        status = status_class(width=width, height=height)
+        if total_boxes.shape[0] == 0:
+            return total_boxes, status
+        total_boxes = total_boxes[mtcnn._MTCNN__nms(total_boxes.copy(), 0.7, 'Union'), :]
+        regw = total_boxes[:, 2] - total_boxes[:, 0]
+        regh = total_boxes[:, 3] - total_boxes[:, 1]
+        total_boxes = np.transpose(np.vstack([
+            total_boxes[:, 0] + total_boxes[:, 5] * regw,
+            total_boxes[:, 1] + total_boxes[:, 6] * regh,
+            total_boxes[:, 2] + total_boxes[:, 7] * regw,
+            total_boxes[:, 3] + total_boxes[:, 8] * regh,
+            total_boxes[:, 4],
+        ]))
+        total_boxes = mtcnn._MTCNN__rerec(total_boxes.copy())
+        total_boxes[:, 0:4] = np.fix(total_boxes[:, 0:4]).astype(np.int32)
+        return total_boxes, status_class(mtcnn._MTCNN__pad(total_boxes.copy(), width, height), width=width, height=height)
+
+
+def _format_detections(total_boxes, points):
+    """Converte a saída do estágio 3 para o formato de MTCNN.detect_faces."""
+    detections = []
+    for box, keypoints in zip(total_boxes, points.T):
+        x, y = max(0, int(box[0])), max(0, int(box[1]))
+        detections.append({
+            'box': [x, y, int(box[2] - x), int(box[3] - y)],
+            'confidence': box[-1],
+            'keypoints': {
+                'left_eye': (int(keypoints[0]), int(keypoints[5])),
+                'right_eye': (int(keypoints[1]), int(keypoints[6])),
+                'nose': (int(keypoints[2]), int(keypoints[7])),
+                'mouth_left': (int(keypoints[3]), int(keypoints[8])),
+                'mouth_right': (int(keypoints[4]), int(keypoints[9])),
+            },
+        })
+    return detections
+
+
+class YuNetDetector:
+    """Detector YuNet do OpenCV (cv2.FaceDetectorYN, OpenCV >= 4.8). Não usa o TensorFlow.
+
+    O modelo .onnx (~230 KB) não vem com o OpenCV: baixe-o do opencv_zoo para YUNET_MODEL_PATH.
+    """
+
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=YUNET_SCORE_THRESHOLD,
+                 nms_threshold=YUNET_NMS_THRESHOLD, top_k=YUNET_TOP_K):
+        _check_yunet(model_path)
+        self._detector = cv2.FaceDetectorYN.create(model_path, '', (320, 320), score_threshold, nms_threshold, top_k)
+        self._input_size = None
+
+    def detect_faces(self, img_rgb):
+        height, width = img_rgb.shape[:2]
+        if self._input_size != (width, height):
+            self._detector.setInputSize((width, height))
+            self._input_size = (width, height)
+        _, faces = self._detector.detect(cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR))  # O YuNet espera BGR
+        detections = []
+        for row in faces if faces is not None else []:
+            x, y = max(0, int(row[0])), max(0, int(row[1]))
+            detections.append({
+                'box': [x, y, int(row[0] + row[2]) - x, int(row[1] + row[3]) - y],
+                'confidence': float(row[14]),
+                'keypoints': {
+                    name: (int(row[4 + 2 * k]), int(row[5 + 2 * k]))
+                    for k, name in enumerate(('right_eye', 'left_eye', 'nose', 'mouth_right', 'mouth_left'))
+                },
+            })
+        return detections
+
+
+def _check_yunet(model_path):
+    if not hasattr(cv2, 'FaceDetectorYN'):
+        raise ImportError("O backend 'yunet' requer OpenCV >= 4.8 (cv2.FaceDetectorYN).")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Modelo YuNet não encontrado em {model_path}. Baixe 'face_detection_yunet_2023mar.onnx' de "
+            "https://github.com/opencv/opencv_zoo/tree/main/models/face_detection_yunet")
+
+
+def check_backend(backend=DETECTOR_BACKEND):
+    """Valida o backend sem carregar o detector, para falhar no processo principal e não em cada worker."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de detecção desconhecido: {backend}")
+    if backend == 'yunet':
+        _check_yunet(YUNET_MODEL_PATH)
+
+
+def create_detector(backend=DETECTOR_BACKEND):
+    """Cria o detector `backend` ('mtcnn', 'mtcnn_batched' ou 'yunet')."""
+    if backend == 'mtcnn':
+        return timed_import('mtcnn').MTCNN()
+    if backend == 'mtcnn_batched':
+        return BatchedMTCNN()
+    if backend == 'yunet':
+        return YuNetDetector()
+    raise ValueError(f"Backend de detecção desconhecido: {backend}")
+
+
+def detect_batch(detector, images_rgb):
+    """Detecções de cada imagem RGB, em lote quando o detector oferece detect_batch."""
+    if hasattr(detector, 'detect_batch'):
+        return detector.detect_batch(images_rgb)
+    return [detector.detect_faces(image) for image in images_rgb]
@@ -0,0 +1,136 @@
+# src/export_model.py
+# Exporta o classificador .keras para os backends de inferência de inference_backend.py:
+# TFLite float16, TFLite int8 (quantização calibrada com imagens de data/final_validation)
+# e ONNX (opcional, requer tf2onnx). Os arquivos são gravados ao lado do .keras.
+# Uso: python src/export_model.py [--model models/x.keras] [--formats tflite_fp16,tflite_int8,onnx]
+
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+import inference_backend
+import input_pipeline
+import predict_video
+
+# --- CONFIGURAÇÕES ---
+MODEL_PATH = predict_video.MODEL_PATH
+CALIBRATION_DIR = 'data/final_validation'
+CALIBRATION_SAMPLES = 200  # Imagens usadas para estimar as faixas de ativação da quantização int8
+CALIBRATION_SEED = 0
+ONNX_OPSET = 17
+# --------------------
+
+
+def load_calibration_images(directory=CALIBRATION_DIR, count=CALIBRATION_SAMPLES, seed=CALIBRATION_SEED):
+    """Amostra aleatória (mesma quantidade por classe) de imagens RGB float32 no tamanho da entrada."""
+    paths, labels, _ = input_pipeline.list_image_files(directory)
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels)
+    per_class = max(1, count // max(1, len(set(labels.tolist()))))
+    chosen = []
+    for label in sorted(set(labels.tolist())):
+        candidates = np.flatnonzero(labels == label)
+        chosen += rng.choice(candidates, size=min(per_class, len(candidates)), replace=False).tolist()
+    images = []
+    for idx in sorted(chosen):
+        image = cv2.imread(paths[idx])
+        if image is not None:
+            image = cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), (predict_video.IMG_WIDTH, predict_video.IMG_HEIGHT))
+            images.append(image.astype(np.float32))
+    return np.stack(images) if images else np.empty((0, predict_video.IMG_HEIGHT, predict_video.IMG_WIDTH, 3), np.float32)
+
+
+def export_tflite(model, output_path, precision, calibration_images=None):
+    """Converte para TFLite. 'fp16' guarda os pesos em float16; 'int8' quantiza pesos e ativações.
+
+    No int8 a entrada e a saída continuam float32, então o pré-processamento não muda.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == 'fp16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif precision == 'int8':
+        if calibration_images is None or not len(calibration_images):
+            raise ValueError("A quantização int8 precisa de imagens de calibração.")
+        batch = tf.keras.applications.efficientnet.preprocess_input(calibration_images)
+
+        def representative_dataset():
+            for image in batch:
+                yield [image[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Precisão desconhecida: {precision}")
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def export_onnx(model, output_path, opset=ONNX_OPSET):
+    """Converte para ONNX com eixo de lote dinâmico (requer o pacote opcional tf2onnx)."""
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("A exportação ONNX requer o pacote tf2onnx (pip install tf2onnx onnxruntime).") from e
+    signature = [tf.TensorSpec([None, *model.inputs[0].shape[1:]], tf.float32, name='input')]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output_path)
+    return output_path
+
+
+def export_model(model, keras_path, formats, calibration_images=None):
+    """Exporta `model` nos formatos pedidos. Retorna {formato: caminho} dos que deram certo."""
+    exported = {}
+    for backend in formats:
+        output_path = inference_backend.exported_model_path(keras_path, backend)
+        try:
+            if backend == 'onnx':
+                export_onnx(model, output_path)
+            else:
+                export_tflite(model, output_path, backend.split('_')[1], calibration_images)
+        except (ImportError, ValueError) as e:
+            print(f"[AVISO] {backend} não exportado: {e}")
+            continue
+        exported[backend] = output_path
+        print(f"{backend:<12} -> {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o classificador para TFLite (float16/int8) e ONNX.")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--formats', default='tflite_fp16,tflite_int8,onnx',
+                        help=f"Lista separada por vírgulas entre: {', '.join(inference_backend.EXPORT_SUFFIXES)}")
+    parser.add_argument('--calibration-dir', default=CALIBRATION_DIR)
+    parser.add_argument('--calibration-samples', type=int, default=CALIBRATION_SAMPLES)
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in inference_backend.EXPORT_SUFFIXES]
+    if unknown:
+        print(f"[ERRO] Formato(s) desconhecido(s): {', '.join(unknown)}")
+        sys.exit(1)
+    if not os.path.exists(args.model):
+        print(f"[ERRO] Modelo não encontrado em {args.model}.")
+        sys.exit(1)
+
+    calibration_images = None
+    if 'tflite_int8' in formats:
+        if os.path.isdir(args.calibration_dir):
+            calibration_images = load_calibration_images(args.calibration_dir, args.calibration_samples)
+            print(f"Calibração int8: {len(calibration_images)} imagens de {args.calibration_dir}")
+        else:
+            print(f"[AVISO] Pasta de calibração '{args.calibration_dir}' não encontrada. "
+                  "Execute o script 'prepare_final_dataset.py' primeiro.")
+
+    print(f"--- Exportando {args.model} ---")
+    model = tf.keras.models.load_model(args.model)
+    export_model(model, args.model, formats, calibration_images)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# src/extraction_manifest.py
+# Manifesto (SQLite) da extração de rostos: registra cada arquivo de origem processado
+# (caminho, tamanho, mtime, resultado e caixa) para que novas execuções processem apenas
+# arquivos novos ou alterados e trabalhos interrompidos continuem de onde pararam.
+
+import json
+import os
+import sqlite3
+import time
+
+# --- CONFIGURAÇÕES ---
+MANIFEST_NAME = '.extraction_manifest.sqlite'  # Gravado dentro da pasta de saída
+COMMIT_EVERY = 200  # Resultados acumulados antes de cada gravação no disco
+# --------------------
+
+# Resultados possíveis de um arquivo
+STATUS_SAVED = 'saved'          # Rosto recortado e salvo
+STATUS_NO_FACE = 'no_face'      # Nenhum rosto detectado
+STATUS_TOO_SMALL = 'too_small'  # Rosto menor que o mínimo
+STATUS_UNREADABLE = 'unreadable'
+STATUS_ERROR = 'error'          # Exceção; é reprocessado na próxima execução
+
+
+def manifest_path(output_folder):
+    return os.path.join(output_folder, MANIFEST_NAME)
+
+
+class ExtractionManifest:
+    """Registro persistente dos arquivos já processados de uma pasta de saída."""
+
+    def __init__(self, db_path):
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " status TEXT NOT NULL, box TEXT, output_path TEXT, error TEXT, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._pending = []
+
+    def is_up_to_date(self, path, size, mtime_ns):
+        """True se o arquivo já foi processado com sucesso nesta mesma versão (tamanho e mtime)."""
+        row = self._db.execute(
+            "SELECT size, mtime_ns, status, output_path FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns or row[2] == STATUS_ERROR:
+            return False
+        # Se o recorte foi apagado da pasta de saída, o arquivo precisa ser refeito
+        return row[2] != STATUS_SAVED or (row[3] is not None and os.path.exists(row[3]))
+
+    def filter_pending(self, files_with_stat):
+        """Recebe [(caminho, tamanho, mtime_ns)] e devolve só os que precisam ser processados."""
+        return [item for item in files_with_stat if not self.is_up_to_date(*item)]
+
+    def record(self, path, size, mtime_ns, status, box=None, output_path=None, error=None):
+        self._pending.append((
+            path, size, mtime_ns, status, json.dumps(box) if box is not None else None,
+            output_path, error, time.time()
+        ))
+        if len(self._pending) >= COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, status, box, output_path, error, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending
+        )
+        self._db.commit()
+        self._pending.clear()
+
+    def summary(self):
+        return dict(self._db.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+    def close(self):
+        self.flush()
+        self._db.close()
@@ -1,72 +1,216 @@
 # src/face_detector.py (Versão que aceita argumentos)
 
+import startup_profile
 import os
 import cv2
 import sys
+import time
+import numpy as np
 from tqdm import tqdm
-import mtcnn
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count, get_all_start_methods, get_context
+import detector_backends
+from face_localization import DetectionFrontend
+from extraction_manifest import (ExtractionManifest, manifest_path, STATUS_ERROR, STATUS_NO_FACE,
+                                 STATUS_SAVED, STATUS_TOO_SMALL, STATUS_UNREADABLE)
 
-# Esta função continua a mesma
-def init_worker():
-    global face_detector
-    face_detector = mtcnn.MTCNN()
+CHUNK_SIZE = 16 # Imagens enviadas de uma vez a cada processo do pool (cada lote é uma tarefa)
+DETECTOR_BACKEND = detector_backends.DETECTOR_BACKEND # 'mtcnn', 'mtcnn_batched' (estágio 1 em lote) ou 'yunet'
+# 'fork': o processo principal importa o TensorFlow/MTCNN uma vez e os workers herdam os módulos
+# já carregados; 'spawn' (único disponível no Windows): cada worker importa tudo de novo.
+WORKER_START_METHOD = 'fork' if 'fork' in get_all_start_methods() else 'spawn'
 
-# Esta função agora recebe a pasta de saída como argumento
+face_detector = None
+worker_startup_seconds = 0.0
+
+# O detector roda numa cópia reduzida da imagem (DETECTION_MAX_SIDE) com buffers reaproveitados.
+# Uma detecção de aquecimento traça os grafos do MTCNN antes da primeira imagem real.
+def init_worker(backend=None):
+    global face_detector, worker_startup_seconds
+    start = time.perf_counter()
+    face_detector = DetectionFrontend(detector_backends.create_detector(backend or DETECTOR_BACKEND))
+    face_detector.detect(np.zeros((160, 160, 3), dtype=np.uint8))
+    worker_startup_seconds = time.perf_counter() - start
+
+def create_worker_pool(num_processes, initializer=init_worker, start_method=None, initargs=()):
+    """Pool de workers com os frameworks importados antes do fork.
+
+    O detector em si é criado em cada worker: o runtime do TensorFlow não sobrevive ao fork,
+    e um modelo já executado no processo principal trava os filhos na primeira inferência.
+    """
+    detector_backends.check_backend(DETECTOR_BACKEND) # Um worker que falha ao iniciar é recriado sem fim pelo pool
+    start_method = start_method or WORKER_START_METHOD
+    if start_method == 'fork' and DETECTOR_BACKEND != 'yunet':
+        startup_profile.timed_import('mtcnn')
+    return get_context(start_method).Pool(processes=num_processes, initializer=initializer, initargs=initargs)
+
+def record_worker_startup(worker_startup):
+    """Registra no relatório de inicialização o tempo médio e máximo de preparo dos workers."""
+    if worker_startup:
+        times = list(worker_startup.values())
+        startup_profile.record(f"preparo do detector por worker (média, {len(times)})", sum(times) / len(times))
+        startup_profile.record("preparo do detector por worker (máximo)", max(times))
+
+def new_result(image_path):
+    return {'path': image_path, 'status': STATUS_ERROR, 'box': None, 'output_path': None, 'error': None,
+            'worker': (os.getpid(), worker_startup_seconds)}
+
+def save_main_face(result, image, detections, output_dir):
+    """Grava o recorte do maior rosto e preenche status/caixa/caminho em `result`."""
+    result['status'] = STATUS_NO_FACE
+    if detections:
+        main_face = max(detections, key=lambda d: d['box'][2] * d['box'][3])
+        x, y, w, h = main_face['box']
+        result['box'] = [int(x), int(y), int(w), int(h)]
+        result['status'] = STATUS_TOO_SMALL
+        if w > 50 and h > 50:
+            cropped_face = image[y:y+h, x:x+w]
+            output_path = os.path.join(output_dir, os.path.basename(result['path']))
+            cv2.imwrite(output_path, cropped_face)
+            result['status'] = STATUS_SAVED
+            result['output_path'] = output_path
+    return result
+
+# Esta função agora recebe a pasta de saída como argumento.
+# Retorna um dicionário com o resultado, registrado no manifesto pelo processo principal.
 def process_single_image(args):
     image_path, output_dir = args
+    return process_image_batch(([image_path], output_dir))[0]
+
+def process_image_batch(args):
+    """Lê um lote de imagens e roda o detector uma vez para todas (detect_batch).
+
+    Retorna um resultado por imagem, na mesma ordem. Se o lote falhar, cada imagem
+    é tentada de novo sozinha, para que o erro fique só na imagem que o causou.
+    """
+    image_paths, output_dir = args
+    if not face_detector: init_worker() # Garante que o detector seja inicializado
+    results = [new_result(path) for path in image_paths]
+    images = []
+    for result in results:
+        try:
+            image = cv2.imread(result['path'])
+        except Exception as e:
+            result['error'] = f"Erro em {os.path.basename(result['path'])}: {e}"
+            continue
+        if image is None:
+            result['status'] = STATUS_UNREADABLE
+        else:
+            images.append((result, image))
+
     try:
-        image = cv2.imread(image_path)
-        if image is None: return None
-
-        if not face_detector: init_worker() # Garante que o detector seja inicializado
-            
-        detections = face_detector.detect_faces(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-
-        if detections:
-            main_face = max(detections, key=lambda d: d['box'][2] * d['box'][3])
-            x, y, w, h = main_face['box']
-            if w > 50 and h > 50:
-                cropped_face = image[y:y+h, x:x+w]
-                output_path = os.path.join(output_dir, os.path.basename(image_path))
-                cv2.imwrite(output_path, cropped_face)
-        return None
-    except Exception as e:
-        return f"Erro em {os.path.basename(image_path)}: {e}"
-
-# A função principal agora é mais genérica
-def process_image_folder(input_folder, output_folder):
+        batch = face_detector.detect_batch([image for _, image in images])
+    except Exception:
+        batch = None
+    for idx, (result, image) in enumerate(images):
+        try:
+            detections = batch[idx] if batch is not None else face_detector.detect(image)
+            save_main_face(result, image, detections, output_dir)
+        except Exception as e:
+            result['error'] = f"Erro em {os.path.basename(result['path'])}: {e}"
+    return results
+
+def batch_tasks(paths_by_output, batch_size=CHUNK_SIZE):
+    """Divide as imagens em tarefas (lote de caminhos, pasta de saída) de até `batch_size` imagens.
+
+    Imagens do mesmo tamanho entram juntas no estágio 1 do MTCNN, então cada lote é ordenado
+    pelo tamanho do arquivo (uma aproximação barata da resolução) antes de ser cortado.
+    """
+    tasks = []
+    for output_dir, files in paths_by_output:
+        paths = [path for path, _ in sorted(files, key=lambda item: item[1])]
+        tasks += [(paths[i:i + batch_size], output_dir) for i in range(0, len(paths), batch_size)]
+    return tasks
+
+def list_images(input_folder):
+    """Lista [(caminho, tamanho, mtime_ns)] das imagens da pasta."""
+    with os.scandir(input_folder) as entries:
+        return [
+            (entry.path, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png'))
+        ]
+
+def plan_folder(input_folder, output_folder, incremental=True):
+    """Abre o manifesto da pasta de saída e lista as imagens a processar.
+
+    Retorna (manifesto, [(caminho, tamanho, mtime_ns)]), ou (None, []) se a pasta estiver vazia.
+    Com incremental=True, descarta os arquivos já processados numa execução anterior.
+    """
     os.makedirs(output_folder, exist_ok=True)
     
-    files_to_process = [os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    files_to_process = list_images(input_folder)
     if not files_to_process:
         print(f"[AVISO] Nenhuma imagem encontrada em '{input_folder}'")
+        return None, []
+
+    manifest = ExtractionManifest(manifest_path(output_folder))
+    if incremental:
+        total_found = len(files_to_process)
+        files_to_process = manifest.filter_pending(files_to_process)
+        print(f"Encontradas {total_found} imagens em '{input_folder}'; {total_found - len(files_to_process)} já processadas.")
+    return manifest, files_to_process
+
+def record_result(manifest, file_stats, result):
+    """Registra no manifesto o resultado devolvido por process_single_image."""
+    size, mtime_ns = file_stats[result['path']]
+    manifest.record(result['path'], size, mtime_ns, result['status'],
+                    result['box'], result['output_path'], result['error'])
+
+def print_errors(errors):
+    if errors:
+        print("\n--- Ocorreram alguns erros durante o processamento: ---")
+        for error_msg in errors:
+            print(error_msg)
+
+# A função principal agora é mais genérica.
+# Com incremental=True, só processa arquivos novos ou alterados desde a última execução
+# e registra cada resultado no manifesto da pasta de saída (retomada após interrupções).
+def process_image_folder(input_folder, output_folder, incremental=True):
+    manifest, files_to_process = plan_folder(input_folder, output_folder, incremental)
+    if manifest is None:
+        return
+    if not files_to_process:
+        manifest.close()
+        print(f"--- Nada a fazer em '{input_folder}'. ---")
         return
 
     print(f"Encontradas {len(files_to_process)} imagens para processar em '{input_folder}'.")
     num_processes = cpu_count() - 1 if cpu_count() > 1 else 1
     print(f"Iniciando processamento com {num_processes} processos.")
     
-    # Prepara os argumentos para cada chamada da função
-    tasks = [(path, output_folder) for path in files_to_process]
+    # Prepara os lotes de imagens de cada tarefa
+    tasks = batch_tasks([(output_folder, [(path, size) for path, size, _ in files_to_process])])
+    file_stats = {path: (size, mtime_ns) for path, size, mtime_ns in files_to_process}
 
-    with Pool(processes=num_processes, initializer=init_worker) as pool:
-        results = list(tqdm(pool.imap_unordered(process_single_image, tasks), total=len(tasks)))
+    errors = []
+    worker_startup = {}
+    try:
+        with create_worker_pool(num_processes) as pool, tqdm(total=len(file_stats)) as bar:
+            for results in pool.imap_unordered(process_image_batch, tasks):
+                for result in results:
+                    record_result(manifest, file_stats, result)
+                    if result['error']:
+                        errors.append(result['error'])
+                    pid, init_seconds = result['worker']
+                    worker_startup[pid] = init_seconds
+                bar.update(len(results))
+    finally:
+        manifest.close() # Grava o que já foi processado, mesmo se interrompido
     
-    errors = [r for r in results if r is not None]
-    if errors:
-        print("\n--- Ocorreram alguns erros durante o processamento: ---")
-        for error_msg in errors:
-            print(error_msg)
+    print_errors(errors)
     print(f"--- Processamento de '{input_folder}' concluído! ---")
+    record_worker_startup(worker_startup)
+    startup_profile.report('face_detector')
 
 # O script agora lê os caminhos do terminal
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Uso: python face_detector.py <pasta_de_entrada> <pasta_de_saida>")
+    full_run = '--full' in sys.argv[1:] # Ignora o manifesto e reprocessa tudo
+    paths = [arg for arg in sys.argv[1:] if arg != '--full']
+    if len(paths) != 2:
+        print("Uso: python face_detector.py <pasta_de_entrada> <pasta_de_saida> [--full]")
         sys.exit(1)
         
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
+    input_path = paths[0]
+    output_path = paths[1]
     
-    process_image_folder(input_path, output_path)
\ No newline at end of file
+    process_image_folder(input_path, output_path, incremental=not full_run)
\ No newline at end of file
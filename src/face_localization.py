@@ -0,0 +1,323 @@
+# src/face_localization.py
+# Localização do rosto principal compartilhada por predict_video.py e video_data_processor.py.
+# Roda o detector completo (MTCNN) só em keyframes ou quando o rastreador perde o rosto;
+# nos frames intermediários a caixa é carregada adiante por um rastreador barato.
+# MultiFaceLocalizer faz o mesmo para todos os rostos do frame, mantendo uma identidade por pessoa.
+
+import cv2
+import numpy as np
+
+from detector_backends import detect_batch
+
+# --- CONFIGURAÇÕES ---
+REDETECT_INTERVAL = 5   # Frames analisados entre duas detecções completas (1 = detecta sempre)
+TRACKER_TYPE = 'auto'   # 'auto', 'csrt', 'kcf' (opencv-contrib) ou 'flow' (fluxo óptico, OpenCV padrão)
+MIN_FLOW_POINTS = 8     # Abaixo disso o rastreador por fluxo óptico considera o rosto perdido
+DETECTION_MAX_SIDE = 1024  # Maior lado da imagem enviada ao MTCNN (0 = resolução original)
+# Modo multi-rosto
+MIN_FACE_SIZE = 40          # Lado menor mínimo da caixa (px, resolução original)
+MIN_FACE_CONFIDENCE = 0.90  # Confiança mínima do detector
+MAX_FACES_PER_FRAME = 8     # Os maiores rostos do frame, no máximo
+IDENTITY_IOU = 0.3          # Sobreposição mínima para uma detecção continuar a identidade anterior
+IDENTITY_MAX_MISSED = 3     # Detecções seguidas sem o rosto antes de encerrar a identidade
+# --------------------
+
+
+def main_face_box(detections):
+    """Retorna a caixa (x, y, w, h) da maior detecção, ou None."""
+    if not detections:
+        return None
+    main_face = max(detections, key=lambda d: d['box'][2] * d['box'][3])
+    return list(main_face['box'])
+
+
+def select_faces(detections, frame_width, frame_height, min_size=MIN_FACE_SIZE,
+                 min_confidence=MIN_FACE_CONFIDENCE, max_faces=MAX_FACES_PER_FRAME):
+    """Caixas (x, y, w, h) das detecções acima dos limiares, da maior para a menor, até `max_faces`."""
+    boxes = []
+    for detection in detections:
+        if detection.get('confidence', 1.0) < min_confidence:
+            continue
+        box = clamp_box(detection['box'], frame_width, frame_height)
+        if box is not None and min(box[2], box[3]) >= min_size:
+            boxes.append(box)
+    boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+    return boxes[:max_faces] if max_faces else boxes
+
+
+def box_iou(a, b):
+    """Interseção sobre união de duas caixas (x, y, w, h)."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def clamp_box(box, frame_width, frame_height):
+    """Limita a caixa às bordas do frame. Retorna None se ela ficar vazia."""
+    x, y, w, h = [int(round(v)) for v in box]
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(frame_width, x + w), min(frame_height, y + h)
+    if x2 - x1 <= 1 or y2 - y1 <= 1:
+        return None
+    return [x1, y1, x2 - x1, y2 - y1]
+
+
+class DetectionFrontend:
+    """Roda o detector numa cópia reduzida do frame e devolve as caixas na resolução original.
+
+    Recebe frames BGR (como lidos pelo OpenCV); a redução e a conversão para RGB são
+    feitas em buffers pré-alocados e reaproveitados. Use uma instância por worker/thread.
+    """
+
+    def __init__(self, face_detector, max_side=DETECTION_MAX_SIDE):
+        self.face_detector = face_detector
+        self.max_side = max_side
+        self._resized = None
+        self._rgb = None
+
+    @staticmethod
+    def _buffer(buffer, shape):
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def _scale(self, frame_bgr):
+        height, width = frame_bgr.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            return self.max_side / max(height, width)
+        return 1.0
+
+    @staticmethod
+    def _scaled_size(frame_bgr, scale):
+        height, width = frame_bgr.shape[:2]
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def detect(self, frame_bgr):
+        """Detecta rostos no frame BGR. Caixas e pontos-chave voltam em coordenadas do frame original."""
+        scale = self._scale(frame_bgr)
+        source = frame_bgr
+        if scale < 1.0:
+            size = self._scaled_size(frame_bgr, scale)
+            self._resized = self._buffer(self._resized, (size[1], size[0], 3))
+            source = cv2.resize(frame_bgr, size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        self._rgb = self._buffer(self._rgb, source.shape)
+        cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rescale(self.face_detector.detect_faces(self._rgb), scale)
+
+    def detect_batch(self, frames_bgr):
+        """Como detect, para vários frames numa chamada ao detector (detector_backends.detect_batch).
+
+        Cada frame reduzido precisa do seu próprio buffer, então aqui não há reaproveitamento.
+        """
+        scales = [self._scale(frame) for frame in frames_bgr]
+        images = []
+        for frame, scale in zip(frames_bgr, scales):
+            if scale < 1.0:
+                frame = cv2.resize(frame, self._scaled_size(frame, scale), interpolation=cv2.INTER_AREA)
+            images.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        batch = detect_batch(self.face_detector, images)
+        return [self._rescale(detections, scale) for detections, scale in zip(batch, scales)]
+
+    @staticmethod
+    def _rescale(detections, scale):
+        if scale == 1.0:
+            return detections
+        for detection in detections:
+            detection['box'] = [int(round(v / scale)) for v in detection['box']]
+            detection['keypoints'] = {
+                name: (int(round(px / scale)), int(round(py / scale)))
+                for name, (px, py) in detection.get('keypoints', {}).items()
+            }
+        return detections
+
+
+class OpticalFlowTracker:
+    """Rastreador mínimo por fluxo óptico Lucas-Kanade, disponível em qualquer build do OpenCV.
+
+    Segue pontos de canto dentro da caixa e a desloca/escala pela mediana do movimento.
+    """
+
+    def init(self, frame_bgr, box):
+        self._prev_gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        self._box = np.array(box, dtype=np.float32)
+        self._points = self._find_points(self._prev_gray, box)
+
+    def _find_points(self, gray, box):
+        x, y, w, h = [int(v) for v in box]
+        mask = np.zeros_like(gray)
+        mask[max(0, y):y+h, max(0, x):x+w] = 255
+        return cv2.goodFeaturesToTrack(gray, maxCorners=60, qualityLevel=0.01, minDistance=5, mask=mask)
+
+    def update(self, frame_bgr):
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        if self._points is None or len(self._points) < MIN_FLOW_POINTS:
+            return False, None
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self._points, None)
+        good = status.reshape(-1) == 1
+        old, new = self._points.reshape(-1, 2)[good], new_points.reshape(-1, 2)[good]
+        if len(new) < MIN_FLOW_POINTS:
+            return False, None
+
+        dx, dy = np.median(new - old, axis=0)
+        old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1)
+        new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1)
+        valid = old_spread > 1e-3
+        scale = float(np.median(new_spread[valid] / old_spread[valid])) if valid.any() else 1.0
+
+        x, y, w, h = self._box
+        cx, cy = x + w / 2 + dx, y + h / 2 + dy
+        w, h = w * scale, h * scale
+        self._box = np.array([cx - w / 2, cy - h / 2, w, h], dtype=np.float32)
+        self._prev_gray = gray
+        self._points = new.reshape(-1, 1, 2)
+        return True, tuple(self._box)
+
+
+def create_tracker(tracker_type=TRACKER_TYPE):
+    """Cria o rastreador pedido, caindo para o fluxo óptico se o OpenCV não tiver o contrib."""
+    factories = {
+        'csrt': ['TrackerCSRT_create'],
+        'kcf': ['TrackerKCF_create'],
+        'auto': ['TrackerKCF_create', 'TrackerCSRT_create'],
+    }
+    for name in factories.get(tracker_type, []):
+        for namespace in (cv2, getattr(cv2, 'legacy', None)):
+            if namespace is not None and hasattr(namespace, name):
+                return getattr(namespace, name)()
+    return OpticalFlowTracker()
+
+
+class FaceLocalizer:
+    """Localiza o rosto principal frame a frame combinando detecção e rastreamento.
+
+    Deve receber os frames analisados em ordem (BGR). Use `reset()` ao trocar de vídeo.
+    """
+
+    def __init__(self, face_detector, redetect_interval=REDETECT_INTERVAL, tracker_type=TRACKER_TYPE,
+                 max_side=DETECTION_MAX_SIDE):
+        self.frontend = DetectionFrontend(face_detector, max_side)
+        self.redetect_interval = max(1, redetect_interval)
+        self.tracker_type = tracker_type
+        self.stats = {'frames': 0, 'detector_calls': 0, 'tracked_frames': 0, 'tracker_lost': 0}
+        self.reset()
+
+    def reset(self):
+        self._tracker = None
+        self._frames_since_detection = 0
+
+    def detect(self, frame_bgr):
+        """Detecção completa; (re)inicia o rastreador no rosto encontrado."""
+        self.stats['detector_calls'] += 1
+        self._frames_since_detection = 0
+        box = main_face_box(self.frontend.detect(frame_bgr))
+        if box is not None:
+            box = clamp_box(box, frame_bgr.shape[1], frame_bgr.shape[0])
+        self._tracker = None
+        if box is not None and self.redetect_interval > 1:
+            self._tracker = create_tracker(self.tracker_type)
+            self._tracker.init(frame_bgr, tuple(box))
+        return box
+
+    def locate(self, frame_bgr):
+        """Retorna a caixa (x, y, w, h) do rosto principal no frame, ou None."""
+        self.stats['frames'] += 1
+        self._frames_since_detection += 1
+        if self._tracker is None or self._frames_since_detection >= self.redetect_interval:
+            return self.detect(frame_bgr)
+
+        ok, box = self._tracker.update(frame_bgr)
+        box = clamp_box(box, frame_bgr.shape[1], frame_bgr.shape[0]) if ok else None
+        if box is None:
+            self.stats['tracker_lost'] += 1
+            return self.detect(frame_bgr)
+        self.stats['tracked_frames'] += 1
+        return box
+
+
+class MultiFaceLocalizer:
+    """Localiza todos os rostos do frame e atribui a cada um uma identidade estável.
+
+    Nas detecções completas, cada caixa continua a identidade cuja última caixa mais se
+    sobrepõe a ela (IoU >= iou_threshold, associação gulosa); as que sobram abrem
+    identidades novas. Entre detecções, cada rosto segue com o seu rastreador; se um deles
+    se perder, o frame é detectado de novo. Deve receber os frames analisados em ordem.
+    """
+
+    def __init__(self, face_detector, redetect_interval=REDETECT_INTERVAL, tracker_type=TRACKER_TYPE,
+                 max_side=DETECTION_MAX_SIDE, min_size=MIN_FACE_SIZE, min_confidence=MIN_FACE_CONFIDENCE,
+                 max_faces=MAX_FACES_PER_FRAME, iou_threshold=IDENTITY_IOU, max_missed=IDENTITY_MAX_MISSED):
+        self.frontend = DetectionFrontend(face_detector, max_side)
+        self.redetect_interval = max(1, redetect_interval)
+        self.tracker_type = tracker_type
+        self.min_size = min_size
+        self.min_confidence = min_confidence
+        self.max_faces = max_faces
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.stats = {'frames': 0, 'detector_calls': 0, 'tracked_frames': 0, 'tracker_lost': 0, 'identities': 0}
+        self.reset()
+
+    def reset(self):
+        self._tracks = {}  # identidade -> {'box', 'missed', 'tracker'}
+        self._next_identity = 0
+        self._frames_since_detection = 0
+
+    def detect(self, frame_bgr):
+        """Detecção completa e associação às identidades. Retorna [(identidade, caixa)]."""
+        self.stats['detector_calls'] += 1
+        self._frames_since_detection = 0
+        height, width = frame_bgr.shape[:2]
+        boxes = select_faces(self.frontend.detect(frame_bgr), width, height,
+                             self.min_size, self.min_confidence, self.max_faces)
+
+        pairs = sorted(((box_iou(track['box'], box), identity, i)
+                        for identity, track in self._tracks.items() for i, box in enumerate(boxes)), reverse=True)
+        assigned, matched = {}, set()
+        for overlap, identity, i in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if identity not in matched and i not in assigned:
+                assigned[i] = identity
+                matched.add(identity)
+        for identity in list(self._tracks):
+            if identity not in matched:
+                self._tracks[identity]['missed'] += 1
+                if self._tracks[identity]['missed'] > self.max_missed:
+                    del self._tracks[identity]
+
+        faces = []
+        for i, box in enumerate(boxes):
+            identity = assigned.get(i)
+            if identity is None:
+                identity = self._next_identity
+                self._next_identity += 1
+                self.stats['identities'] += 1
+            tracker = None
+            if self.redetect_interval > 1:
+                tracker = create_tracker(self.tracker_type)
+                tracker.init(frame_bgr, tuple(box))
+            self._tracks[identity] = {'box': box, 'missed': 0, 'tracker': tracker}
+            faces.append((identity, box))
+        return faces
+
+    def locate_all(self, frame_bgr):
+        """Retorna [(identidade, caixa)] dos rostos no frame (lista vazia se não houver)."""
+        self.stats['frames'] += 1
+        self._frames_since_detection += 1
+        visible = [(identity, track) for identity, track in self._tracks.items() if track['missed'] == 0]
+        if not visible or self._frames_since_detection >= self.redetect_interval:
+            return self.detect(frame_bgr)
+
+        faces = []
+        for identity, track in visible:
+            ok, box = track['tracker'].update(frame_bgr)
+            box = clamp_box(box, frame_bgr.shape[1], frame_bgr.shape[0]) if ok else None
+            if box is None:
+                self.stats['tracker_lost'] += 1
+                return self.detect(frame_bgr)
+            track['box'] = box
+            faces.append((identity, box))
+        self.stats['tracked_frames'] += 1
+        return faces
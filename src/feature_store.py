@@ -0,0 +1,164 @@
+# src/feature_store.py
+# Cache de embeddings para treinar só a cabeça do classificador (train_final_model.py --head-only).
+# O backbone congelado (tudo até o último pooling global) roda uma única vez por imagem; os vetores
+# ficam num arquivo float16 mapeado em memória e um índice SQLite liga o hash do conteúdo de cada
+# arquivo à sua linha. Numa nova execução, só as imagens novas ou alteradas passam pelo backbone.
+#
+#   <pasta>/features.f16    (capacidade, dimensão) float16
+#   <pasta>/index.sqlite    hash do arquivo -> linha, e a identidade do backbone
+
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+import tensorflow as tf
+from tqdm import tqdm
+
+import input_pipeline
+from prediction_cache import file_content_hash, model_identity
+
+# --- CONFIGURAÇÕES ---
+FEATURE_STORE_DIR = 'data/feature_store'
+EXTRACT_BATCH_SIZE = 64  # Imagens por chamada ao backbone
+GROW_ROWS = 8192         # Linhas acrescentadas ao arquivo de features quando ele enche
+COMMIT_EVERY = 2048      # Features gravadas antes de cada gravação do índice no disco
+# --------------------
+
+POOLING_LAYERS = (tf.keras.layers.GlobalAveragePooling2D, tf.keras.layers.GlobalMaxPooling2D)
+
+
+def split_model(model):
+    """Separa o classificador em backbone (entrada -> último pooling global) e cabeça.
+
+    A cabeça é um modelo novo que reaproveita as mesmas camadas (e pesos) do original:
+    treiná-la atualiza `model`, que pode ser salvo inteiro depois. Retorna (backbone, cabeça).
+    """
+    pool_idx = max((i for i, layer in enumerate(model.layers) if isinstance(layer, POOLING_LAYERS)), default=None)
+    if pool_idx is None:
+        raise ValueError("O modelo não tem uma camada de pooling global para separar o backbone.")
+    pool = model.layers[pool_idx]
+    head_layers = model.layers[pool_idx + 1:]
+    previous = pool
+    for layer in head_layers:
+        if layer.input is not previous.output:
+            raise ValueError(f"A cabeça do modelo precisa ser uma sequência simples de camadas ('{layer.name}' não é).")
+        previous = layer
+
+    backbone = tf.keras.Model(model.input, pool.output, name='backbone')
+    inputs = tf.keras.Input(shape=pool.output.shape[1:], name='features')
+    x = inputs
+    for layer in head_layers:
+        x = layer(x)
+    return backbone, tf.keras.Model(inputs, x, name='head')
+
+
+def backbone_identity(model_path, backbone):
+    """Identidade do backbone: o arquivo do modelo de origem e a camada onde ele foi cortado."""
+    key = f"{model_identity(model_path)}|{backbone.output.name}|{tuple(backbone.input.shape[1:])}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class FeatureStore:
+    """Features float16 por hash do conteúdo do arquivo, válidas para uma identidade de backbone."""
+
+    def __init__(self, store_dir, backbone_id, feature_dim, grow_rows=GROW_ROWS):
+        self.feature_dim = feature_dim
+        self.grow_rows = grow_rows
+        self._features_path = os.path.join(store_dir, 'features.f16')
+        self._features = None
+        self._pending = 0
+        os.makedirs(store_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(store_dir, 'index.sqlite'))
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (content_hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        expected = {'backbone_id': backbone_id, 'feature_dim': str(feature_dim)}
+        if meta != expected:
+            if meta:
+                print("Backbone diferente do usado no cache de features; o cache será refeito.")
+            self._db.execute("DELETE FROM rows")
+            self._db.execute("DELETE FROM meta")
+            self._db.executemany("INSERT INTO meta VALUES (?, ?)", expected.items())
+            self._db.commit()
+            if os.path.exists(self._features_path):
+                os.remove(self._features_path)
+        self.count = self._db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+        self._ensure_capacity(self.count)
+
+    def _ensure_capacity(self, rows):
+        if self._features is not None:
+            if rows <= len(self._features):
+                return
+            self._features.flush()
+        capacity = os.path.getsize(self._features_path) // (2 * self.feature_dim) if os.path.exists(self._features_path) else 0
+        if rows > capacity or capacity == 0:
+            capacity = rows + self.grow_rows
+            with open(self._features_path, 'ab') as f:
+                f.truncate(capacity * self.feature_dim * 2)  # Cresce o arquivo sem reescrever o que já existe
+        self._features = np.memmap(self._features_path, dtype=np.float16, mode='r+', shape=(capacity, self.feature_dim))
+
+    def missing(self, hashes):
+        """Hashes (sem repetição, na ordem dada) que ainda não estão no cache."""
+        unique = list(dict.fromkeys(hashes))
+        known = set()
+        for start in range(0, len(unique), 500):  # Limite de parâmetros por consulta do SQLite
+            chunk = unique[start:start + 500]
+            known.update(row[0] for row in self._db.execute(
+                f"SELECT content_hash FROM rows WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk))
+        return [h for h in unique if h not in known]
+
+    def add(self, hashes, features):
+        """Acrescenta as features (N, dimensão) dos hashes."""
+        self._ensure_capacity(self.count + len(hashes))
+        self._features[self.count:self.count + len(hashes)] = features
+        self._db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?)",
+                             [(h, self.count + i) for i, h in enumerate(hashes)])
+        self.count += len(hashes)
+        self._pending += len(hashes)
+        if self._pending >= COMMIT_EVERY:
+            self.flush()
+
+    def get(self, hashes):
+        """Features float16 (N, dimensão) na ordem dos hashes. Todos precisam estar no cache."""
+        rows = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows.update(self._db.execute(
+                f"SELECT content_hash, row FROM rows WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk))
+        return np.asarray(self._features[np.array([rows[h] for h in hashes], dtype=np.int64)])
+
+    def flush(self):
+        # Features antes do índice: uma linha indexada sempre aponta para dados já gravados
+        self._features.flush()
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def extract_features(store, backbone, paths, batch_size=EXTRACT_BATCH_SIZE):
+    """Features das imagens `paths`, rodando o backbone só nas que ainda não estão no cache.
+
+    Retorna (features float16 (N, dimensão), número de imagens que passaram pelo backbone).
+    """
+    hashes = [file_content_hash(path) for path in tqdm(paths, desc="Hash dos arquivos")]
+    pending = store.missing(hashes)
+    if pending:
+        path_of = dict(zip(hashes, paths))
+        img_height, img_width = backbone.input.shape[1:3]
+        dataset = tf.data.Dataset.from_tensor_slices([path_of[h] for h in pending])
+        dataset = dataset.map(lambda path: input_pipeline.load_image(path, img_height, img_width),
+                              num_parallel_calls=input_pipeline.NUM_PARALLEL_CALLS)
+        dataset = dataset.batch(batch_size).map(tf.keras.applications.efficientnet.preprocess_input)
+        predict = tf.function(lambda batch: backbone(batch, training=False))
+        done = 0
+        for batch in tqdm(dataset.prefetch(tf.data.AUTOTUNE), total=-(-len(pending) // batch_size), desc="Backbone"):
+            features = predict(batch).numpy().astype(np.float16)
+            store.add(pending[done:done + len(features)], features)
+            done += len(features)
+        store.flush()
+    return store.get(hashes), len(pending)
@@ -0,0 +1,137 @@
+# src/frame_sampling.py
+# Acesso a frames fora de ordem (seek ou grab, o que for mais barato), a ordem de amostragem
+# "do grosso para o fino" da análise adaptativa de vídeo e o planejador de frames espalhados
+# (uniforme ou por cena) da extração de rostos.
+
+import cv2
+import numpy as np
+
+# --- CONFIGURAÇÕES ---
+SEEK_MIN_GAP = 48  # Saltos para frente maiores que isso usam seek; menores avançam com grab()
+PROBE_SECONDS = 0.5            # Intervalo entre as miniaturas usadas para encontrar cortes de cena
+SCENE_CHANGE_THRESHOLD = 12.0  # Diferença média (0-255) entre miniaturas vizinhas que indica um corte
+# --------------------
+
+
+class FrameReader:
+    """Lê frames de um cv2.VideoCapture pelo índice, contando o custo de cada acesso.
+
+    Para saltos curtos para frente, `grab()` avança sem entregar o frame; para saltos longos
+    ou para trás, o decodificador é reposicionado (seek). `stats['decoded']` conta os frames
+    efetivamente entregues, `grabbed` os pulados e `seeks` os reposicionamentos.
+    """
+
+    def __init__(self, cap, seek_min_gap=SEEK_MIN_GAP):
+        self.cap = cap
+        self.seek_min_gap = seek_min_gap
+        self.position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))  # Frame que o próximo cap.read() devolveria
+        self.end = None  # Primeiro índice além do fim real do vídeo, quando já encontrado
+        self.stats = {'decoded': 0, 'grabbed': 0, 'seeks': 0}
+
+    def read(self, frame_idx):
+        """Frame BGR de índice `frame_idx`, ou None se ele não existir."""
+        if self.end is not None and frame_idx >= self.end:
+            return None
+        gap = frame_idx - self.position
+        if gap < 0 or gap > self.seek_min_gap:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            self.position = frame_idx
+            self.stats['seeks'] += 1
+        else:
+            for _ in range(gap):
+                if not self.cap.grab():
+                    self.end = self.position  # A contagem de frames do contêiner pode passar do fim real
+                    return None
+                self.position += 1
+                self.stats['grabbed'] += 1
+        ret, frame = self.cap.read()
+        if not ret:
+            self.end = self.position
+            return None
+        self.position += 1
+        self.stats['decoded'] += 1
+        return frame
+
+
+def coarse_to_fine_passes(total_frames, min_stride, initial_stride, seek_min_gap=SEEK_MIN_GAP):
+    """Gera as listas de índices de cada passada, do espaçamento `initial_stride` até `min_stride`.
+
+    Cada passada só traz frames novos, no meio dos já amostrados; a união de todas as
+    passadas é range(0, total_frames, min_stride), a mesma amostragem do modo fixo.
+    Uma passada só fica separada enquanto seus frames estão tão afastados que o FrameReader
+    os lê com seek; a partir da primeira que precisaria de grab() (que percorre o vídeo
+    inteiro), ela e todas as mais finas viram uma única passada em ordem, lida numa varredura
+    só. Assim, sem parada antecipada, o custo fica perto do modo fixo mais os seeks iniciais.
+    """
+    stride = max(1, min_stride)
+    while stride * 2 <= initial_stride:
+        stride *= 2
+    spacing = stride  # Distância entre frames vizinhos da passada
+    passes = [(list(range(0, total_frames, stride)), spacing)]
+    while stride > min_stride:
+        stride //= 2
+        spacing = 2 * stride
+        passes.append((list(range(stride, total_frames, spacing)), spacing))
+    for idx, (frame_indices, spacing) in enumerate(passes):
+        if spacing - 1 <= seek_min_gap:  # Mesma regra do FrameReader.read: salto curto avança com grab()
+            yield sorted(index for rest, _ in passes[idx:] for index in rest)
+            return
+        yield frame_indices
+
+
+def uniform_frames(total_frames, k):
+    """Até K índices, cada um no centro de um de K trechos iguais do vídeo."""
+    if total_frames <= 0 or k <= 0:
+        return []
+    return sorted({int((i + 0.5) * total_frames / k) for i in range(min(k, total_frames))})
+
+
+def fallback_frames(total_frames, k, rounds=2):
+    """Candidatos extras para quando um frame planejado não rende rosto: grades de 2K, 4K, ... frames."""
+    for r in range(1, rounds + 1):
+        yield from uniform_frames(total_frames, k * 2 ** r)
+
+
+def scene_change_frames(cap, total_frames, fps, k, probe_seconds=PROBE_SECONDS, threshold=SCENE_CHANGE_THRESHOLD):
+    """Até K índices espalhados pelas cenas do vídeo. Retorna (índices, custo da sondagem).
+
+    Compara miniaturas 32x32 tiradas a cada `probe_seconds`; as K-1 maiores diferenças acima
+    de `threshold` viram cortes. Trechos que sobram são divididos ao meio (os maiores primeiro)
+    até haver K trechos, e cada frame escolhido é o centro de um trecho.
+    """
+    reader = FrameReader(cap)
+    stride = max(1, int(round((fps or 30) * probe_seconds)))
+    probes, thumbs = [], []
+    for frame_idx in range(0, total_frames, stride):
+        frame = reader.read(frame_idx)
+        if frame is None:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumbs.append(cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32))
+        probes.append(frame_idx)
+
+    diffs = [float(np.mean(np.abs(thumbs[i] - thumbs[i - 1]))) for i in range(1, len(thumbs))]
+    strongest = sorted((i for i, d in enumerate(diffs) if d > threshold), key=lambda i: diffs[i], reverse=True)
+    cuts = sorted(probes[i + 1] for i in strongest[:max(0, k - 1)])
+    bounds = [0] + cuts + [total_frames]
+    segments = [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    while segments and len(segments) < min(k, total_frames):
+        start, end = max(segments, key=lambda seg: seg[1] - seg[0])
+        if end - start < 2:
+            break
+        middle = (start + end) // 2
+        segments.remove((start, end))
+        segments += [(start, middle), (middle, end)]
+    return sorted((start + end) // 2 for start, end in segments), reader.stats
+
+
+def plan_sample_frames(cap, k, mode='uniform'):
+    """Escolhe até K frames espalhados pelo vídeo a partir da contagem de frames e do FPS.
+
+    `mode`: 'uniform' (centros de K trechos iguais, sem decodificar nada) ou 'scene'
+    (um frame por cena, ao custo de sondar o vídeo). Retorna (índices, custo da sondagem).
+    """
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if mode == 'scene':
+        return scene_change_frames(cap, total_frames, cap.get(cv2.CAP_PROP_FPS), k)
+    return uniform_frames(total_frames, k), {'decoded': 0, 'grabbed': 0, 'seeks': 0}
@@ -1,13 +1,20 @@
 
 
 import os
+import io
 import hashlib
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlparse
+import numpy as np
 from PIL import Image
-from urllib.parse import urljoin
 import requests
 from bs4 import BeautifulSoup
 from github import Github, RateLimitExceededException
+import perceptual_hash
+from hash_store import HashStore
 
 
 
@@ -21,66 +28,180 @@ SEARCH_QUERIES = [
 
 OUTPUT_FOLDER = 'data/unlabeled_images'
 
-HASH_FILE = 'data/image_hashes.txt'
+HASH_FILE = 'data/image_hashes.txt'  # Formato antigo (só MD5); importado uma vez para o banco abaixo
 
+HASH_DB = 'data/image_hashes.sqlite'
 
-def calculate_hash(image_path):
-    """Calcula o hash de uma imagem para identificá-la."""
+# --- DOWNLOAD ---
+RAW_BASE_URL = "https://raw.githubusercontent.com"  # Trocável por um servidor local nos testes
+DOWNLOAD_WORKERS = 16     # Downloads simultâneos no total
+MAX_PER_HOST = 4          # Downloads simultâneos por host
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0     # Espera base (dobra a cada tentativa) quando o servidor não informa Retry-After
+REQUEST_TIMEOUT = 30
+USER_AGENT = 'Mozilla/5.0'
+
+
+def calculate_hashes(image_bytes):
+    """Retorna (hash exato, dHash) da imagem em memória, ou None se ela não puder ser lida."""
     try:
-        with Image.open(image_path) as img:
-            img = img.convert("L").resize((128, 128))
-            return hashlib.md5(img.tobytes()).hexdigest()
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            gray = img.convert("L")
+            exact = hashlib.md5(gray.resize((128, 128)).tobytes()).hexdigest()
+            return exact, perceptual_hash.dhash(np.asarray(gray))
     except Exception:
         return None
 
 def load_existing_hashes():
-    """Carrega os hashes de imagens que já temos."""
-    if not os.path.exists(HASH_FILE):
-        return set()
-    with open(HASH_FILE, 'r') as f:
-        return set(f.read().splitlines())
-
-def save_new_hash(new_hash):
-    """Adiciona um novo hash ao nosso banco de dados."""
-    with open(HASH_FILE, 'a') as f:
-        f.write(new_hash + '\n')
-
-def scrape_repo_page(repo_url, existing_hashes):
-    """Raspa uma página de repositório para encontrar e baixar imagens novas."""
-    print(f"  ⛏️  Minerando repositório: {repo_url}")
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    new_count, duplicate_count = 0, 0
-    try:
-        response = requests.get(repo_url, headers=headers)
+    """Abre o banco de hashes das imagens que já temos (sem carregá-lo na memória)."""
+    store = HashStore(HASH_DB)
+    imported = store.import_legacy_file(HASH_FILE)
+    if imported:
+        print(f"  {imported} hashes importados de '{HASH_FILE}'.")
+    return store
+
+def create_session(pool_size=DOWNLOAD_WORKERS):
+    """Sessão HTTP com conexões reaproveitadas (keep-alive) entre as threads de download."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+class HostLimiter:
+    """Limita os downloads simultâneos por host e pausa o host inteiro quando ele pede (rate limit)."""
+
+    def __init__(self, max_per_host=MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._blocked_until = {}
+
+    def semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.max_per_host)
+            return self._semaphores[host]
+
+    def block(self, host, seconds):
+        with self._lock:
+            self._blocked_until[host] = max(self._blocked_until.get(host, 0.0), time.monotonic() + seconds)
+
+    def wait(self, host):
+        while True:
+            with self._lock:
+                delay = self._blocked_until.get(host, 0.0) - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+def retry_delay(response, attempt):
+    """Segundos a esperar antes de repetir: Retry-After, X-RateLimit-Reset ou backoff exponencial."""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = response.headers.get('X-RateLimit-Reset')
+    if reset and response.headers.get('X-RateLimit-Remaining') == '0':
+        return max(0.0, float(reset) - time.time())
+    return BACKOFF_SECONDS * 2 ** attempt
+
+def is_rate_limited(response):
+    if response.status_code in (429, 503):
+        return True
+    return response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') == '0'
+
+def fetch(session, limiter, url):
+    """Baixa uma URL respeitando o limite por host e repetindo quando o servidor pede para esperar."""
+    host = urlparse(url).netloc
+    semaphore = limiter.semaphore(host)
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.wait(host)
+        with semaphore:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        if is_rate_limited(response) and attempt < MAX_RETRIES:
+            limiter.block(host, retry_delay(response, attempt))
+            continue
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        for link in soup.find_all('a', class_='Link--primary'):
-            href = link.get('href')
-            if href and (href.endswith(('.png', '.jpg', '.jpeg'))):
-                raw_url = urljoin("https://raw.githubusercontent.com", href.replace('/blob', ''))
-                img_name = os.path.basename(raw_url).split('?')[0]
-                img_path = os.path.join(OUTPUT_FOLDER, img_name)
-                
-                img_data = requests.get(raw_url, headers=headers).content
-                with open(img_path, 'wb') as f:
-                    f.write(img_data)
-                
-                img_hash = calculate_hash(img_path)
-                if img_hash:
-                    if img_hash in existing_hashes:
-                        os.remove(img_path)
-                        duplicate_count += 1
+        return response.content
+
+def find_image_urls(page_html):
+    """URLs "raw" das imagens listadas numa página de repositório."""
+    soup = BeautifulSoup(page_html, 'html.parser')
+    urls = []
+    for link in soup.find_all('a', class_='Link--primary'):
+        href = link.get('href')
+        if href and (href.endswith(('.png', '.jpg', '.jpeg'))):
+            urls.append(urljoin(RAW_BASE_URL, href.replace('/blob', '')))
+    return urls
+
+def download_and_hash(session, limiter, url):
+    """Roda nas threads: baixa a imagem e calcula os hashes sem tocar no disco."""
+    data = fetch(session, limiter, url)
+    return data, calculate_hashes(data)
+
+def mine_repositories(repo_urls, existing_hashes, session=None, workers=DOWNLOAD_WORKERS, max_per_host=MAX_PER_HOST):
+    """Raspa as páginas e baixa as imagens novas de todos os repositórios em paralelo.
+
+    Só as imagens que não são duplicatas (exatas ou quase) são gravadas em OUTPUT_FOLDER.
+    A consulta e a atualização do banco de hashes acontecem nesta thread.
+    Retorna o total de imagens novas.
+    """
+    session = session or create_session(workers)
+    limiter = HostLimiter(max_per_host)
+    counts = {url: {'new': 0, 'duplicate': 0, 'pending': 0} for url in repo_urls}
+    total_new = 0
+
+    def repo_done(repo_url):
+        c = counts[repo_url]
+        print(f"  ⛏️  {repo_url} -> Concluído. Novas imagens: {c['new']} | Duplicatas ignoradas: {c['duplicate']}")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, session, limiter, url): ('page', url, None) for url in repo_urls}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, repo_url, img_url = futures.pop(future)
+                c = counts[repo_url]
+                if kind == 'page':
+                    try:
+                        image_urls = find_image_urls(future.result())
+                    except Exception as e:
+                        print(f"    -> [AVISO] Falha ao minerar {repo_url}. Erro: {e}")
+                        continue
+                    c['pending'] = len(image_urls)
+                    for url in image_urls:
+                        futures[pool.submit(download_and_hash, session, limiter, url)] = ('image', repo_url, url)
+                    if not image_urls:
+                        repo_done(repo_url)
+                    continue
+
+                c['pending'] -= 1
+                try:
+                    img_data, hashes = future.result()
+                except Exception as e:
+                    print(f"    -> [AVISO] Falha ao baixar {img_url}. Erro: {e}")
+                    hashes = None
+                if hashes:
+                    # Rejeita cópias exatas e quase-duplicatas (recompressões, redimensionamentos)
+                    if existing_hashes.is_duplicate(*hashes):
+                        c['duplicate'] += 1
                     else:
-                        existing_hashes.add(img_hash)
-                        save_new_hash(img_hash)
-                        new_count += 1
-        
-        print(f"    -> Concluído. Novas imagens: {new_count} | Duplicatas ignoradas: {duplicate_count}")
-        return new_count
-    except Exception as e:
-        print(f"    -> [AVISO] Falha ao minerar {repo_url}. Erro: {e}")
-        return 0
+                        img_name = os.path.basename(img_url).split('?')[0]
+                        with open(os.path.join(OUTPUT_FOLDER, img_name), 'wb') as f:
+                            f.write(img_data)
+                        existing_hashes.add(*hashes)
+                        c['new'] += 1
+                        total_new += 1
+                if c['pending'] == 0:
+                    repo_done(repo_url)
+    return total_new
 
 def main():
     """Função principal que orquestra a descoberta e a mineração."""
@@ -120,10 +241,10 @@ def main():
     print("---")
     print(f"⛏️  Etapa 2: Iniciando a mineração em cada fonte...")
     
-    total_new_images = 0
-    for repo_url in discovered_repos:
-        total_new_images += scrape_repo_page(repo_url, existing_hashes)
-        time.sleep(2) 
+    try:
+        total_new_images = mine_repositories(sorted(discovered_repos), existing_hashes)
+    finally:
+        existing_hashes.close()
 
     print("\n--- RELATÓRIO FINAL DA MINERAÇÃO ---")
     print(f"Total de novas imagens únicas coletadas nesta execução: {total_new_images}")
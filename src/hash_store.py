@@ -0,0 +1,112 @@
+# src/hash_store.py
+# Banco dos hashes das imagens já coletadas pelo github_miner.py. Guarda o hash exato (MD5 da
+# miniatura 128x128 em tons de cinza, o mesmo do antigo data/image_hashes.txt) e o dHash de
+# 64 bits, em SQLite com um índice por faixa de bits: abrir o banco não carrega nada na memória
+# e cada consulta (exata ou por quase-duplicata) usa só os índices.
+
+import os
+import sqlite3
+
+import perceptual_hash
+
+# --- CONFIGURAÇÕES ---
+DB_PATH = 'data/image_hashes.sqlite'
+COMMIT_EVERY = 500  # Hashes novos acumulados antes de cada gravação no disco
+HAMMING_RADIUS = perceptual_hash.HAMMING_RADIUS  # Fixado no banco quando ele é criado
+# --------------------
+
+
+class HashStore:
+    """Conjunto persistente de imagens conhecidas, com busca exata e por quase-duplicata."""
+
+    def __init__(self, db_path=DB_PATH, radius=HAMMING_RADIUS):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # Com WAL, continua seguro contra corrupção
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'radius'").fetchone()
+        if row is None:
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('radius', ?)", (str(radius),))
+        else:
+            radius = int(row[0])  # As faixas indexadas dependem do raio usado na criação
+        self.radius = radius
+        self._bands = [f"band{i}" for i in range(radius + 1)]
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS hashes (md5 TEXT PRIMARY KEY, dhash INTEGER,"
+            f" {', '.join(f'{band} INTEGER' for band in self._bands)})"
+        )
+        columns = [column[1] for column in self._db.execute("PRAGMA table_info(hashes)")]
+        if 'phash' in columns:  # Bancos antigos chamavam a coluna do dHash de 'phash'
+            self._db.execute("ALTER TABLE hashes RENAME COLUMN phash TO dhash")
+        for band in self._bands:
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{band} ON hashes ({band})")
+        self._db.commit()
+        self._pending = {}  # md5 -> dhash ainda não gravados
+
+    def contains(self, md5):
+        if md5 in self._pending:
+            return True
+        return self._db.execute("SELECT 1 FROM hashes WHERE md5 = ?", (md5,)).fetchone() is not None
+
+    def find_near_duplicate(self, dhash):
+        """MD5 de uma imagem conhecida a distância de Hamming <= radius do dHash, ou None."""
+        for md5, known in self._pending.items():
+            if known is not None and (known ^ dhash).bit_count() <= self.radius:
+                return md5
+        bands = perceptual_hash.hash_bands(dhash, self.radius)
+        query = " UNION ALL ".join(f"SELECT md5, dhash FROM hashes WHERE {band} = ?" for band in self._bands)
+        for md5, known in self._db.execute(query, bands):
+            if (perceptual_hash.to_unsigned(known) ^ dhash).bit_count() <= self.radius:
+                return md5
+        return None
+
+    def is_duplicate(self, md5, dhash=None):
+        return self.contains(md5) or (dhash is not None and self.find_near_duplicate(dhash) is not None)
+
+    def add(self, md5, dhash=None):
+        self._pending[md5] = dhash
+        if len(self._pending) >= COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        rows = []
+        for md5, dhash in self._pending.items():
+            if dhash is None:
+                rows.append((md5, None, *[None] * len(self._bands)))
+            else:
+                rows.append((md5, perceptual_hash.to_signed(dhash), *perceptual_hash.hash_bands(dhash, self.radius)))
+        self._db.executemany(
+            f"INSERT OR IGNORE INTO hashes (md5, dhash, {', '.join(self._bands)})"
+            f" VALUES ({', '.join('?' * (2 + len(self._bands)))})", rows
+        )
+        self._db.commit()
+        self._pending.clear()
+
+    def import_legacy_file(self, hash_file):
+        """Importa (uma única vez) os MD5 do antigo arquivo de texto. Retorna quantos foram lidos."""
+        if not os.path.exists(hash_file):
+            return 0
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return 0
+        count = 0
+        with open(hash_file, 'r') as f:
+            for line in f:
+                md5 = line.strip()
+                if md5:
+                    self.add(md5)
+                    count += 1
+        self.flush()
+        self._db.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (hash_file,))
+        self._db.commit()
+        return count
+
+    def count(self):
+        return self._db.execute("SELECT COUNT(*) FROM hashes").fetchone()[0] + len(self._pending)
+
+    def close(self):
+        self.flush()
+        self._db.close()
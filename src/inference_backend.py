@@ -0,0 +1,198 @@
+# src/inference_backend.py
+# Backends de inferência do classificador: o modelo Keras original (float32) ou as versões
+# exportadas por export_model.py (TFLite float16/int8 ou ONNX). Todos recebem o lote já
+# pré-processado (N, H, W, 3) float32 e devolvem a probabilidade de REAL de cada rosto.
+# O Grad-CAM precisa dos gradientes, então continua usando o modelo Keras (carregado sob demanda).
+# O TensorFlow só é importado quando um backend precisa dele.
+
+import os
+import threading
+
+import numpy as np
+
+from startup_profile import timed_import
+
+# --- CONFIGURAÇÕES ---
+BACKEND = 'keras'     # 'keras', 'tflite_fp16', 'tflite_int8' ou 'onnx'
+INTRA_OP_THREADS = 0  # Threads dentro de cada operação (0 = padrão da biblioteca: todos os núcleos)
+INTER_OP_THREADS = 0  # Operações independentes executadas em paralelo (0 = padrão da biblioteca)
+# --------------------
+
+# Sufixo do arquivo exportado de cada backend, relativo ao .keras de origem
+EXPORT_SUFFIXES = {
+    'tflite_fp16': '_fp16.tflite',
+    'tflite_int8': '_int8.tflite',
+    'onnx': '.onnx',
+}
+
+
+def exported_model_path(keras_path, backend):
+    """Caminho do modelo exportado para `backend` (o próprio .keras para 'keras')."""
+    if backend == 'keras':
+        return keras_path
+    if backend not in EXPORT_SUFFIXES:
+        raise ValueError(f"Backend desconhecido: {backend}")
+    return os.path.splitext(keras_path)[0] + EXPORT_SUFFIXES[backend]
+
+
+def configure_threads(intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
+    """Fixa os pools de threads do TensorFlow. Só tem efeito antes da primeira operação do runtime."""
+    tf = timed_import('tensorflow')
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        print("Aviso: o TensorFlow já foi inicializado; a configuração de threads foi ignorada.")
+
+
+class KerasBackend:
+    """O modelo Keras em float32, com a predição compilada (tf.function) uma única vez."""
+
+    name = 'keras'
+
+    def __init__(self, model):
+        tf = timed_import('tensorflow')
+        self.keras_model = model
+        self.model_path = None
+        self._predict = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[tf.TensorSpec([None, *model.inputs[0].shape[1:]], tf.float32)],
+        )
+
+    def predict(self, batch):
+        return self._predict(np.asarray(batch, dtype=np.float32)).numpy()[:, 0]
+
+
+class _ExportedBackend:
+    """Base dos backends exportados: o modelo Keras só é carregado se alguém pedir (Grad-CAM)."""
+
+    def __init__(self, model_path, keras_path=None):
+        self.model_path = model_path
+        self.keras_path = keras_path
+        self._keras_model = None
+
+    @property
+    def keras_model(self):
+        if self._keras_model is None:
+            if not self.keras_path:
+                raise ValueError(f"O backend {self.name} não tem um modelo Keras associado.")
+            self._keras_model = timed_import('tensorflow').keras.models.load_model(self.keras_path)
+        return self._keras_model
+
+
+class TFLiteBackend(_ExportedBackend):
+    """Interpretador TFLite (XNNPACK na CPU). Aceita modelos float16 e int8, com entrada float ou quantizada."""
+
+    def __init__(self, model_path, keras_path=None, num_threads=INTRA_OP_THREADS):
+        super().__init__(model_path, keras_path)
+        self.name = 'tflite_int8' if model_path.endswith(EXPORT_SUFFIXES['tflite_int8']) else 'tflite_fp16'
+        self.interpreter = tflite_interpreter_class()(model_path=model_path, num_threads=num_threads or None)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+        self._lock = threading.Lock()  # O interpretador não pode ser usado por duas threads ao mesmo tempo
+
+    def _resize(self, batch_size):
+        # Redimensiona a entrada só quando o tamanho do lote muda (realocar os tensores é caro)
+        if batch_size != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input['index'], [batch_size, *self._input['shape'][1:]])
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        scale, zero_point = self._input['quantization']
+        if self._input['dtype'] != np.float32:
+            batch = np.clip(np.round(batch / scale + zero_point), *_dtype_range(self._input['dtype']))
+        with self._lock:
+            self._resize(len(batch))
+            self.interpreter.set_tensor(self._input['index'], batch.astype(self._input['dtype']))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+        scale, zero_point = self._output['quantization']
+        if self._output['dtype'] != np.float32:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output[:, 0].astype(np.float32)
+
+
+class OnnxBackend(_ExportedBackend):
+    """Sessão do ONNX Runtime na CPU (requer o pacote opcional onnxruntime)."""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, keras_path=None, intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
+        super().__init__(model_path, keras_path)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("O backend 'onnx' requer o pacote onnxruntime (pip install onnxruntime).") from e
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        output = self.session.run(None, {self._input_name: np.asarray(batch, dtype=np.float32)})[0]
+        return output[:, 0].astype(np.float32)
+
+
+def tflite_interpreter_class():
+    """Interpretador TFLite do pacote mais leve disponível (LiteRT ou tflite-runtime), sem carregar o TensorFlow inteiro."""
+    for module_name in ('ai_edge_litert.interpreter', 'tflite_runtime.interpreter'):
+        try:
+            return timed_import(module_name).Interpreter
+        except ImportError:
+            continue
+    return timed_import('tensorflow').lite.Interpreter
+
+
+def _dtype_range(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+
+def load_backend(backend=BACKEND, keras_path=None, model=None,
+                 intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
+    """Cria o backend pedido para o modelo `keras_path`.
+
+    Para 'keras', `model` (já carregado) evita uma segunda cópia; sem ele, as threads do
+    TensorFlow são configuradas antes do carregamento. Os backends exportados leem o arquivo
+    gerado por export_model.py ao lado do .keras.
+    """
+    if backend == 'keras':
+        if model is None:
+            configure_threads(intra_op_threads, inter_op_threads)
+            model = timed_import('tensorflow').keras.models.load_model(keras_path)
+        instance = KerasBackend(model)
+        instance.model_path = keras_path
+        return instance
+    model_path = exported_model_path(keras_path, backend)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Modelo exportado não encontrado em {model_path}. Rode src/export_model.py primeiro.")
+    if backend == 'onnx':
+        return OnnxBackend(model_path, keras_path, intra_op_threads, inter_op_threads)
+    return TFLiteBackend(model_path, keras_path, intra_op_threads)
+
+
+def as_backend(classifier):
+    """Aceita um backend ou um modelo Keras (envolvido em KerasBackend uma única vez).
+
+    O KerasBackend fica num atributo do próprio modelo: é liberado junto com ele e nunca é
+    entregue a outro modelo que reaproveite o mesmo id().
+    """
+    if isinstance(classifier, (KerasBackend, _ExportedBackend)):
+        return classifier
+    backend = getattr(classifier, '_keras_backend', None)
+    if backend is None:
+        backend = KerasBackend(classifier)
+        object.__setattr__(classifier, '_keras_backend', backend)  # Fora do rastreamento de camadas do Keras
+    return backend
+
+
+def keras_model_of(classifier):
+    """O modelo Keras por trás de `classifier` (para o Grad-CAM)."""
+    return as_backend(classifier).keras_model
@@ -0,0 +1,186 @@
+# src/input_pipeline.py
+# Carregadores de dados do treino: o ImageDataGenerator original e um pipeline tf.data
+# com decodificação paralela, augmentation vetorizado por lote, cache() e prefetch().
+
+import math
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+import shard_dataset
+
+# --- CONFIGURAÇÕES ---
+IMG_HEIGHT, IMG_WIDTH = 224, 224
+NUM_PARALLEL_CALLS = tf.data.AUTOTUNE  # Ou um inteiro para fixar o número de threads de decodificação
+SHUFFLE_BUFFER = 4096
+SHARD_READ_CHUNK = 256    # Imagens lidas de uma vez de cada shard mapeado em memória
+SHARD_CYCLE_LENGTH = 4    # Shards lidos em paralelo (intercalados)
+# Mesmos parâmetros do ImageDataGenerator de train_final_model.py
+ROTATION_RANGE = 20        # graus
+WIDTH_SHIFT_RANGE = 0.2    # fração da largura
+HEIGHT_SHIFT_RANGE = 0.2   # fração da altura
+SHEAR_RANGE = 0.2          # graus (mesma unidade do ImageDataGenerator)
+ZOOM_RANGE = 0.2
+HORIZONTAL_FLIP = True
+# --------------------
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.tif', '.tiff')
+
+
+def build_generator_loaders(train_dir, validation_dir, batch_size, img_height=IMG_HEIGHT, img_width=IMG_WIDTH):
+    """Carregadores originais (ImageDataGenerator + flow_from_directory)."""
+    train_datagen = ImageDataGenerator(
+        rotation_range=ROTATION_RANGE, width_shift_range=WIDTH_SHIFT_RANGE, height_shift_range=HEIGHT_SHIFT_RANGE,
+        shear_range=SHEAR_RANGE, zoom_range=ZOOM_RANGE, horizontal_flip=HORIZONTAL_FLIP, fill_mode='nearest',
+        preprocessing_function=tf.keras.applications.efficientnet.preprocess_input
+    )
+    validation_datagen = ImageDataGenerator(preprocessing_function=tf.keras.applications.efficientnet.preprocess_input)
+
+    train_generator = train_datagen.flow_from_directory(
+        train_dir, target_size=(img_height, img_width), batch_size=batch_size,
+        class_mode='binary', shuffle=True
+    )
+    validation_generator = validation_datagen.flow_from_directory(
+        validation_dir, target_size=(img_height, img_width),
+        batch_size=batch_size, class_mode='binary'
+    )
+    return train_generator, validation_generator
+
+
+def list_image_files(directory):
+    """Lista (caminhos, rótulos, classes) como o flow_from_directory: uma subpasta por classe, em ordem alfabética."""
+    class_names = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        for root, _, files in os.walk(os.path.join(directory, class_name)):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+                    labels.append(float(label))
+    return paths, labels, class_names
+
+
+def load_image(path, img_height=IMG_HEIGHT, img_width=IMG_WIDTH):
+    """Lê e redimensiona uma imagem (tensor de caminho) para float32 RGB, sem pré-processamento."""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, (img_height, img_width), method='nearest')
+    return tf.cast(image, tf.float32)
+
+
+def random_affine_transforms(batch_size, height, width):
+    """Matrizes de transformação aleatórias (uma por imagem) no formato do ImageProjectiveTransformV3.
+
+    Combina rotação, deslocamento, cisalhamento, zoom e espelhamento em torno do centro,
+    com as mesmas faixas do ImageDataGenerator.
+    """
+    deg = math.pi / 180
+    shape = [batch_size]
+    theta = tf.random.uniform(shape, -ROTATION_RANGE, ROTATION_RANGE) * deg
+    shear = tf.random.uniform(shape, -SHEAR_RANGE, SHEAR_RANGE) * deg
+    zoom_x = tf.random.uniform(shape, 1 - ZOOM_RANGE, 1 + ZOOM_RANGE)
+    zoom_y = tf.random.uniform(shape, 1 - ZOOM_RANGE, 1 + ZOOM_RANGE)
+    shift_x = tf.random.uniform(shape, -WIDTH_SHIFT_RANGE, WIDTH_SHIFT_RANGE) * width
+    shift_y = tf.random.uniform(shape, -HEIGHT_SHIFT_RANGE, HEIGHT_SHIFT_RANGE) * height
+    flip = tf.ones(shape)
+    if HORIZONTAL_FLIP:
+        flip = tf.where(tf.random.uniform(shape) < 0.5, -1.0, 1.0)
+
+    cos_t, sin_t = tf.cos(theta), tf.sin(theta)
+    cos_s, sin_s = tf.cos(shear), tf.sin(shear)
+    # A = rotação @ cisalhamento @ zoom @ espelhamento (mapeia saída -> entrada)
+    a00 = cos_t * zoom_x * flip
+    a01 = (-cos_t * sin_s - sin_t * cos_s) * zoom_y
+    a10 = sin_t * zoom_x * flip
+    a11 = (-sin_t * sin_s + cos_t * cos_s) * zoom_y
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    offset_x = cx - a00 * cx - a01 * cy + shift_x
+    offset_y = cy - a10 * cx - a11 * cy + shift_y
+    zeros = tf.zeros(shape)
+    return tf.stack([a00, a01, offset_x, a10, a11, offset_y, zeros, zeros], axis=1)
+
+
+def augment_batch(images, labels):
+    """Aplica uma transformação afim aleatória a cada imagem do lote em uma única operação."""
+    shape = tf.shape(images)
+    transforms = random_affine_transforms(shape[0], tf.cast(shape[1], tf.float32), tf.cast(shape[2], tf.float32))
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=shape[1:3],
+        fill_value=0.0, interpolation='BILINEAR', fill_mode='NEAREST'
+    )
+    return images, labels
+
+
+def build_dataset(directory, training, batch_size, img_height=IMG_HEIGHT, img_width=IMG_WIDTH,
+                  num_parallel_calls=NUM_PARALLEL_CALLS, cache=None, seed=None):
+    """Cria o tf.data.Dataset de uma pasta no formato do flow_from_directory.
+
+    `cache`: None (sem cache), '' (em memória) ou o prefixo de um arquivo de cache em disco.
+    Retorna (dataset, número de imagens, nomes das classes).
+    """
+    paths, labels, class_names = list_image_files(directory)
+
+    def load(path, label):
+        return load_image(path, img_height, img_width), label
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if training:
+        # Sem cache, reembaralha a lista inteira a cada época; com cache, embaralha uma vez e
+        # depois usa o buffer de shuffle sobre as imagens já decodificadas.
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=cache is None)
+    dataset = dataset.map(load, num_parallel_calls=num_parallel_calls, deterministic=not training)
+    if cache is not None:
+        dataset = dataset.cache(cache)
+        if training:
+            dataset = dataset.shuffle(SHUFFLE_BUFFER, seed=seed, reshuffle_each_iteration=True)
+    return _batch_and_augment(dataset, training, batch_size, num_parallel_calls), len(paths), class_names
+
+
+def _batch_and_augment(dataset, training, batch_size, num_parallel_calls):
+    """Parte comum aos datasets de pastas e de shards: lote, augmentation, pré-processamento e prefetch."""
+    dataset = dataset.batch(batch_size)
+    if training:
+        dataset = dataset.map(augment_batch, num_parallel_calls=num_parallel_calls, deterministic=False)
+    dataset = dataset.map(
+        lambda images, batch_labels: (tf.keras.applications.efficientnet.preprocess_input(images), batch_labels),
+        num_parallel_calls=num_parallel_calls
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def build_shard_dataset(shard_dir, training, batch_size, num_parallel_calls=NUM_PARALLEL_CALLS, seed=None):
+    """Cria o tf.data.Dataset a partir dos shards .npy gerados por prepare_final_dataset.py.
+
+    Os shards são abertos com memory-map e lidos em blocos contíguos; no treino a ordem
+    dos shards e dos blocos é embaralhada e um buffer de shuffle mistura as imagens.
+    Retorna (dataset, número de imagens, nomes das classes).
+    """
+    manifest = shard_dataset.read_manifest(shard_dir)
+    shards = manifest['shards']
+    img_height, img_width = manifest['img_height'], manifest['img_width']
+    rng = np.random.default_rng(seed)
+
+    def read_shard(shard_idx):
+        images, labels = shard_dataset.open_shard(shard_dir, shards[int(shard_idx)])
+        starts = np.arange(0, len(labels), SHARD_READ_CHUNK)
+        if training:
+            rng.shuffle(starts)
+        for start in starts:
+            yield np.asarray(images[start:start + SHARD_READ_CHUNK]), np.asarray(labels[start:start + SHARD_READ_CHUNK], dtype=np.float32)
+
+    signature = (
+        tf.TensorSpec((None, img_height, img_width, 3), tf.uint8),
+        tf.TensorSpec((None,), tf.float32),
+    )
+    dataset = tf.data.Dataset.range(len(shards))
+    if training:
+        dataset = dataset.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.interleave(
+        lambda shard_idx: tf.data.Dataset.from_generator(read_shard, output_signature=signature, args=(shard_idx,)),
+        cycle_length=SHARD_CYCLE_LENGTH, num_parallel_calls=num_parallel_calls, deterministic=not training
+    )
+    dataset = dataset.unbatch().map(lambda image, label: (tf.cast(image, tf.float32), label))
+    if training:
+        dataset = dataset.shuffle(SHUFFLE_BUFFER, seed=seed, reshuffle_each_iteration=True)
+    return _batch_and_augment(dataset, training, batch_size, num_parallel_calls), manifest['total'], manifest['class_names']
@@ -0,0 +1,232 @@
+# src/perceptual_hash.py
+# Hashes perceptuais (dHash e pHash de 64 bits) dos recortes de rostos, guardados num índice
+# SQLite persistente (só arquivos novos ou alterados são recalculados), e busca de
+# quase-duplicatas por distância de Hamming com multi-index hashing, sem comparar todos os pares.
+
+import os
+import sqlite3
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+# --- CONFIGURAÇÕES ---
+HASH_DB_PATH = 'data/perceptual_hashes.sqlite'
+HASH_KIND = 'dhash'       # 'dhash' (mais rápido) ou 'phash' (mais robusto a compressão e brilho)
+HAMMING_RADIUS = 4        # Bits diferentes (de 64) até os quais duas imagens são consideradas a mesma
+HASH_WORKERS = os.cpu_count() or 4
+HASH_CHUNK = 1024         # Arquivos consultados/calculados/gravados por vez
+COMPARE_BLOCK = 2048      # Linhas por bloco na comparação dentro de um grupo (limita a memória)
+# --------------------
+
+HASH_BITS = 64
+_SQL_VARIABLES = 500      # Parâmetros por consulta "IN (...)"
+
+
+def _bits_to_int(bits):
+    """Empacota 64 booleanos num inteiro (o primeiro é o bit mais significativo)."""
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def dhash(gray):
+    """Hash de diferença: compara pixels vizinhos de uma miniatura 9x8."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return _bits_to_int((small[:, 1:] > small[:, :-1]).ravel())
+
+
+def phash(gray):
+    """Hash perceptual: sinal das 64 frequências mais baixas da DCT de uma miniatura 32x32."""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def hash_image(path):
+    """(dhash, phash) da imagem, ou None se ela não puder ser lida."""
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    return dhash(gray), phash(gray)
+
+
+def to_signed(value):
+    # O SQLite guarda inteiros de 64 bits com sinal
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value & ((1 << HASH_BITS) - 1)
+
+
+@lru_cache(maxsize=None)
+def band_bounds(radius):
+    """Limites (em bits) das radius+1 faixas do multi-index hashing."""
+    return tuple(int(b) for b in np.linspace(0, HASH_BITS, radius + 2).astype(int))
+
+
+def hash_bands(value, radius):
+    """Valor de cada faixa de um hash. Hashes a distância <= radius coincidem em pelo menos uma."""
+    bounds = band_bounds(radius)
+    return [(value >> lo) & ((1 << (hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+
+class HashIndex:
+    """Índice persistente caminho -> (dhash, phash), invalidado pelo tamanho/mtime do arquivo."""
+
+    def __init__(self, db_path=HASH_DB_PATH):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " dhash INTEGER, phash INTEGER)"
+        )
+        self._db.commit()
+
+    def lookup(self, files_with_stat):
+        """Recebe [(caminho, tamanho, mtime_ns)]; retorna {caminho: (dhash, phash) ou None} dos que estão em dia."""
+        stats = {path: (size, mtime_ns) for path, size, mtime_ns in files_with_stat}
+        paths = list(stats)
+        found = {}
+        for start in range(0, len(paths), _SQL_VARIABLES):
+            batch = paths[start:start + _SQL_VARIABLES]
+            rows = self._db.execute(
+                f"SELECT path, size, mtime_ns, dhash, phash FROM hashes WHERE path IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for path, size, mtime_ns, d, p in rows:
+                if stats[path] == (size, mtime_ns):
+                    found[path] = None if d is None else (to_unsigned(d), to_unsigned(p))
+        return found
+
+    def store(self, entries):
+        """Grava [(caminho, tamanho, mtime_ns, (dhash, phash) ou None)] numa única transação."""
+        self._db.executemany(
+            "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, dhash, phash) VALUES (?, ?, ?, ?, ?)",
+            [
+                (path, size, mtime_ns, *((None, None) if hashes is None else map(to_signed, hashes)))
+                for path, size, mtime_ns, hashes in entries
+            ]
+        )
+        self._db.commit()
+
+    def hash_files(self, paths, workers=HASH_WORKERS, desc=None):
+        """Hashes (dhash, phash) de cada caminho, na mesma ordem; None para arquivos ilegíveis.
+
+        Reaproveita os hashes do índice e calcula em paralelo apenas os que faltam.
+        """
+        results = []
+        computed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(total=len(paths), desc=desc) as pbar:
+            for start in range(0, len(paths), HASH_CHUNK):
+                chunk = paths[start:start + HASH_CHUNK]
+                stats = list(pool.map(_file_stat, chunk))
+                files_with_stat = [(path, *st) for path, st in zip(chunk, stats) if st is not None]
+                known = self.lookup(files_with_stat)
+                missing = [item for item in files_with_stat if item[0] not in known]
+                if missing:
+                    new_hashes = list(pool.map(lambda item: hash_image(item[0]), missing))
+                    self.store([(*item, hashes) for item, hashes in zip(missing, new_hashes)])
+                    known.update((item[0], hashes) for item, hashes in zip(missing, new_hashes))
+                    computed += len(missing)
+                results.extend(known.get(path) for path in chunk)
+                pbar.update(len(chunk))
+        print(f"  {computed} hashes calculados, {len(paths) - computed} reaproveitados do índice.")
+        return results
+
+    def close(self):
+        self._db.close()
+
+
+def duplicate_clusters(hashes, radius=HAMMING_RADIUS):
+    """Agrupa hashes a distância de Hamming <= radius de um representante. Retorna o rótulo do grupo de cada posição.
+
+    Cada grupo é formado em torno de um representante (o primeiro hash ainda sem grupo, na ordem
+    da entrada) e só recebe hashes a distância <= radius dele. Sem uniões transitivas: A~B e
+    B~C não juntam A e C quando eles estão longe entre si.
+    Multi-index hashing: os 64 bits são divididos em radius+1 faixas. Dois hashes a distância
+    <= radius coincidem em pelo menos uma faixa inteira, então só são comparados os hashes que
+    caem no mesmo valor de alguma faixa (em vez de todos os pares).
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    unique, inverse = np.unique(hashes, return_inverse=True)  # Cópias exatas viram um único nó
+    first_seen = np.full(len(unique), len(hashes), dtype=np.int64)
+    np.minimum.at(first_seen, inverse, np.arange(len(hashes)))
+
+    # Todos os pares próximos, achados faixa a faixa
+    left, right = [], []
+    bounds = band_bounds(radius)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        band = (unique >> np.uint64(lo)) & np.uint64((1 << (hi - lo)) - 1)
+        order = np.argsort(band, kind='stable')
+        sorted_band = band[order]
+        starts = np.flatnonzero(np.r_[True, sorted_band[1:] != sorted_band[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            members = order[start:end]
+            group = unique[members]
+            for row in range(0, len(members), COMPARE_BLOCK):
+                block = group[row:row + COMPARE_BLOCK]
+                rows, cols = np.nonzero(np.bitwise_count(block[:, None] ^ group[None, :]) <= radius)
+                pairs = rows + row != cols  # Os dois sentidos de cada par, sem a diagonal
+                left.append(members[rows[pairs] + row])
+                right.append(members[cols[pairs]])
+
+    labels = np.arange(len(unique))  # Hashes sem vizinhos formam o próprio grupo
+    if not left:
+        return labels[inverse]
+    left, right = np.concatenate(left), np.concatenate(right)
+    order = np.lexsort((right, left))
+    left, right = left[order], right[order]
+    keep = np.r_[True, (left[1:] != left[:-1]) | (right[1:] != right[:-1])]  # Pares achados em mais de uma faixa
+    left, right = left[keep], right[keep]
+    offsets = np.searchsorted(left, np.arange(len(unique) + 1))
+
+    # Representantes na ordem da entrada; cada um leva os vizinhos que ainda não têm grupo
+    assigned = np.zeros(len(unique), dtype=bool)
+    connected = np.unique(left)
+    for leader in connected[np.argsort(first_seen[connected], kind='stable')]:
+        if assigned[leader]:
+            continue
+        neighbors = right[offsets[leader]:offsets[leader + 1]]
+        neighbors = neighbors[~assigned[neighbors]]
+        labels[neighbors] = leader
+        assigned[neighbors] = True
+        assigned[leader] = True
+    return labels[inverse]
+
+
+def deduplicate(paths, index, radius=HAMMING_RADIUS, kind=HASH_KIND, workers=HASH_WORKERS, desc=None):
+    """Remove quase-duplicatas de uma lista de arquivos, mantendo a primeira ocorrência de cada grupo.
+
+    Arquivos ilegíveis são mantidos (as etapas seguintes já lidam com eles).
+    Retorna (arquivos mantidos, número de removidos).
+    """
+    hashes = index.hash_files(paths, workers, desc)
+    column = 0 if kind == 'dhash' else 1
+    hashed = [i for i, h in enumerate(hashes) if h is not None]
+    if not hashed:
+        return list(paths), 0
+    labels = duplicate_clusters([hashes[i][column] for i in hashed], radius)
+    keep = np.ones(len(paths), dtype=bool)
+    seen = set()
+    for i, label in zip(hashed, labels):
+        if label in seen:
+            keep[i] = False
+        else:
+            seen.add(label)
+    kept = [path for path, k in zip(paths, keep) if k]
+    return kept, len(paths) - len(kept)
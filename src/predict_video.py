@@ -1,11 +1,17 @@
+import heapq
+import math
+from functools import lru_cache
 import cv2
-import mtcnn
-import tensorflow as tf
 import numpy as np
-from tensorflow.keras.preprocessing import image
 from tqdm import tqdm
 import os
 
+import startup_profile
+import inference_backend
+import face_localization
+from face_localization import FaceLocalizer, MultiFaceLocalizer
+from frame_sampling import FrameReader, coarse_to_fine_passes
+from prediction_cache import PredictionCache, file_content_hash
 
 
 MODEL_PATH = 'models/deepfake_detector_v3_finetuned.keras'
@@ -18,100 +24,556 @@ OUTPUT_VIDEO_PATH = 'resultado_video.mp4'
 IMG_HEIGHT = 224
 IMG_WIDTH = 224
 FRAME_INTERVAL = 3  
+BATCH_SIZE = 16  # Rostos classificados por chamada ao modelo (1 = um predict por frame)
+FAKE_THRESHOLD_PERCENT = 40
+USE_PIPELINE = True  # Decodificação, detecção, classificação e escrita em threads paralelas
+DETECTION_WORKERS = 2
+USE_PREDICTION_CACHE = True  # Reaproveita o veredito de vídeos já analisados com o mesmo modelo
+REDETECT_INTERVAL = 5  # MTCNN completo a cada N frames analisados; nos demais o rosto é rastreado (1 = desliga)
+# 'fixed' analisa um frame a cada FRAME_INTERVAL; 'adaptive' começa esparso, adensa a amostragem
+# só enquanto o veredito está indefinido e para assim que ele estiver estatisticamente decidido.
+SAMPLING_MODE = 'fixed'
+ADAPTIVE_INITIAL_STRIDE = 96  # Espaçamento da primeira passada (frames); acima de frame_sampling.SEEK_MIN_GAP, lida com seeks
+ADAPTIVE_MIN_VOTES = 12       # Votos mínimos antes de parar
+ADAPTIVE_CONFIDENCE_Z = 2.576  # Intervalo de Wilson de 99% para a fração de votos FAKE
+# 'main' classifica só o maior rosto de cada frame; 'all' classifica todos os rostos acima dos limiares
+# de face_localization (tamanho, confiança, MAX_FACES_PER_FRAME), com um veredito por identidade.
+FACE_MODE = 'main'
+MAX_FACES_PER_FRAME = 8  # Limite de rostos por frame no modo 'all' (os maiores)
+MIN_IDENTITY_VOTES = 5   # Votos mínimos para uma identidade decidir o veredito do vídeo
+XAI_TOP_K = 3  # Frames mais suspeitos explicados com Grad-CAM depois da análise (0 = desliga)
+XAI_OUTPUT_FOLDER = 'resultado_xai'
+# Backend do classificador: 'keras' (float32 original) ou um modelo exportado por export_model.py
+# ('tflite_fp16', 'tflite_int8', 'onnx'), lido ao lado de MODEL_PATH.
+INFERENCE_BACKEND = inference_backend.BACKEND
+INTRA_OP_THREADS = inference_backend.INTRA_OP_THREADS  # 0 = todos os núcleos
+INTER_OP_THREADS = inference_backend.INTER_OP_THREADS
 
 
 COLOR_REAL = (0, 255, 0)  
 COLOR_FAKE = (0, 0, 255)  
 
 
-def main():
-    """Função principal para processar o vídeo."""
-    print("--- Carregando modelos... ---")
+# Campos das estatísticas guardados no cache de predições
+CACHED_STATS = ('frames', 'faces_classified', 'real_votes', 'fake_votes', 'suspicious_frames',
+                'frames_sampled', 'frames_decoded', 'frames_grabbed', 'decode_cost', 'seeks', 'passes', 'settled', 'confidence',
+                'identities')
+
+
+@lru_cache(maxsize=None)
+def load_classifier(model_path=MODEL_PATH):
+    """Carrega o classificador uma única vez por caminho (análise e XAI usam o mesmo objeto)."""
+    tf = startup_profile.timed_import('tensorflow')
+    with startup_profile.timed("carregar classificador"):
+        return tf.keras.models.load_model(model_path)
+
+
+@lru_cache(maxsize=None)
+def load_inference_backend(backend=INFERENCE_BACKEND, model_path=MODEL_PATH):
+    """Carrega o backend de inferência uma única vez. O backend 'keras' reutiliza load_classifier."""
+    if backend == 'keras':
+        inference_backend.configure_threads(INTRA_OP_THREADS, INTER_OP_THREADS)
+        return inference_backend.load_backend('keras', model_path, model=load_classifier(model_path))
+    return inference_backend.load_backend(backend, model_path, intra_op_threads=INTRA_OP_THREADS,
+                                          inter_op_threads=INTER_OP_THREADS)
+
+
+def inference_model_path():
+    """Arquivo do modelo efetivamente usado na inferência (identifica as entradas do cache)."""
+    return inference_backend.exported_model_path(MODEL_PATH, INFERENCE_BACKEND)
+
+
+def prepare_face(frame, box):
+    """Recorta o rosto do frame BGR original e o converte para a entrada RGB do classificador."""
+    x, y, w, h = box
+    cropped_face = cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2RGB)
+    return cv2.resize(cropped_face, (IMG_WIDTH, IMG_HEIGHT)).astype(np.float32)
+
+
+def preprocess_faces(faces):
+    """Empilha os rostos no lote de entrada. O preprocess_input da EfficientNet é a identidade
+    (a normalização faz parte do modelo), então o TensorFlow não precisa ser importado aqui."""
+    return np.stack(faces).astype(np.float32, copy=False)
+
+
+def classify_faces(classifier_model, faces):
+    """Classifica uma lista de rostos em uma única chamada. Retorna a probabilidade de REAL de cada um.
+
+    `classifier_model` pode ser um modelo Keras ou um backend de inference_backend.
+    """
+    batch = preprocess_faces(faces)
+    return inference_backend.as_backend(classifier_model).predict(batch)
+
+
+def annotate_frame(frame, box, prediction, identity=None):
+    """Desenha a caixa e o rótulo (com a identidade, se houver) no frame. Retorna True se o voto for REAL."""
+    x, y, w, h = box
+    prefix = f"#{identity} " if identity is not None else ""
+    if prediction > 0.5:
+        label = f"{prefix}REAL: {prediction:.1%}"
+        color = COLOR_REAL
+    else:
+        label = f"{prefix}FAKE: {1-prediction:.1%}"
+        color = COLOR_FAKE
+    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+    cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+    return prediction > 0.5
+
+
+class SuspiciousFrames:
+    """Os K frames com menor probabilidade de REAL, guardando só o índice e a caixa (memória O(K))."""
+
+    def __init__(self, k=XAI_TOP_K):
+        self.k = k
+        self._heap = []  # (-probabilidade, frame, caixa): o topo é o menos suspeito dos guardados
+
+    def add(self, frame_idx, box, real_score):
+        if self.k <= 0:
+            return
+        item = (-float(real_score), frame_idx, tuple(int(v) for v in box))
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def frames(self):
+        """Do mais para o menos suspeito: [{'frame', 'box', 'real_score'}]."""
+        return [{'frame': frame_idx, 'box': list(box), 'real_score': -neg_score}
+                for neg_score, frame_idx, box in sorted(self._heap, reverse=True)]
+
+
+def analyze_video(cap, out, face_localizer, classifier_model, batch_size=BATCH_SIZE,
+                  frame_interval=FRAME_INTERVAL, pbar=None, top_k=XAI_TOP_K):
+    """Percorre o vídeo, classifica os rostos em lotes e grava os frames anotados em ordem.
+
+    Os frames ficam retidos até o lote dos seus rostos ser classificado, para que
+    o rótulo volte ao frame correto antes de `out.write`. Os `top_k` frames mais
+    suspeitos (só índice e caixa) vão em stats['suspicious_frames'].
+    """
+    stats = {'frames': 0, 'faces_classified': 0, 'real_votes': 0, 'fake_votes': 0}
+    suspicious = SuspiciousFrames(top_k)
+    pending_frames = []  # (índice, frame, box ou None), na ordem de leitura
+    pending_faces = []
+
+    def flush():
+        if pending_faces:
+            predictions = classify_faces(classifier_model, pending_faces)
+            stats['faces_classified'] += len(pending_faces)
+        face_idx = 0
+        for frame_idx, frame, box in pending_frames:
+            if box is not None:
+                suspicious.add(frame_idx, box, predictions[face_idx])
+                if annotate_frame(frame, box, predictions[face_idx]):
+                    stats['real_votes'] += 1
+                else:
+                    stats['fake_votes'] += 1
+                face_idx += 1
+            if out is not None:
+                out.write(frame)
+        pending_frames.clear()
+        pending_faces.clear()
+
+    frame_idx = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        box = None
+        if frame_idx % frame_interval == 0:
+            box = face_localizer.locate(frame)
+
+            if box is not None:
+                pending_faces.append(prepare_face(frame, box))
+
+        pending_frames.append((frame_idx, frame, box))
+        if len(pending_faces) >= batch_size:
+            flush()
+
+        frame_idx += 1
+        stats['frames'] += 1
+        if pbar is not None:
+            pbar.update(1)
+
+    flush()
+    stats['suspicious_frames'] = suspicious.frames()
+    return stats
+
+
+def analyze_video_multi(cap, out, face_localizer, classifier_model, batch_size=BATCH_SIZE,
+                        frame_interval=FRAME_INTERVAL, pbar=None, top_k=XAI_TOP_K):
+    """Como analyze_video, mas classifica todos os rostos de cada frame analisado (modo 'all').
+
+    `face_localizer` é um MultiFaceLocalizer. Os rostos de vários frames entram no mesmo lote,
+    então o número de chamadas ao modelo depende só do total de rostos. Além dos votos somados,
+    stats['identities'] traz os votos e a média de probabilidade REAL de cada identidade.
+    """
+    stats = {'frames': 0, 'faces_classified': 0, 'real_votes': 0, 'fake_votes': 0, 'identities': {}}
+    suspicious = SuspiciousFrames(top_k)
+    pending_frames = []  # (índice, frame, [(identidade, caixa)]), na ordem de leitura
+    pending_faces = []
+
+    def flush():
+        predictions = classify_faces(classifier_model, pending_faces) if pending_faces else []
+        stats['faces_classified'] += len(pending_faces)
+        face_idx = 0
+        for frame_idx, frame, faces in pending_frames:
+            for identity, box in faces:
+                prediction = float(predictions[face_idx])
+                face_idx += 1
+                suspicious.add(frame_idx, box, prediction)
+                votes = stats['identities'].setdefault(str(identity), {
+                    'real_votes': 0, 'fake_votes': 0, 'score_sum': 0.0, 'first_frame': frame_idx})
+                votes['last_frame'] = frame_idx
+                votes['score_sum'] += prediction
+                vote = 'real_votes' if annotate_frame(frame, box, prediction, identity) else 'fake_votes'
+                stats[vote] += 1
+                votes[vote] += 1
+            if out is not None:
+                out.write(frame)
+        pending_frames.clear()
+        pending_faces.clear()
+
+    frame_idx = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        faces = []
+        if frame_idx % frame_interval == 0:
+            faces = face_localizer.locate_all(frame)
+            pending_faces.extend(prepare_face(frame, box) for _, box in faces)
+
+        pending_frames.append((frame_idx, frame, faces))
+        if len(pending_faces) >= batch_size:
+            flush()
+
+        frame_idx += 1
+        stats['frames'] += 1
+        if pbar is not None:
+            pbar.update(1)
+
+    flush()
+    for votes in stats['identities'].values():
+        votes['mean_real_score'] = votes.pop('score_sum') / (votes['real_votes'] + votes['fake_votes'])
+    stats['suspicious_frames'] = suspicious.frames()
+    return stats
+
+
+def wilson_interval(successes, total, z=ADAPTIVE_CONFIDENCE_Z):
+    """Intervalo de confiança de Wilson para a proporção successes/total."""
+    if total == 0:
+        return 0.0, 1.0
+    p = successes / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def analyze_video_adaptive(cap, face_localizer, classifier_model, batch_size=BATCH_SIZE,
+                           frame_interval=FRAME_INTERVAL, initial_stride=ADAPTIVE_INITIAL_STRIDE,
+                           min_votes=ADAPTIVE_MIN_VOTES, z=ADAPTIVE_CONFIDENCE_Z, pbar=None, top_k=XAI_TOP_K):
+    """Análise com parada antecipada: amostra o vídeo em passadas cada vez mais densas.
+
+    Depois de cada lote classificado, calcula o intervalo de Wilson da fração de votos FAKE;
+    para quando o intervalo inteiro fica de um lado de FAKE_THRESHOLD_PERCENT. Sem parada,
+    analisa os mesmos frames do modo fixo. Não grava vídeo anotado.
+    """
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    threshold = FAKE_THRESHOLD_PERCENT / 100
+    reader = FrameReader(cap)
+    suspicious = SuspiciousFrames(top_k)
+    stats = {'frames': total_frames, 'faces_classified': 0, 'real_votes': 0, 'fake_votes': 0,
+             'frames_sampled': 0, 'passes': 0, 'settled': False}
+    pending = []  # (índice, caixa, rosto)
+
+    def flush_and_check():
+        if pending:
+            predictions = classify_faces(classifier_model, [face for _, _, face in pending])
+            stats['faces_classified'] += len(pending)
+            for (frame_idx, box, _), prediction in zip(pending, predictions):
+                suspicious.add(frame_idx, box, prediction)
+                stats['real_votes' if prediction > 0.5 else 'fake_votes'] += 1
+            pending.clear()
+        votes = stats['real_votes'] + stats['fake_votes']
+        lower, upper = wilson_interval(stats['fake_votes'], votes, z)
+        stats['confidence'] = {'fake_ratio': stats['fake_votes'] / votes if votes else None,
+                               'lower': lower, 'upper': upper, 'z': z}
+        stats['settled'] = votes >= min_votes and (lower > threshold or upper < threshold)
+        return stats['settled']
+
+    for frame_indices in coarse_to_fine_passes(total_frames, frame_interval, initial_stride):
+        stats['passes'] += 1
+        for frame_idx in frame_indices:
+            frame = reader.read(frame_idx)
+            stats['frames_sampled'] += 1
+            if pbar is not None:
+                pbar.update(1)
+            if frame is None:
+                continue
+            face_localizer.reset()  # Amostras não consecutivas: sempre detecção completa
+            box = face_localizer.locate(frame)
+            if box is not None:
+                pending.append((frame_idx, box, prepare_face(frame, box)))
+            if len(pending) >= batch_size and flush_and_check():
+                break
+        if stats['settled'] or flush_and_check():
+            break
+
+    stats['frames_decoded'] = reader.stats['decoded']
+    stats['frames_grabbed'] = reader.stats['grabbed']
+    stats['decode_cost'] = reader.stats['decoded'] + reader.stats['grabbed']  # grab() também decodifica o frame
+    stats['seeks'] = reader.stats['seeks']
+    stats['suspicious_frames'] = suspicious.frames()
+    return stats
+
+
+def explain_suspicious_frames(video_path, classifier_model, suspicious_frames):
+    """Volta só aos frames mais suspeitos, decodifica cada um e gera o Grad-CAM dos rostos num único lote.
+
+    Retorna [{'frame', 'real_score', 'face', 'overlay'}] com o recorte BGR do rosto e o mesmo
+    recorte com o mapa de calor, do mais para o menos suspeito.
+    """
+    if not suspicious_frames:
+        return []
+    decoded = []
+    cap = cv2.VideoCapture(video_path)
     try:
-        face_detector = mtcnn.MTCNN()
-        classifier_model = tf.keras.models.load_model(MODEL_PATH)
-    except Exception as e:
-        print(f"Erro ao carregar os modelos: {e}")
-        return
+        for rank, item in sorted(enumerate(suspicious_frames), key=lambda s: s[1]['frame']):  # Seeks sempre para frente
+            cap.set(cv2.CAP_PROP_POS_FRAMES, item['frame'])
+            ret, frame = cap.read()
+            if ret:
+                decoded.append((rank, item, frame))
+    finally:
+        cap.release()
+    if not decoded:
+        return []
+
+    decoded.sort(key=lambda d: d[0])
+    faces = [prepare_face(frame, item['box']) for _, item, frame in decoded]
+    xai_utils = startup_profile.timed_import('xai_utils')
+    batch = preprocess_faces(faces)
+    heatmaps = xai_utils.get_gradcam_engine(inference_backend.keras_model_of(classifier_model)).heatmaps(batch)
+    explanations = []
+    for (_, item, frame), heatmap in zip(decoded, heatmaps):
+        x, y, w, h = item['box']
+        face_bgr = frame[y:y+h, x:x+w]
+        explanations.append({
+            'frame': item['frame'], 'real_score': item['real_score'],
+            'face': face_bgr, 'overlay': xai_utils.overlay_heatmap_on_image(face_bgr, heatmap),
+        })
+    return explanations
+
+
+def create_face_localizer():
+    """Detector MTCNN combinado com rastreamento entre keyframes."""
+    mtcnn = startup_profile.timed_import('mtcnn')
+    return FaceLocalizer(mtcnn.MTCNN(), redetect_interval=REDETECT_INTERVAL)
+
+
+def create_multi_face_localizer():
+    """Detector MTCNN com todos os rostos do frame e identidades rastreadas (modo 'all')."""
+    mtcnn = startup_profile.timed_import('mtcnn')
+    return MultiFaceLocalizer(mtcnn.MTCNN(), redetect_interval=REDETECT_INTERVAL, max_faces=MAX_FACES_PER_FRAME)
+
+
+def compute_verdict(real_votes, fake_votes):
+    """Converte os votos em percentuais e no veredito final (None se nenhum rosto foi analisado)."""
+    total_votes = real_votes + fake_votes
+    if total_votes == 0:
+        return None
+    real_percent = (real_votes / total_votes) * 100
+    fake_percent = (fake_votes / total_votes) * 100
+    return {
+        'real_percent': real_percent,
+        'fake_percent': fake_percent,
+        'verdict': 'FAKE' if fake_percent > FAKE_THRESHOLD_PERCENT else 'REAL',
+    }
+
+
+def video_verdict(stats, min_identity_votes=MIN_IDENTITY_VOTES):
+    """Veredito do vídeo a partir das estatísticas da análise (None se nenhum rosto foi analisado).
+
+    No modo multi-rosto, result['identities'] traz o veredito de cada identidade, e o vídeo é
+    FAKE se qualquer identidade com pelo menos `min_identity_votes` votos for FAKE, mesmo que
+    as outras pessoas sejam reais; os percentuais continuam sendo os do total de votos.
+    """
+    result = compute_verdict(stats['real_votes'], stats['fake_votes'])
+    if result is None:
+        return None
+    result['confidence_percent'] = result['fake_percent'] if result['verdict'] == 'FAKE' else result['real_percent']
+    if not stats.get('identities'):
+        return result
+    identities = []
+    for identity, votes in sorted(stats['identities'].items(), key=lambda item: int(item[0])):
+        identities.append({'identity': int(identity), **votes, **compute_verdict(votes['real_votes'], votes['fake_votes'])})
+    result['identities'] = identities
+    decisive = [i for i in identities if i['real_votes'] + i['fake_votes'] >= min_identity_votes]
+    fakes = [i for i in decisive if i['verdict'] == 'FAKE']
+    if fakes:
+        result['verdict'], result['confidence_percent'] = 'FAKE', max(i['fake_percent'] for i in fakes)
+    elif decisive:
+        result['verdict'], result['confidence_percent'] = 'REAL', min(i['real_percent'] for i in decisive)
+    return result
+
+
+def video_cache_kind():
+    """Tipo da entrada no cache: inclui os parâmetros que mudam a contagem de votos."""
+    detection = f"maxside{face_localization.DETECTION_MAX_SIDE}"  # Muda as caixas encontradas, e com elas os votos
+    if FACE_MODE == 'all':
+        return (f"video:all:interval{FRAME_INTERVAL}:redetect{REDETECT_INTERVAL}:max{MAX_FACES_PER_FRAME}"
+                f":{detection}:top{XAI_TOP_K}")
+    if SAMPLING_MODE == 'adaptive':
+        return (f"video:adaptive:interval{FRAME_INTERVAL}:stride{ADAPTIVE_INITIAL_STRIDE}"
+                f":min{ADAPTIVE_MIN_VOTES}:z{ADAPTIVE_CONFIDENCE_Z}:{detection}:top{XAI_TOP_K}")
+    return f"video:interval{FRAME_INTERVAL}:redetect{REDETECT_INTERVAL}:{detection}:top{XAI_TOP_K}"
+
+
+def cacheable_stats(stats):
+    """Parte de `stats` guardada no cache (a mesma no CLI e no app)."""
+    return {key: stats[key] for key in CACHED_STATS if key in stats}
+
 
-    cap = cv2.VideoCapture(VIDEO_PATH)
+def warm_up(classifier_model, face_localizer=None):
+    """Primeira inferência de cada modelo (traçado do grafo), medida no relatório de inicialização."""
+    with startup_profile.timed("primeira inferência (classificador)"):
+        classify_faces(classifier_model, [np.zeros((IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32)])
+    if face_localizer is not None:
+        with startup_profile.timed("primeira detecção (MTCNN)"):
+            face_localizer.frontend.detect(np.zeros((160, 160, 3), dtype=np.uint8))
+
+
+def process_video():
+    """Carrega os modelos, analisa VIDEO_PATH e grava OUTPUT_VIDEO_PATH. Retorna as estatísticas ou None."""
+    multi_face = FACE_MODE == 'all'
+    adaptive = SAMPLING_MODE == 'adaptive' and not multi_face  # Identidades exigem frames analisados em ordem
+    cap = cv2.VideoCapture(VIDEO_PATH)  # Antes dos modelos: um vídeo inválido não espera o TensorFlow carregar
     if not cap.isOpened():
         print(f"Erro ao abrir o vídeo: {VIDEO_PATH}")
-        return
+        return None
+
+    print(f"--- Carregando modelos (backend: {INFERENCE_BACKEND})... ---")
+    try:
+        if multi_face:
+            face_localizer = create_multi_face_localizer()
+        else:
+            face_localizer = None if USE_PIPELINE and not adaptive else create_face_localizer()
+        classifier_model = load_inference_backend()
+        warm_up(classifier_model, face_localizer)
+    except Exception as e:
+        print(f"Erro ao carregar os modelos: {e}")
+        cap.release()
+        return None
+    startup_profile.report('predict_video')
 
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS))
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(OUTPUT_VIDEO_PATH, fourcc, fps, (frame_width, frame_height))
+    if adaptive:
+        # A amostragem adaptativa pula frames, então não há vídeo anotado
+        out = None
+        print(f"--- Processando vídeo: {VIDEO_PATH} (amostragem adaptativa) ---")
+        with tqdm(total=len(range(0, total_frames, FRAME_INTERVAL)), desc="Amostrando Vídeo") as pbar:
+            stats = analyze_video_adaptive(cap, face_localizer, classifier_model, pbar=pbar)
+    else:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(OUTPUT_VIDEO_PATH, fourcc, fps, (frame_width, frame_height))
 
-    print(f"--- Processando vídeo: {VIDEO_PATH} ---")
-    frame_idx = 0
-    real_votes = 0
-    fake_votes = 0
-    
-    with tqdm(total=total_frames, desc="Analisando Vídeo") as pbar:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            
-            if frame_idx % FRAME_INTERVAL == 0:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                detections = face_detector.detect_faces(frame_rgb)
-                
-                if detections:
-                    
-                    main_face = max(detections, key=lambda d: d['box'][2] * d['box'][3])
-                    x, y, w, h = main_face['box']
-                    
-                    cropped_face = frame_rgb[y:y+h, x:x+w]
-                    
-                    face_for_pred = cv2.resize(cropped_face, (IMG_WIDTH, IMG_HEIGHT))
-                    face_for_pred = image.img_to_array(face_for_pred)
-                    face_for_pred = np.expand_dims(face_for_pred, axis=0)
-                    face_for_pred = tf.keras.applications.efficientnet.preprocess_input(face_for_pred)
-
-                    prediction = classifier_model.predict(face_for_pred, verbose=0)[0][0]
-
-                    if prediction > 0.5:
-                        label = f"REAL: {prediction:.1%}"
-                        color = COLOR_REAL
-                        real_votes += 1
-                    else:
-                        label = f"FAKE: {1-prediction:.1%}"
-                        color = COLOR_FAKE
-                        fake_votes += 1
-                    
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
-                    cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-
-            out.write(frame)
-            frame_idx += 1
-            pbar.update(1)
+        faces_note = f", todos os rostos até {MAX_FACES_PER_FRAME} por frame" if multi_face else ""
+        print(f"--- Processando vídeo: {VIDEO_PATH} (lotes de {BATCH_SIZE} rostos{faces_note}) ---")
+        with tqdm(total=total_frames, desc="Analisando Vídeo") as pbar:
+            if multi_face:
+                stats = analyze_video_multi(cap, out, face_localizer, classifier_model, pbar=pbar)
+            elif USE_PIPELINE:
+                from video_pipeline import VideoPipeline
+                pipeline = VideoPipeline(create_face_localizer, classifier_model, num_detection_workers=DETECTION_WORKERS)
+                stats = pipeline.run(cap, out, pbar=pbar)
+            else:
+                stats = analyze_video(cap, out, face_localizer, classifier_model, pbar=pbar)
 
     cap.release()
-    out.release()
+    if out is not None:
+        out.release()
     
     print("\n--- Análise de vídeo concluída! ---")
-    print(f"Vídeo com resultado salvo em: {OUTPUT_VIDEO_PATH}")
-    total_votes = real_votes + fake_votes
-    if total_votes > 0:
-        real_percent = (real_votes / total_votes) * 100
-        fake_percent = (fake_votes / total_votes) * 100
-        print(f"Resultado geral: {real_percent:.2f}% dos frames analisados são REAL, {fake_percent:.2f}% são FAKE.")
+    if out is not None:
+        print(f"Vídeo com resultado salvo em: {OUTPUT_VIDEO_PATH}")
+    if adaptive:
+        print_adaptive_report(stats)
+    loc_stats = face_localizer.stats if face_localizer is not None else stats.get('localization')
+    if loc_stats:
+        print(f"Detecções MTCNN: {loc_stats['detector_calls']} de {loc_stats['frames']} frames analisados "
+              f"({loc_stats['tracked_frames']} rastreados).")
+    if 'stages' in stats:
+        print("Ocupação dos estágios do pipeline:")
+        for name, stage in stats['stages'].items():
+            print(f"  {name:<9} {stage['utilization']:6.1%} ocupado ({stage['workers']} thread(s), {stage['busy_seconds']:.1f}s)")
+    return stats
+
+
+def print_adaptive_report(stats):
+    confidence = stats.get('confidence', {})
+    print(f"Custo de decodificação: {stats['decode_cost']} frames de {stats['frames']} "
+          f"({stats['frames_decoded']} entregues, {stats['frames_grabbed']} pulados com grab, {stats['seeks']} seeks) | "
+          f"rostos classificados: {stats['faces_classified']} | passadas: {stats['passes']}")
+    if confidence.get('fake_ratio') is not None:
+        state = "decidido" if stats['settled'] else "indefinido ao fim do vídeo"
+        print(f"Fração FAKE: {confidence['fake_ratio']:.1%} (intervalo de Wilson {confidence['lower']:.1%}"
+              f"–{confidence['upper']:.1%}, z={confidence['z']}) — veredito {state}.")
+
+
+def main():
+    """Função principal para processar o vídeo."""
+    cache, video_hash, stats = None, None, None
+    if USE_PREDICTION_CACHE:
+        cache = PredictionCache(inference_model_path())
+        video_hash = file_content_hash(VIDEO_PATH)
+        stats = cache.get(video_cache_kind(), video_hash)
+        if stats is not None:
+            print("--- Resultado encontrado no cache: este vídeo já foi analisado com o modelo atual. ---")
+
+    if stats is None:
+        stats = process_video()
+        if stats is None:
+            return
+        if cache is not None:
+            cache.put(video_cache_kind(), video_hash, cacheable_stats(stats))
+
+    result = video_verdict(stats)
+    if result is not None:
+        print(f"Resultado geral: {result['real_percent']:.2f}% dos frames analisados são REAL, {result['fake_percent']:.2f}% são FAKE.")
+        for identity in result.get('identities', []):
+            votes = identity['real_votes'] + identity['fake_votes']
+            print(f"  Pessoa #{identity['identity']}: {identity['verdict']} ({identity['fake_percent']:.1f}% FAKE em {votes} "
+                  f"votos, frames {identity['first_frame']}–{identity['last_frame']})")
         
-        if fake_percent > 40: 
+        if result['verdict'] == 'FAKE': 
              print("Veredito Final: O vídeo é provavelmente um DEEPFAKE.")
         else:
              print("Veredito Final: O vídeo é provavelmente REAL.")
 
+    if stats.get('suspicious_frames'):
+        save_suspicious_frames(stats['suspicious_frames'])
+
+def save_suspicious_frames(suspicious_frames):
+    """Grava em XAI_OUTPUT_FOLDER o rosto e o Grad-CAM dos frames mais suspeitos."""
+    classifier_model = load_inference_backend()
+    os.makedirs(XAI_OUTPUT_FOLDER, exist_ok=True)
+    for explanation in explain_suspicious_frames(VIDEO_PATH, classifier_model, suspicious_frames):
+        name = f"frame_{explanation['frame']:06d}"
+        cv2.imwrite(os.path.join(XAI_OUTPUT_FOLDER, f"{name}_original.jpg"), explanation['face'])
+        cv2.imwrite(os.path.join(XAI_OUTPUT_FOLDER, f"{name}_xai.jpg"), explanation['overlay'])
+    print(f"Grad-CAM dos {len(suspicious_frames)} frames mais suspeitos salvo em: {XAI_OUTPUT_FOLDER}")
+
 if __name__ == '__main__':
     if not os.path.exists(MODEL_PATH):
         print(f"Erro: Modelo não encontrado em {MODEL_PATH}. Treine o modelo primeiro.")
+    elif not os.path.exists(inference_model_path()):
+        print(f"Erro: Modelo exportado não encontrado em {inference_model_path()}. Rode src/export_model.py primeiro.")
     elif not os.path.exists(VIDEO_PATH):
         print(f"Erro: Vídeo de teste não encontrado em {VIDEO_PATH}. Coloque um vídeo na pasta do projeto e ajuste o caminho no script.")
     else:
@@ -0,0 +1,146 @@
+# src/prediction_cache.py
+# Cache de predições endereçado pelo conteúdo da mídia e pela identidade do modelo.
+# Duas camadas: LRU em memória e SQLite em disco. A identidade do modelo (caminho, tamanho e
+# data de modificação do arquivo) faz parte da chave: a CLI e o app, com backends diferentes
+# (Keras/TFLite/ONNX), dividem o mesmo banco sem apagar as entradas uns dos outros. O banco é
+# limitado a DB_MAX_ENTRIES entradas, descartando as usadas há mais tempo.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- CONFIGURAÇÕES ---
+CACHE_DB_PATH = 'data/prediction_cache.sqlite'
+MEMORY_ENTRIES = 1024
+DB_MAX_ENTRIES = 100_000  # Entradas no SQLite (todos os modelos juntos) antes de descartar as menos usadas
+EVICT_EVERY = 100         # Gravações entre duas verificações do limite do banco
+HASH_CHUNK_SIZE = 1 << 20
+# --------------------
+
+
+def content_hash(data):
+    """SHA-256 dos bytes enviados."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path):
+    """SHA-256 de um arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_identity(model_path):
+    """Identifica a versão do modelo pelo caminho absoluto, tamanho e mtime do arquivo."""
+    stat = os.stat(model_path)
+    key = f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """Resultados (dicionários JSON) por (tipo, hash do conteúdo, identidade do modelo)."""
+
+    def __init__(self, model_path, db_path=CACHE_DB_PATH, memory_entries=MEMORY_ENTRIES,
+                 db_max_entries=DB_MAX_ENTRIES):
+        self.model_path = model_path
+        self.memory_entries = memory_entries
+        self.db_max_entries = db_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(predictions)")]
+        if columns and 'last_used' not in columns:
+            self._db.execute("DROP TABLE predictions")  # Esquema antigo (chave sem o modelo): é só cache
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " kind TEXT NOT NULL, content_hash TEXT NOT NULL, model_id TEXT NOT NULL,"
+            " result TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (kind, content_hash, model_id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self._db.commit()
+        self._model_id = None
+        self._check_model()
+        self._evict()
+
+    def _check_model(self):
+        """Atualiza a identidade do modelo. As entradas de outros modelos continuam no banco."""
+        current = model_identity(self.model_path)
+        if current != self._model_id:
+            self._memory.clear()  # A memória só serve ao modelo atual deste processo
+            self._model_id = current
+
+    def get(self, kind, media_hash):
+        with self._lock:
+            self._check_model()
+            key = (kind, media_hash, self._model_id)
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            row = self._db.execute(
+                "SELECT result FROM predictions WHERE kind = ? AND content_hash = ? AND model_id = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # Acertos na memória não chegam aqui: o last_used do banco é aproximado
+            self._db.execute(
+                "UPDATE predictions SET last_used = ? WHERE kind = ? AND content_hash = ? AND model_id = ?",
+                (time.time(), *key),
+            )
+            self._db.commit()
+            result = json.loads(row[0])
+            self._remember(key, result)
+            self.hits += 1
+            return result
+
+    def put(self, kind, media_hash, result):
+        with self._lock:
+            self._check_model()
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO predictions (kind, content_hash, model_id, result, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, media_hash, self._model_id, json.dumps(result), now, now),
+            )
+            self._db.commit()
+            self._remember((kind, media_hash, self._model_id), result)
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        """Mantém no banco só as db_max_entries entradas usadas mais recentemente (de qualquer modelo)."""
+        self._db.execute(
+            "DELETE FROM predictions WHERE rowid IN ("
+            " SELECT rowid FROM predictions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.db_max_entries,),
+        )
+        self._db.commit()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'memory_entries': len(self._memory)}
+
+    def close(self):
+        self._db.close()
@@ -5,6 +5,9 @@ import glob
 import random
 import shutil
 from tqdm import tqdm
+import dataset_sampler
+import perceptual_hash
+import shard_dataset
 
 # --- CONFIGURAÇÕES ---
 # Lista de TODAS as pastas de origem, incluindo o novo dataset.
@@ -30,6 +33,19 @@ SOURCE_FOLDERS = {
 TRAIN_FOLDER = 'data/final_train'
 VALIDATION_FOLDER = 'data/final_validation'
 SPLIT_RATIO = 0.9
+# 'folders' copia os JPEGs para TRAIN_FOLDER/VALIDATION_FOLDER; 'shards' grava rostos 224x224
+# já redimensionados em shards .npy (sem cópia por arquivo), lidos direto pelo treino.
+OUTPUT_MODE = 'folders'
+TRAIN_SHARDS_FOLDER = 'data/final_shards/train'
+VALIDATION_SHARDS_FOLDER = 'data/final_shards/validation'
+# Remove quase-duplicatas (hash perceptual) de cada classe antes do balanceamento/divisão,
+# para que o mesmo rosto não apareça duas vezes nem vaze do treino para a validação.
+DEDUPLICATE = True
+# True = montagem em fluxo (dataset_sampler.py): scandir paralelo, amostra e divisão por hash
+# determinístico e saída com hardlink/reflink; a memória não cresce com o tamanho das fontes e a
+# deduplicação roda só sobre a amostra. Os arquivos de saída compartilham o conteúdo com as fontes
+# (hardlink): não os edite no lugar. False = listas completas, shuffle aleatório e shutil.copy.
+STREAMING_BUILDER = True
 # --------------------
 
 def collect_files(source_list):
@@ -45,6 +61,18 @@ def collect_files(source_list):
         all_files.extend(files)
     return all_files
 
+def remove_near_duplicates(real_files, fake_files):
+    """Mantém uma única imagem de cada grupo de quase-duplicatas, em cada classe."""
+    index = perceptual_hash.HashIndex()
+    try:
+        print(f"\nRemovendo quase-duplicatas (distância de Hamming <= {perceptual_hash.HAMMING_RADIUS})...")
+        real_files, real_removed = perceptual_hash.deduplicate(real_files, index, desc="Hashes real")
+        fake_files, fake_removed = perceptual_hash.deduplicate(fake_files, index, desc="Hashes fake")
+    finally:
+        index.close()
+    print(f"Duplicatas removidas: {real_removed} reais, {fake_removed} fakes.")
+    return real_files, fake_files
+
 def balance_and_split_data(real_files, fake_files):
     if not real_files or not fake_files:
         print("[ERRO] Uma das classes (real ou fake) não tem imagens. Abortando.")
@@ -82,14 +110,33 @@ def copy_files(datasets):
 
 if __name__ == '__main__':
     print("--- INICIANDO A PREPARAÇÃO DO SUPER-DATASET FINAL ---")
-    if os.path.exists(TRAIN_FOLDER): shutil.rmtree(TRAIN_FOLDER)
-    if os.path.exists(VALIDATION_FOLDER): shutil.rmtree(VALIDATION_FOLDER)
+    output_folders = [TRAIN_FOLDER, VALIDATION_FOLDER] if OUTPUT_MODE == 'folders' else [TRAIN_SHARDS_FOLDER, VALIDATION_SHARDS_FOLDER]
+    for folder in output_folders:
+        if os.path.exists(folder): shutil.rmtree(folder)
     print("Pastas de destino antigas foram limpas.")
 
-    real_files = collect_files(SOURCE_FOLDERS['real'])
-    fake_files = collect_files(SOURCE_FOLDERS['fake'])
-    
-    balanced_datasets = balance_and_split_data(real_files, fake_files)
-    copy_files(balanced_datasets)
+    if STREAMING_BUILDER:
+        samples = dataset_sampler.sample_classes(SOURCE_FOLDERS)
+        if samples is not None and DEDUPLICATE:
+            samples['real'], samples['fake'] = remove_near_duplicates(samples['real'], samples['fake'])
+            samples = dataset_sampler.rebalance(samples)
+            print(f"Após a deduplicação: {len(samples['real'])} amostras de cada classe.")
+        balanced_datasets = dataset_sampler.split_by_hash(samples, SPLIT_RATIO) if samples is not None else None
+    else:
+        real_files = collect_files(SOURCE_FOLDERS['real'])
+        fake_files = collect_files(SOURCE_FOLDERS['fake'])
+        if DEDUPLICATE:
+            real_files, fake_files = remove_near_duplicates(real_files, fake_files)
+        balanced_datasets = balance_and_split_data(real_files, fake_files)
+
+    if OUTPUT_MODE == 'shards':
+        if balanced_datasets is not None:
+            shard_dataset.write_dataset_shards(balanced_datasets, TRAIN_SHARDS_FOLDER, VALIDATION_SHARDS_FOLDER)
+    elif STREAMING_BUILDER:
+        if balanced_datasets is not None:
+            methods = dataset_sampler.materialize(balanced_datasets, TRAIN_FOLDER, VALIDATION_FOLDER)
+            print("Arquivos de saída: " + ", ".join(f"{count} por {method}" for method, count in methods.items()))
+    else:
+        copy_files(balanced_datasets)
     
     print("\n--- PREPARAÇÃO DO SUPER-DATASET CONCLUÍDA ---")
\ No newline at end of file
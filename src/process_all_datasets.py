@@ -1,10 +1,33 @@
 # src/process_all_datasets.py
 
+import startup_profile
 import os
 import subprocess
 import sys
+import time
+from multiprocessing import cpu_count
+from tqdm import tqdm
+import face_detector
 
-def run_job(job_name, input_folder, output_folder):
+# True = todas as tarefas num único pool de processos já aquecido (o detector é criado uma vez
+# por worker); False = um subprocesso do face_detector.py por tarefa (modo antigo).
+USE_SHARED_POOL = True
+
+# --- LISTA DE TAREFAS DE PROCESSAMENTO ---
+# IMPORTANTE: Confirme se este caminho para a sua pasta "Dataset" está correto.
+BASE_INPUT_PATH = 'C:/Users/LAOB/Downloads/Dataset' # <<< CONFIRME ESTA LINHA
+
+JOBS = [
+    {'name': 'Train Fake', 'input': os.path.join(BASE_INPUT_PATH, 'Train', 'Fake'), 'output': 'data/processed_novo/train/fake'},
+    {'name': 'Train Real', 'input': os.path.join(BASE_INPUT_PATH, 'Train', 'Real'), 'output': 'data/processed_novo/train/real'},
+    {'name': 'Validation Fake', 'input': os.path.join(BASE_INPUT_PATH, 'Validation', 'Fake'), 'output': 'data/processed_novo/validation/fake'},
+    {'name': 'Validation Real', 'input': os.path.join(BASE_INPUT_PATH, 'Validation', 'Real'), 'output': 'data/processed_novo/validation/real'},
+    {'name': 'Test Fake', 'input': os.path.join(BASE_INPUT_PATH, 'Test', 'Fake'), 'output': 'data/processed_novo/test/fake'},
+    {'name': 'Test Real', 'input': os.path.join(BASE_INPUT_PATH, 'Test', 'Real'), 'output': 'data/processed_novo/test/real'},
+]
+# ---------------------------------------------
+
+def run_job(job_name, input_folder, output_folder, incremental=True):
     """Executa um único trabalho de processamento de imagens."""
     
     # Garante que a pasta de saída exista
@@ -12,6 +35,8 @@ def run_job(job_name, input_folder, output_folder):
     
     # Comando para chamar o nosso extrator de rostos de imagens
     command = [sys.executable, "src/face_detector.py", input_folder, output_folder]
+    if not incremental:
+        command.append('--full') # Ignora o manifesto e reprocessa tudo
     
     print(f"\n{'='*20}\n--- INICIANDO TAREFA: {job_name} ---\n{'='*20}")
     
@@ -27,36 +52,133 @@ def run_job(job_name, input_folder, output_folder):
         print(f"\n[ERRO FATAL] Não foi possível encontrar 'src/face_detector.py'.")
         return False
 
+def run_jobs_subprocess(jobs, incremental=True):
+    """Modo antigo: uma tarefa por vez, cada uma num novo interpretador com o seu próprio pool."""
+    for job in jobs:
+        if not run_job(job['name'], job['input'], job['output'], incremental):
+            print("Abortando o processamento em lote devido a um erro.")
+            return False
+    return True
+
+def run_jobs_shared_pool(jobs, incremental=True, num_processes=None):
+    """Envia as imagens de todas as tarefas para um único pool de workers aquecidos.
+
+    O progresso, o manifesto e os erros continuam separados por tarefa.
+    """
+    plans = []
+    for job in jobs:
+        print(f"\n--- Planejando tarefa: {job['name']} ---")
+        try:
+            manifest, files = face_detector.plan_folder(job['input'], job['output'], incremental)
+        except OSError as e:
+            print(f"\n[ERRO FATAL] A tarefa '{job['name']}' falhou: {e}")
+            for plan in plans:
+                if plan['manifest'] is not None: plan['manifest'].close()
+            print("Abortando o processamento em lote devido a um erro.")
+            return False
+        plans.append({
+            'job': job, 'manifest': manifest, 'errors': [],
+            'file_stats': {path: (size, mtime_ns) for path, size, mtime_ns in files},
+        })
+
+    # Cada imagem é atribuída à sua tarefa pela pasta de origem
+    plan_by_input = {os.path.normpath(plan['job']['input']): plan for plan in plans}
+    tasks = face_detector.batch_tasks([(plan['job']['output'], [(path, size) for path, (size, _) in plan['file_stats'].items()])
+                                       for plan in plans])
+    if not tasks:
+        for plan in plans:
+            if plan['manifest'] is not None: plan['manifest'].close()
+        print("\nNenhuma imagem nova para processar.")
+        return True
+
+    num_processes = num_processes or (cpu_count() - 1 if cpu_count() > 1 else 1)
+    total_images = sum(len(plan['file_stats']) for plan in plans)
+    print(f"\nProcessando {total_images} imagens de {len(plans)} tarefas ({len(tasks)} lotes) com um pool de {num_processes} processos.")
+    bars = [tqdm(total=len(plan['file_stats']), desc=plan['job']['name'], position=i) for i, plan in enumerate(plans)]
+    for plan, bar in zip(plans, bars):
+        plan['bar'] = bar
+
+    worker_startup = {}
+    start = time.perf_counter()
+    first_result_seconds = None
+    try:
+        with face_detector.create_worker_pool(num_processes) as pool:
+            for results in pool.imap_unordered(face_detector.process_image_batch, tasks):
+                if first_result_seconds is None:
+                    first_result_seconds = time.perf_counter() - start
+                for result in results:
+                    plan = plan_by_input[os.path.normpath(os.path.dirname(result['path']))]
+                    face_detector.record_result(plan['manifest'], plan['file_stats'], result)
+                    if result['error']:
+                        plan['errors'].append(result['error'])
+                    pid, init_seconds = result['worker']
+                    worker_startup[pid] = init_seconds
+                    plan['bar'].update(1)
+    finally:
+        for plan in plans:
+            plan['bar'].close()
+            if plan['manifest'] is not None: plan['manifest'].close()
+    wall_seconds = time.perf_counter() - start
+
+    for plan in plans:
+        print(f"\n--- TAREFA CONCLUÍDA: {plan['job']['name']} ({len(plan['file_stats'])} imagens) ---")
+        face_detector.print_errors(plan['errors'])
+
+    print("\n--- Relatório do pool compartilhado ---")
+    print(f"Tempo total: {wall_seconds:.1f}s | Primeiro resultado após {first_result_seconds or 0:.1f}s")
+    if worker_startup:
+        total_startup = sum(worker_startup.values())
+        print(f"Inicialização dos workers (detector): {len(worker_startup)} workers, {total_startup:.1f}s no total, "
+              f"{total_startup / len(worker_startup):.1f}s cada — paga uma única vez para as {len(plans)} tarefas "
+              f"(o modo antigo paga isso e o import do TensorFlow em cada tarefa).")
+    face_detector.record_worker_startup(worker_startup)
+    startup_profile.report('process_all_datasets')
+    return True
+
+def parse_args(argv):
+    """Opções de linha de comando: --full, --subprocess, --job NOME (repetível) e --workers N."""
+    options = {'full': False, 'subprocess': False, 'jobs': [], 'workers': None}
+    args = iter(argv)
+    for arg in args:
+        if arg == '--full': options['full'] = True # Ignora o manifesto e reprocessa tudo
+        elif arg == '--subprocess': options['subprocess'] = True
+        elif arg == '--job': options['jobs'].append(next(args, ''))
+        elif arg == '--workers': options['workers'] = int(next(args, '0')) or None
+        else:
+            print(f"[ERRO] Argumento desconhecido: {arg}")
+            sys.exit(1)
+    return options
+
 if __name__ == '__main__':
-    # --- LISTA DE TAREFAS DE PROCESSAMENTO ---
-    # IMPORTANTE: Confirme se este caminho para a sua pasta "Dataset" está correto.
-    BASE_INPUT_PATH = 'C:/Users/LAOB/Downloads/Dataset' # <<< CONFIRME ESTA LINHA
+    options = parse_args(sys.argv[1:])
 
-    # Verifica se o caminho base existe antes de definir os trabalhos
+    # Verifica se o caminho base existe antes de rodar os trabalhos
     if not os.path.isdir(BASE_INPUT_PATH):
         print(f"[ERRO] O caminho base '{BASE_INPUT_PATH}' não foi encontrado.")
         print("Por favor, edite o script 'process_all_datasets.py' com o caminho correto.")
         sys.exit(1)
 
-    JOBS = [
-        {'name': 'Train Fake', 'input': os.path.join(BASE_INPUT_PATH, 'Train', 'Fake'), 'output': 'data/processed_novo/train/fake'},
-        {'name': 'Train Real', 'input': os.path.join(BASE_INPUT_PATH, 'Train', 'Real'), 'output': 'data/processed_novo/train/real'},
-        {'name': 'Validation Fake', 'input': os.path.join(BASE_INPUT_PATH, 'Validation', 'Fake'), 'output': 'data/processed_novo/validation/fake'},
-        {'name': 'Validation Real', 'input': os.path.join(BASE_INPUT_PATH, 'Validation', 'Real'), 'output': 'data/processed_novo/validation/real'},
-        {'name': 'Test Fake', 'input': os.path.join(BASE_INPUT_PATH, 'Test', 'Fake'), 'output': 'data/processed_novo/test/fake'},
-        {'name': 'Test Real', 'input': os.path.join(BASE_INPUT_PATH, 'Test', 'Real'), 'output': 'data/processed_novo/test/real'},
-    ]
-    # ---------------------------------------------
+    # --job NOME roda só as tarefas escolhidas (o run_full_pipeline.py roda cada uma como uma etapa)
+    jobs = JOBS
+    if options['jobs']:
+        unknown = [name for name in options['jobs'] if name not in {job['name'] for job in JOBS}]
+        if unknown:
+            print(f"[ERRO] Tarefa(s) desconhecida(s): {', '.join(unknown)}")
+            sys.exit(1)
+        jobs = [job for job in JOBS if job['name'] in options['jobs']]
     
     print("====== INICIANDO PROCESSAMENTO EM LOTE DO NOVO DATASET ======")
-    all_success = True
-    for job in JOBS:
-        if not run_job(job['name'], job['input'], job['output']):
-            all_success = False
-            print("Abortando o processamento em lote devido a um erro.")
-            break
+    use_shared_pool = USE_SHARED_POOL and not options['subprocess']
+    start_time = time.perf_counter()
+    if use_shared_pool:
+        all_success = run_jobs_shared_pool(jobs, incremental=not options['full'], num_processes=options['workers'])
+    else:
+        all_success = run_jobs_subprocess(jobs, incremental=not options['full'])
+    print(f"\nTempo total do lote ({'pool compartilhado' if use_shared_pool else 'subprocessos'}): "
+          f"{time.perf_counter() - start_time:.1f}s")
             
     if all_success:
         print("\n====== PROCESSAMENTO EM LOTE CONCLUÍDO COM SUCESSO ======")
     else:
-        print("\n====== PROCESSAMENTO EM LOTE FALHOU ======")
\ No newline at end of file
+        print("\n====== PROCESSAMENTO EM LOTE FALHOU ======")
+        sys.exit(1)
@@ -1,55 +1,340 @@
 # src/run_full_pipeline.py
+# Executa o pipeline como um grafo de etapas. Cada etapa declara as entradas e saídas que usa
+# (pastas data/processed_*, data/final_*, models/*.keras e os próprios scripts):
+# - as dependências saem dessas declarações (a saída de uma etapa é entrada de outra);
+# - uma etapa é pulada quando as impressões digitais das entradas e das saídas (caminho, tamanho
+#   e data de modificação de cada arquivo) e o comando são os mesmos da última execução bem-sucedida;
+# - etapas independentes (as extrações de cada parte do dataset) rodam ao mesmo tempo, dentro
+#   de um orçamento global de CPUs;
+# - o tempo de parede, o tempo de CPU e o pico de RSS de cada etapa vão para um log de execuções.
+# Uso: python src/run_full_pipeline.py [--dry-run] [--force etapa1,etapa2 | --force all] [--cpus N]
 
+import argparse
+import hashlib
+import json
+import os
 import subprocess
 import sys
 import time
-import os
+from datetime import datetime
+
+import prepare_final_dataset
+import process_all_datasets
+
+# --- CONFIGURAÇÕES ---
+CPU_BUDGET = os.cpu_count() or 1      # CPUs que as etapas em paralelo podem ocupar juntas
+EXTRACTION_WORKERS_PER_JOB = 2        # Workers do pool de cada etapa de extração (process_all_datasets.py --workers)
+STATE_PATH = 'data/pipeline_state.json'   # Impressões digitais da última execução bem-sucedida de cada etapa
+RUN_LOG_PATH = 'data/pipeline_runs.jsonl' # Uma linha por etapa e por execução: tempo, CPU, memória
+STEP_LOGS_DIR = 'data/pipeline_logs'      # Saída (stdout/stderr) de cada etapa
+LOG_TAIL_LINES = 20                   # Linhas do log mostradas quando uma etapa falha
+
+# Caminhos do train_final_model.py (ele lê os argumentos ao ser importado, então não dá para importá-lo aqui)
+TRAIN_DIR = 'data/final_train'
+VALIDATION_DIR = 'data/final_validation'
+BASE_MODEL_PATH = 'models/deepfake_detector_v6_ultimate.keras'
+FINAL_MODEL_SAVE_PATH = 'models/deepfake_detector_v7_final.keras'
+# --------------------
+
+EXTRACTION_CODE = ['src/process_all_datasets.py', 'src/face_detector.py', 'src/detector_backends.py',
+                   'src/face_localization.py', 'src/extraction_manifest.py']
+
+
+def step_slug(name):
+    return name.lower().replace(' ', '_')
+
+
+def define_steps():
+    """Etapas do pipeline, na ordem de preferência de execução.
+
+    Cada etapa: {'name', 'command', 'inputs', 'outputs', 'cpus'}. Scripts fazem parte das entradas,
+    então alterar o código de uma etapa também a faz rodar de novo.
+    """
+    python = sys.executable # sys.executable garante que usamos o python do ambiente conda
+    steps = []
+    for job in process_all_datasets.JOBS:
+        steps.append({
+            'name': f"extrair_{step_slug(job['name'])}",
+            'command': [python, 'src/process_all_datasets.py', '--job', job['name'],
+                        '--workers', str(EXTRACTION_WORKERS_PER_JOB)],
+            'inputs': [job['input']] + EXTRACTION_CODE,
+            'outputs': [job['output']],
+            'cpus': EXTRACTION_WORKERS_PER_JOB,
+        })
+
+    # Um só valor escolhe as pastas geradas, as entradas do treino e o --format dele
+    dataset_format = prepare_final_dataset.OUTPUT_MODE
+    if dataset_format == 'shards':
+        final_outputs = [prepare_final_dataset.TRAIN_SHARDS_FOLDER, prepare_final_dataset.VALIDATION_SHARDS_FOLDER]
+        train_command = [python, 'src/train_final_model.py', '--format', 'shards', '--loader', 'tfdata'] # Shards só com tf.data
+    else:
+        final_outputs = [prepare_final_dataset.TRAIN_FOLDER, prepare_final_dataset.VALIDATION_FOLDER]
+        train_command = [python, 'src/train_final_model.py', '--format', 'folders']
+    steps.append({
+        'name': 'preparar_dataset',
+        'command': [python, 'src/prepare_final_dataset.py'],
+        'inputs': [folder for folders in prepare_final_dataset.SOURCE_FOLDERS.values() for folder in folders]
+                  + ['src/prepare_final_dataset.py', 'src/dataset_sampler.py', 'src/perceptual_hash.py', 'src/shard_dataset.py'],
+        'outputs': final_outputs,
+        'cpus': 1,
+    })
+    steps.append({
+        'name': 'treinar_modelo',
+        'command': train_command,
+        'inputs': final_outputs + [BASE_MODEL_PATH, 'src/train_final_model.py', 'src/input_pipeline.py'],
+        'outputs': [FINAL_MODEL_SAVE_PATH],
+        'cpus': CPU_BUDGET, # O treino usa a máquina inteira: roda sozinho
+    })
+    return steps
+
+
+def _overlaps(a, b):
+    """True se os caminhos são iguais ou um está dentro do outro."""
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def dependencies(steps):
+    """{etapa: [etapas anteriores cujas saídas são entradas dela]}."""
+    deps = {}
+    for idx, step in enumerate(steps):
+        deps[step['name']] = [other['name'] for other in steps[:idx]
+                              if any(_overlaps(out, inp) for out in other['outputs'] for inp in step['inputs'])]
+    return deps
+
+
+def fingerprint(paths):
+    """sha1 de (caminho, tamanho, mtime) de todos os arquivos sob `paths`. Caminhos ausentes também contam."""
+    digest = hashlib.sha1()
+    for root in sorted(paths):
+        digest.update(f"\0{os.path.normpath(root)}\0".encode('utf-8'))
+        if os.path.isfile(root):
+            stat = os.stat(root)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+            continue
+        if not os.path.isdir(root):
+            digest.update(b'<ausente>')
+            continue
+        entries, stack = [], [root]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        entries.append(f"{os.path.relpath(entry.path, root)}:{stat.st_size}:{stat.st_mtime_ns}")
+        for entry in sorted(entries):
+            digest.update(entry.encode('utf-8'))
+            digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def load_state():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH) # Um estado interrompido no meio nunca fica pela metade
 
-# --- ORDEM DAS TAREFAS DO PIPELINE ---
-# Garanta que os nomes dos scripts abaixo correspondem aos seus arquivos em src/
-PIPELINE_STEPS = [
-    "process_all_datasets.py",
-    "prepare_final_dataset.py",
-    "train_final_model.py" # O nosso script de treino mais recente
-]
-# ------------------------------------
-
-def run_step(script_name):
-    """Executa um passo do pipeline e verifica se houve erro."""
-    
-    script_path = os.path.join("src", script_name)
-    if not os.path.exists(script_path):
-        print(f"\n[ERRO FATAL] O script '{script_path}' não foi encontrado!")
-        return False
 
-    command = [sys.executable, script_path] # sys.executable garante que usamos o python do ambiente conda
-    
-    print(f"\n{'='*25}\nINICIANDO ETAPA: {script_name}\n{'='*25}")
-    
+def is_up_to_date(step, state, inputs_fp):
+    recorded = state.get(step['name'])
+    return (recorded is not None and recorded['command'] == step['command'][1:]
+            and recorded['inputs'] == inputs_fp
+            and all(os.path.exists(path) for path in step['outputs'])
+            and recorded['outputs'] == fingerprint(step['outputs']))
+
+
+def append_run_log(record):
+    os.makedirs(os.path.dirname(RUN_LOG_PATH), exist_ok=True)
+    with open(RUN_LOG_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def print_log_tail(log_path):
     try:
-        # Executa o script e aguarda sua conclusão
-        subprocess.run(command, check=True)
-        print(f"\n--- ETAPA '{script_name}' CONCLUÍDA COM SUCESSO ---")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n[ERRO FATAL] A ETAPA '{script_name}' FALHOU COM CÓDIGO DE SAÍDA {e.returncode}.")
-        return False
+        with open(log_path, encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()[-LOG_TAIL_LINES:]
+    except OSError:
+        return
+    print(f"  --- últimas linhas de {log_path} ---")
+    for line in lines:
+        print(f"  | {line}")
+
+
+def wait_any(running):
+    """Espera uma etapa terminar. Retorna (pid, código de saída, segundos de CPU, pico de RSS em MB).
+
+    No Linux/macOS, os.wait4 entrega o uso de recursos do processo e dos filhos que ele esperou
+    (os workers do pool): CPU = usuário + sistema; RSS = pico do maior processo da árvore.
+    No Windows não há wait4: a espera é por sondagem e CPU/RSS ficam como None.
+    """
+    if hasattr(os, 'wait4'):
+        while True:
+            pid, status, usage = os.wait4(-1, 0)
+            if pid in running:
+                break
+        running[pid]['process'].returncode = os.waitstatus_to_exitcode(status) # O Popen não deve esperar de novo
+        scale = 1024 if sys.platform != 'darwin' else 1024 * 1024 # ru_maxrss: KB no Linux, bytes no macOS
+        return pid, running[pid]['process'].returncode, usage.ru_utime + usage.ru_stime, usage.ru_maxrss / scale
+    while True:
+        for pid, run in running.items():
+            if run['process'].poll() is not None:
+                return pid, run['process'].returncode, None, None
+        time.sleep(0.5)
+
+
+def run_pipeline(steps, cpu_budget=CPU_BUDGET, force=(), dry_run=False):
+    """Roda as etapas respeitando as dependências e o orçamento de CPUs. Retorna True se nenhuma falhou."""
+    deps = dependencies(steps)
+    state = load_state()
+    run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+    if not dry_run:
+        os.makedirs(STEP_LOGS_DIR, exist_ok=True)
+    pending = list(steps)
+    finished = {}   # nome -> 'ok', 'skipped', 'failed' ou 'blocked'
+    running = {}    # pid -> {'step', 'process', 'log', 'started', 'start_time', 'inputs_fp'}
+    cpus_in_use = 0
+    input_fingerprints = {}  # nome -> impressão digital das entradas
+    records = []
+
+    def record(step, status, **metrics):
+        entry = {'run_id': run_id, 'step': step['name'], 'status': status, 'wall_seconds': None,
+                 'cpu_seconds': None, 'peak_rss_mb': None, 'started': None}
+        entry.update(metrics)
+        records.append(entry)
+        if not dry_run:
+            append_run_log(entry)
+
+    try:
+        while pending or running:
+            for step in list(pending):
+                step_deps = [finished.get(name) for name in deps[step['name']]]
+                if any(status in ('failed', 'blocked') for status in step_deps):
+                    pending.remove(step)
+                    finished[step['name']] = 'blocked'
+                    print(f"[BLOQUEADA] {step['name']}: uma dependência falhou.")
+                    record(step, 'blocked')
+                    continue
+                if any(status is None for status in step_deps):
+                    continue # Dependência ainda na fila ou rodando
+
+                if running and cpus_in_use + step['cpus'] > cpu_budget:
+                    continue # Sem CPUs livres agora; uma etapa maior que o orçamento roda sozinha
+
+                # Uma vez por etapa, com as dependências concluídas (pastas de vídeo podem ser grandes)
+                if step['name'] not in input_fingerprints:
+                    input_fingerprints[step['name']] = fingerprint(step['inputs'])
+                inputs_fp = input_fingerprints[step['name']]
+                forced = 'all' in force or step['name'] in force
+                if dry_run:
+                    # Se uma dependência rodaria, as entradas desta etapa também mudariam
+                    would_run = forced or 'ok' in step_deps or not is_up_to_date(step, state, inputs_fp)
+                    pending.remove(step)
+                    finished[step['name']] = 'ok' if would_run else 'skipped'
+                    print(f"  {'RODARIA' if would_run else 'atualizada':<10} {step['name']}  "
+                          f"(dependências: {', '.join(deps[step['name']]) or 'nenhuma'})")
+                    continue
+                if not forced and is_up_to_date(step, state, inputs_fp):
+                    pending.remove(step)
+                    finished[step['name']] = 'skipped'
+                    print(f"[PULADA] {step['name']}: entradas e saídas iguais às da última execução.")
+                    record(step, 'skipped')
+                    continue
+
+                pending.remove(step)
+                log_path = os.path.join(STEP_LOGS_DIR, f"{step['name']}.log")
+                log = open(log_path, 'w', encoding='utf-8')
+                print(f"[INICIANDO] {step['name']} ({step['cpus']} CPUs, log em {log_path})")
+                process = subprocess.Popen(step['command'], stdout=log, stderr=subprocess.STDOUT)
+                running[process.pid] = {'step': step, 'process': process, 'log': log, 'log_path': log_path,
+                                        'started': datetime.now().isoformat(timespec='seconds'),
+                                        'start_time': time.perf_counter(), 'inputs_fp': inputs_fp}
+                cpus_in_use += step['cpus']
+
+            if not running:
+                continue
+            pid, returncode, cpu_seconds, peak_rss_mb = wait_any(running)
+            run = running.pop(pid)
+            run['log'].close()
+            step = run['step']
+            cpus_in_use -= step['cpus']
+            wall_seconds = time.perf_counter() - run['start_time']
+            metrics = {'wall_seconds': round(wall_seconds, 2), 'started': run['started'],
+                       'cpu_seconds': round(cpu_seconds, 2) if cpu_seconds is not None else None,
+                       'peak_rss_mb': round(peak_rss_mb, 1) if peak_rss_mb is not None else None}
+            if returncode == 0:
+                finished[step['name']] = 'ok'
+                state[step['name']] = {'command': step['command'][1:], 'inputs': run['inputs_fp'],
+                                       'outputs': fingerprint(step['outputs'])}
+                save_state(state)
+                print(f"[CONCLUÍDA] {step['name']} em {wall_seconds:.1f}s")
+                record(step, 'ok', **metrics)
+            else:
+                finished[step['name']] = 'failed'
+                state.pop(step['name'], None)
+                save_state(state)
+                print(f"[ERRO] {step['name']} falhou com código de saída {returncode}.")
+                print_log_tail(run['log_path'])
+                record(step, 'failed', **metrics)
     except KeyboardInterrupt:
-        print(f"\n[AVISO] Pipeline interrompido pelo usuário.")
+        print("\n[AVISO] Pipeline interrompido pelo usuário. Encerrando as etapas em andamento...")
+        for run in running.values():
+            run['process'].terminate()
+        for run in running.values():
+            run['process'].wait()
+            run['log'].close()
         return False
 
+    if not dry_run:
+        print_summary(records)
+    return all(status in ('ok', 'skipped') for status in finished.values())
+
+
+def print_summary(records):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+    print(f"\n{'etapa':<28} {'status':<8} {'parede s':>9} {'CPU s':>9} {'pico RSS MB':>12}")
+    for entry in records:
+        print(f"{entry['step']:<28} {entry['status']:<8} {fmt(entry['wall_seconds'], '9.1f'):>9} "
+              f"{fmt(entry['cpu_seconds'], '9.1f'):>9} {fmt(entry['peak_rss_mb'], '12.0f'):>12}")
+    print(f"Log de execuções: {RUN_LOG_PATH}")
+
 
 if __name__ == '__main__':
+    steps = define_steps()
+    parser = argparse.ArgumentParser(description="Pipeline completo com etapas em cache e extrações em paralelo.")
+    parser.add_argument('--dry-run', action='store_true', help="Só mostra quais etapas rodariam")
+    parser.add_argument('--force', default='', help="Etapas a rodar mesmo se atualizadas (separadas por vírgula, ou 'all')")
+    parser.add_argument('--cpus', type=int, default=CPU_BUDGET, help="Orçamento global de CPUs")
+    args = parser.parse_args()
+
+    force = {name.strip() for name in args.force.split(',') if name.strip()}
+    unknown = force - {step['name'] for step in steps} - {'all'}
+    if unknown:
+        print(f"[ERRO] Etapa(s) desconhecida(s): {', '.join(sorted(unknown))}")
+        print(f"Etapas: {', '.join(step['name'] for step in steps)}")
+        sys.exit(1)
+
     start_time = time.time()
     print("<<<<< INICIANDO PIPELINE COMPLETO DE CRIAÇÃO DE MODELO >>>>>")
-    
-    # Executa cada passo em sequência
-    for script_file in PIPELINE_STEPS:
-        if not run_step(script_file):
-            print("\n<<<<< PIPELINE INTERROMPIDO DEVIDO A UM ERRO >>>>>")
-            break
-    else: # Este 'else' pertence ao 'for', só executa se o loop terminar sem 'break'
-        end_time = time.time()
-        total_duration_hours = (end_time - start_time) / 3600
+    if args.dry_run:
+        print("Modo --dry-run: nada será executado.")
+    success = run_pipeline(steps, cpu_budget=args.cpus, force=force, dry_run=args.dry_run)
+    if args.dry_run:
+        sys.exit(0)
+    if success:
+        total_duration_hours = (time.time() - start_time) / 3600
         print(f"\n<<<<< PIPELINE COMPLETO EXECUTADO COM SUCESSO EM {total_duration_hours:.2f} HORAS >>>>>")
-        print("UM NOVO MODELO DE IA FOI GERADO!")
\ No newline at end of file
+        print("UM NOVO MODELO DE IA FOI GERADO!")
+    else:
+        print("\n<<<<< PIPELINE INTERROMPIDO DEVIDO A UM ERRO >>>>>")
+        sys.exit(1)
@@ -0,0 +1,134 @@
+# src/shard_dataset.py
+# Formato empacotado do dataset final: rostos já redimensionados (uint8, RGB) em shards .npy
+# de tamanho fixo, mapeáveis em memória, mais um manifesto JSON com o índice dos shards.
+#
+#   <pasta>/manifest.json
+#   <pasta>/shard-00000.images.npy   (N, 224, 224, 3) uint8
+#   <pasta>/shard-00000.labels.npy   (N,) uint8
+
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+# --- CONFIGURAÇÕES ---
+SHARD_SIZE = 2048         # Imagens por shard (~300 MB a 224x224)
+IMG_HEIGHT, IMG_WIDTH = 224, 224
+DECODE_WORKERS = os.cpu_count() or 4
+DECODE_CHUNK = 512        # Imagens decodificadas por vez (limita a memória)
+# --------------------
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def load_face(path, img_height=IMG_HEIGHT, img_width=IMG_WIDTH):
+    """Lê a imagem e a converte para RGB no tamanho de entrada do modelo. Retorna None se falhar."""
+    image = cv2.imread(path)
+    if image is None:
+        return None
+    # Mesma interpolação (vizinho mais próximo) usada pelos carregadores de treino
+    image = cv2.resize(image, (img_width, img_height), interpolation=cv2.INTER_NEAREST)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+class ShardWriter:
+    """Grava imagens em shards de tamanho fixo e, ao fechar, o manifesto."""
+
+    def __init__(self, out_dir, class_names, shard_size=SHARD_SIZE, img_height=IMG_HEIGHT, img_width=IMG_WIDTH):
+        self.out_dir = out_dir
+        self.class_names = list(class_names)
+        self.shard_size = shard_size
+        self.img_height, self.img_width = img_height, img_width
+        self._images = np.empty((shard_size, img_height, img_width, 3), dtype=np.uint8)
+        self._labels = np.empty((shard_size,), dtype=np.uint8)
+        self._count = 0
+        self._shards = []
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, image_rgb, label):
+        self._images[self._count] = image_rgb
+        self._labels[self._count] = label
+        self._count += 1
+        if self._count == self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        if self._count == 0:
+            return
+        name = f"shard-{len(self._shards):05d}"
+        np.save(os.path.join(self.out_dir, f"{name}.images.npy"), self._images[:self._count])
+        np.save(os.path.join(self.out_dir, f"{name}.labels.npy"), self._labels[:self._count])
+        self._shards.append({
+            'images': f"{name}.images.npy", 'labels': f"{name}.labels.npy", 'count': self._count,
+            'label_counts': np.bincount(self._labels[:self._count], minlength=len(self.class_names)).tolist(),
+        })
+        self._count = 0
+
+    def close(self):
+        self._flush()
+        manifest = {
+            'img_height': self.img_height, 'img_width': self.img_width,
+            'class_names': self.class_names,
+            'total': sum(shard['count'] for shard in self._shards),
+            'shards': self._shards,
+        }
+        with open(os.path.join(self.out_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def write_split_shards(labeled_files, out_dir, class_names, shard_size=SHARD_SIZE, workers=DECODE_WORKERS, desc=None):
+    """Decodifica (em paralelo) e grava uma lista de (caminho, rótulo) em shards. Retorna o manifesto."""
+    writer = ShardWriter(out_dir, class_names, shard_size)
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(total=len(labeled_files), desc=desc) as pbar:
+        # Decodifica em blocos para limitar a memória; map preserva a ordem (já embaralhada) da lista
+        for start in range(0, len(labeled_files), DECODE_CHUNK):
+            chunk = labeled_files[start:start + DECODE_CHUNK]
+            for (_, label), image in zip(chunk, pool.map(lambda item: load_face(item[0]), chunk)):
+                if image is None:
+                    skipped += 1
+                else:
+                    writer.add(image, label)
+            pbar.update(len(chunk))
+    manifest = writer.close()
+    if skipped:
+        print(f"  [AVISO] {skipped} imagens ilegíveis foram ignoradas.")
+    return manifest
+
+
+def write_dataset_shards(datasets, train_dir, validation_dir, shard_size=SHARD_SIZE, seed=None):
+    """Grava o dataset balanceado ({'real': {'train': [...], 'validation': [...]}, 'fake': {...}}) em shards.
+
+    As classes seguem a ordem alfabética, como no flow_from_directory (fake=0, real=1).
+    """
+    class_names = sorted(datasets.keys())
+    rng = random.Random(seed)
+    manifests = {}
+    for split_name, out_dir in (('train', train_dir), ('validation', validation_dir)):
+        labeled_files = [
+            (path, class_names.index(label))
+            for label, splits in datasets.items() for path in splits[split_name]
+        ]
+        rng.shuffle(labeled_files)  # Mistura as classes dentro de cada shard
+        print(f"\nGravando {len(labeled_files)} imagens em shards em '{out_dir}'...")
+        manifests[split_name] = write_split_shards(
+            labeled_files, out_dir, class_names, shard_size, desc=f"Shards {split_name}"
+        )
+    return manifests
+
+
+def read_manifest(shard_dir):
+    with open(os.path.join(shard_dir, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def open_shard(shard_dir, shard):
+    """Abre um shard em modo memory-map (nada é lido até o acesso)."""
+    images = np.load(os.path.join(shard_dir, shard['images']), mmap_mode='r')
+    labels = np.load(os.path.join(shard_dir, shard['labels']), mmap_mode='r')
+    return images, labels
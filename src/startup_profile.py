@@ -0,0 +1,50 @@
+# src/startup_profile.py
+# Tempo de inicialização dos pontos de entrada: imports pesados (TensorFlow, MTCNN), carga
+# dos modelos e primeira inferência. Os frameworks são importados só quando usados
+# (timed_import), para que caminhos de erro e tarefas curtas não paguem por eles.
+
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURAÇÕES ---
+STARTUP_REPORT = True  # Imprime o relatório de inicialização de cada ponto de entrada
+# --------------------
+
+PROCESS_START = time.perf_counter()  # Os pontos de entrada importam este módulo primeiro
+_phases = []
+
+
+def record(name, seconds):
+    _phases.append((name, seconds))
+
+
+@contextmanager
+def timed(name):
+    """Mede o bloco e o registra como uma fase da inicialização."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed_import(name):
+    """Importa o módulo sob demanda, registrando o tempo só na primeira vez."""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)  # Falhas (módulo opcional ausente) não entram no relatório
+    record(f"import {name}", time.perf_counter() - start)
+    return module
+
+
+def report(entry_point):
+    """Imprime as fases registradas e o tempo desde o início do processo."""
+    if not STARTUP_REPORT or not _phases:
+        return
+    print(f"--- Inicialização de {entry_point} ---")
+    for name, seconds in _phases:
+        print(f"  {name:<40} {seconds:7.2f}s")
+    print(f"  {'desde o início do processo':<40} {time.perf_counter() - PROCESS_START:7.2f}s")
@@ -0,0 +1,102 @@
+# src/synthetic_media.py
+# Mídia sintética determinística para os benchmarks (não depende de datasets reais).
+
+import os
+
+import cv2
+import numpy as np
+
+SKIN_COLOR_BGR = (120, 160, 220)
+
+
+def face_box_for_frame(frame_idx, width, height):
+    """Posição (x, y, w, h) do rosto sintético no frame — movimento suave e determinístico."""
+    size = int(min(width, height) * 0.4)
+    cx = width // 2 + int(width * 0.15 * np.sin(frame_idx / 15.0))
+    cy = height // 2 + int(height * 0.08 * np.cos(frame_idx / 20.0))
+    return cx - size // 2, cy - size // 2, size, size
+
+
+def render_face(frame, box):
+    """Desenha um rosto simplificado (pele, sobrancelhas, olhos, nariz e boca) dentro da caixa.
+
+    Sobrancelhas e nariz fazem o MTCNN encontrar o rosto em todos os frames (só com olhos e
+    boca ele achava cerca de 1 em 5). Tudo fica dentro da elipse de pele, então a caixa do
+    ColorKeyDetector não muda.
+    """
+    x, y, w, h = box
+    center = (x + w // 2, y + h // 2)
+    cv2.ellipse(frame, center, (w // 2 - 2, h // 2 - 2), 0, 0, 360, SKIN_COLOR_BGR, -1)
+    eye_r = max(2, w // 14)
+    eye_y = y + h * 2 // 5
+    for eye_x in (x + w // 3, x + w * 2 // 3):
+        cv2.circle(frame, (eye_x, eye_y), eye_r, (40, 40, 40), -1)
+        cv2.line(frame, (eye_x - eye_r * 2, eye_y - eye_r * 2), (eye_x + eye_r * 2, eye_y - eye_r * 2 - eye_r // 2),
+                 (50, 60, 80), max(2, eye_r // 2))
+    nose_width = max(2, eye_r // 3)
+    cv2.line(frame, (center[0], eye_y + eye_r), (center[0] - eye_r, y + h * 3 // 5), (90, 120, 170), nose_width)
+    cv2.line(frame, (center[0] - eye_r, y + h * 3 // 5), (center[0] + eye_r, y + h * 3 // 5), (90, 120, 170), nose_width)
+    cv2.ellipse(frame, (center[0], y + h * 7 // 10), (w // 6, h // 14), 0, 0, 180, (60, 60, 150), -1)
+    return frame
+
+
+def synthetic_frame(frame_idx, width=640, height=480, seed=0):
+    """Gera um frame com fundo texturizado e um rosto sintético."""
+    rng = np.random.default_rng(seed + frame_idx)
+    frame = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+    return render_face(frame, face_box_for_frame(frame_idx, width, height))
+
+
+def write_synthetic_video(path, num_frames=90, width=640, height=480, fps=30, seed=0):
+    """Grava um clipe sintético em `path` e retorna o caminho."""
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for frame_idx in range(num_frames):
+        out.write(synthetic_frame(frame_idx, width, height, seed))
+    out.release()
+    return path
+
+
+def build_synthetic_face_tree(root, images_per_class, seed=0):
+    """Grava recortes de rostos sintéticos em JPEG, com tamanhos variados como os do extrator."""
+    rng = np.random.default_rng(seed)
+    for split in ('train', 'validation'):
+        for label in ('fake', 'real'):
+            folder = os.path.join(root, split, label)
+            os.makedirs(folder, exist_ok=True)
+            count = images_per_class if split == 'train' else max(1, images_per_class // 10)
+            for i in range(count):
+                frame = synthetic_frame(i, 640, 480, seed=seed + (label == 'real') * 10000)
+                x, y, w, h = face_box_for_frame(i, 640, 480)
+                size = int(rng.integers(120, 400))
+                face = cv2.resize(frame[y:y+h, x:x+w], (size, size))
+                cv2.imwrite(os.path.join(folder, f"{label}_{i:06d}.jpg"), face)
+    return os.path.join(root, 'train'), os.path.join(root, 'validation')
+
+
+class ColorKeyDetector:
+    """Detector trivial para mídia sintética: localiza a cor de pele renderizada.
+
+    Expõe a mesma interface de `mtcnn.MTCNN().detect_faces` (imagem RGB).
+    """
+
+    def detect_faces(self, img_rgb):
+        target = np.array(SKIN_COLOR_BGR[::-1])
+        mask = cv2.inRange(img_rgb, target - 8, target + 8)
+        points = cv2.findNonZero(mask)
+        if points is None:
+            return []
+        x, y, w, h = cv2.boundingRect(points)
+        return [{'box': [x, y, w, h], 'confidence': 1.0, 'keypoints': {}}]
+
+
+def build_standin_classifier(img_height=224, img_width=224, seed=0):
+    """Modelo EfficientNetB0 aleatório com a mesma entrada/saída do classificador real."""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    base = tf.keras.applications.EfficientNetB0(
+        include_top=False, weights=None, input_shape=(img_height, img_width, 3)
+    )
+    x = tf.keras.layers.GlobalAveragePooling2D(name='avg_pool_head')(base.output)
+    output = tf.keras.layers.Dense(1, activation='sigmoid', name='prediction')(x)
+    return tf.keras.Model(base.input, output)
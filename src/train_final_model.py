@@ -1,18 +1,43 @@
 
 
-import tensorflow as tf
+import startup_profile
 import os
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 import sys
+import time
+import argparse
 
 
 TRAIN_DIR = 'data/final_train'
 VALIDATION_DIR = 'data/final_validation'
+TRAIN_SHARDS_DIR = 'data/final_shards/train'           # Gerados por prepare_final_dataset.py com OUTPUT_MODE = 'shards'
+VALIDATION_SHARDS_DIR = 'data/final_shards/validation'
 BASE_MODEL_PATH = 'models/deepfake_detector_v6_ultimate.keras'
 FINAL_MODEL_SAVE_PATH = 'models/deepfake_detector_v7_final.keras' 
 IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE, EPOCHS = 224, 224, 32, 30
+INPUT_PIPELINE = 'generator' # 'generator' (ImageDataGenerator original) ou 'tfdata' (paralelo): --loader tfdata
+DATASET_FORMAT = 'folders' # 'folders' (JPEGs em pastas) ou 'shards' (.npy empacotados, apenas com tf.data)
+NUM_PARALLEL_CALLS = None # None = input_pipeline.NUM_PARALLEL_CALLS (AUTOTUNE), ou um inteiro
+TRAIN_CACHE = None        # None = sem cache, '' = memória, ou prefixo de arquivo (ex.: 'data/tfdata_cache/train')
+VALIDATION_CACHE = ''
+# Modo --head-only: backbone congelado roda uma vez (features em cache) e só a cabeça é treinada
+HEAD_EPOCHS, HEAD_BATCH_SIZE, HEAD_LEARNING_RATE = 100, 256, 1e-3
+
+parser = argparse.ArgumentParser(description="Ajuste fino do modelo final.")
+parser.add_argument('--loader', choices=['tfdata', 'generator'], default=INPUT_PIPELINE)
+parser.add_argument('--format', choices=['folders', 'shards'], default=DATASET_FORMAT)
+parser.add_argument('--head-only', action='store_true',
+                    help="Treina só a cabeça sobre features do backbone em cache (feature_store.py), sem augmentation.")
+args = parser.parse_args()
 
+if args.head_only and args.format != 'folders':
+    print("[ERRO] O modo --head-only indexa as features pelo hash de cada arquivo e só lê o formato 'folders'.")
+    sys.exit(1)
+
+if args.format == 'shards':
+    if args.loader != 'tfdata':
+        print("[ERRO] O formato 'shards' só pode ser lido pelo pipeline tf.data (--loader tfdata).")
+        sys.exit(1)
+    TRAIN_DIR, VALIDATION_DIR = TRAIN_SHARDS_DIR, VALIDATION_SHARDS_DIR
 
 
 if not os.path.isdir(TRAIN_DIR) or not os.path.isdir(VALIDATION_DIR):
@@ -20,9 +45,38 @@ if not os.path.isdir(TRAIN_DIR) or not os.path.isdir(VALIDATION_DIR):
     print("Execute o script 'prepare_final_dataset.py' primeiro.")
     sys.exit(1)
 
+if not os.path.exists(BASE_MODEL_PATH):
+    print(f"[ERRO FATAL] Modelo base não encontrado em {BASE_MODEL_PATH}.")
+    sys.exit(1)
+
+# TensorFlow só depois das verificações: os caminhos de erro acima terminam sem esperar o import
+tf = startup_profile.timed_import('tensorflow')
+input_pipeline = startup_profile.timed_import('input_pipeline')
+import numpy as np
+from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
+if NUM_PARALLEL_CALLS is None:
+    NUM_PARALLEL_CALLS = input_pipeline.NUM_PARALLEL_CALLS
+
+
+class FirstStepTimer(tf.keras.callbacks.Callback):
+    """Registra o tempo até o fim do primeiro passo de treino (traçado do grafo + primeiro lote) e imprime o relatório."""
+
+    def on_train_begin(self, logs=None):
+        self.start = time.perf_counter()
+        self.done = False
+
+    def on_train_batch_end(self, batch, logs=None):
+        if not self.done:
+            self.done = True
+            startup_profile.record("primeiro passo de treino", time.perf_counter() - self.start)
+            print()
+            startup_profile.report('train_final_model')
+
+
 print(f"--- Carregando o modelo base ({os.path.basename(BASE_MODEL_PATH)}) ---")
 try:
-    model = tf.keras.models.load_model(BASE_MODEL_PATH)
+    with startup_profile.timed("carregar modelo base"):
+        model = tf.keras.models.load_model(BASE_MODEL_PATH)
     model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=1e-5), loss='binary_crossentropy', metrics=['accuracy'])
     print("Modelo base carregado e recompilado para ajuste fino.")
 except Exception as e:
@@ -30,21 +84,71 @@ except Exception as e:
     sys.exit(1)
 
 
-train_datagen = ImageDataGenerator(
-    rotation_range=20, width_shift_range=0.2, height_shift_range=0.2,
-    shear_range=0.2, zoom_range=0.2, horizontal_flip=True, fill_mode='nearest',
-    preprocessing_function=tf.keras.applications.efficientnet.preprocess_input
-)
-validation_datagen = ImageDataGenerator(preprocessing_function=tf.keras.applications.efficientnet.preprocess_input)
+def train_head_only():
+    """Treina a cabeça sobre as features em cache e salva o modelo completo em FINAL_MODEL_SAVE_PATH.
 
-train_generator = train_datagen.flow_from_directory(
-    TRAIN_DIR, target_size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE,
-    class_mode='binary', shuffle=True
-)
-validation_generator = validation_datagen.flow_from_directory(
-    VALIDATION_DIR, target_size=(IMG_HEIGHT, IMG_WIDTH),
-    batch_size=BATCH_SIZE, class_mode='binary'
-)
+    As camadas da cabeça são as mesmas de `model`, então o .keras salvo é um modelo normal
+    para o predict_video.py. As features são das imagens originais: não há augmentation.
+    """
+    feature_store = startup_profile.timed_import('feature_store')
+    backbone, head = feature_store.split_model(model)
+    store = feature_store.FeatureStore(feature_store.FEATURE_STORE_DIR,
+                                       feature_store.backbone_identity(BASE_MODEL_PATH, backbone),
+                                       backbone.output.shape[-1])
+    data = {}
+    try:
+        for split, directory in (('train', TRAIN_DIR), ('validation', VALIDATION_DIR)):
+            paths, labels, _ = input_pipeline.list_image_files(directory)
+            start = time.perf_counter()
+            features, computed = feature_store.extract_features(store, backbone, paths)
+            print(f"Features de {split}: {len(paths)} imagens, {computed} pelo backbone "
+                  f"({len(paths) - computed} do cache) em {time.perf_counter() - start:.1f}s.")
+            data[split] = (features, np.asarray(labels, dtype=np.float32))
+    finally:
+        store.close()
+
+    head.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=HEAD_LEARNING_RATE),
+                 loss='binary_crossentropy', metrics=['accuracy'])
+    early_stopping = EarlyStopping(monitor='val_accuracy', patience=5, verbose=1, restore_best_weights=True)
+    print(f"\n--- Treinando só a cabeça por até {HEAD_EPOCHS} épocas... ---")
+    head.fit(*data['train'], batch_size=HEAD_BATCH_SIZE, epochs=HEAD_EPOCHS, shuffle=True,
+             validation_data=data['validation'], callbacks=[early_stopping, FirstStepTimer()])
+    model.save(FINAL_MODEL_SAVE_PATH)
+    print("\n--- Treinamento da cabeça concluído! Modelo completo salvo em", FINAL_MODEL_SAVE_PATH)
+
+
+if args.head_only:
+    train_head_only()
+    sys.exit(0)
+
+if args.format == 'shards':
+    train_data, train_samples, _ = input_pipeline.build_shard_dataset(
+        TRAIN_DIR, training=True, batch_size=BATCH_SIZE, num_parallel_calls=NUM_PARALLEL_CALLS
+    )
+    validation_data, validation_samples, _ = input_pipeline.build_shard_dataset(
+        VALIDATION_DIR, training=False, batch_size=BATCH_SIZE, num_parallel_calls=NUM_PARALLEL_CALLS
+    )
+    print(f"Shards: {train_samples} imagens de treino, {validation_samples} de validação.")
+    fit_steps = {}
+elif args.loader == 'tfdata':
+    train_data, train_samples, _ = input_pipeline.build_dataset(
+        TRAIN_DIR, training=True, batch_size=BATCH_SIZE, img_height=IMG_HEIGHT, img_width=IMG_WIDTH,
+        num_parallel_calls=NUM_PARALLEL_CALLS, cache=TRAIN_CACHE
+    )
+    validation_data, validation_samples, _ = input_pipeline.build_dataset(
+        VALIDATION_DIR, training=False, batch_size=BATCH_SIZE, img_height=IMG_HEIGHT, img_width=IMG_WIDTH,
+        num_parallel_calls=NUM_PARALLEL_CALLS, cache=VALIDATION_CACHE
+    )
+    print(f"Pipeline tf.data: {train_samples} imagens de treino, {validation_samples} de validação.")
+    fit_steps = {}
+else:
+    train_data, validation_data = input_pipeline.build_generator_loaders(
+        TRAIN_DIR, VALIDATION_DIR, BATCH_SIZE, IMG_HEIGHT, IMG_WIDTH
+    )
+    fit_steps = {
+        'steps_per_epoch': train_data.samples // BATCH_SIZE,
+        'validation_steps': validation_data.samples // BATCH_SIZE,
+    }
 
 
 checkpoint = ModelCheckpoint(
@@ -54,15 +158,14 @@ checkpoint = ModelCheckpoint(
 early_stopping = EarlyStopping(
     monitor='val_accuracy', patience=3, verbose=1, restore_best_weights=True
 )
-callbacks_list = [checkpoint, early_stopping]
+callbacks_list = [checkpoint, early_stopping, FirstStepTimer()]
 
 print(f"\n--- Iniciando o treinamento do Modelo V7 por até {EPOCHS} épocas... ---")
 model.fit(
-    train_generator,
-    steps_per_epoch=train_generator.samples // BATCH_SIZE,
+    train_data,
     epochs=EPOCHS,
-    validation_data=validation_generator,
-    validation_steps=validation_generator.samples // BATCH_SIZE,
-    callbacks=callbacks_list
+    validation_data=validation_data,
+    callbacks=callbacks_list,
+    **fit_steps
 )
 print("\n--- Treinamento Concluído! O modelo do V7 foi salvo em", FINAL_MODEL_SAVE_PATH)
\ No newline at end of file
@@ -2,11 +2,15 @@
 
 import cv2
 import os
-import mtcnn
 import sys
 import glob # Usaremos o glob para uma busca mais poderosa
+from itertools import chain
 from tqdm import tqdm
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count
+from detector_backends import create_detector
+from face_detector import DETECTOR_BACKEND, create_worker_pool
+from face_localization import FaceLocalizer
+from frame_sampling import FrameReader, fallback_frames, plan_sample_frames
 
 # --- CONFIGURAÇÕES ---
 # Configure para a pasta que você quer processar
@@ -16,44 +20,91 @@ INPUT_VIDEO_FOLDER = 'data/deepfake_TIMIT/lower_quality'
 # A pasta de saída continua a mesma
 OUTPUT_FACES_FOLDER = 'data/processed_dftimit/fake'
 MAX_FACES_PER_VIDEO = 5 
+REDETECT_INTERVAL = 5 # MTCNN completo a cada N frames; nos demais o rosto é rastreado (1 = desliga)
+# 'uniform': frames espalhados por todo o vídeo, lidos com seek/grab (só eles são decodificados)
+# 'scene': um frame por cena (sonda o vídeo para achar os cortes)
+# 'consecutive': frames seguidos desde o início (comportamento antigo)
+SAMPLING_MODE = 'uniform'
+FALLBACK_ROUNDS = 2  # Grades extras (2K, 4K frames) tentadas quando um frame planejado não tem rosto
+MIN_FACE_SIZE = 50
 # --------------------
 
-face_detector = None
+face_localizer = None
 
 def init_worker():
     """Inicializa o detector de rostos em cada processo."""
-    global face_detector
+    global face_localizer
     # print("Inicializando detector de rostos...") # Desativado para um log mais limpo
-    face_detector = mtcnn.MTCNN()
+    face_localizer = FaceLocalizer(create_detector(DETECTOR_BACKEND), redetect_interval=REDETECT_INTERVAL)
+
+def crop_main_face(localizer, frame):
+    """Recorte BGR do rosto principal do frame, ou None se não houver rosto grande o bastante."""
+    box = localizer.locate(frame)
+    if box is None:
+        return None
+    x, y, w, h = box
+    if w > MIN_FACE_SIZE and h > MIN_FACE_SIZE:
+        return frame[y:y+h, x:x+w]
+    return None
+
+def extract_faces(cap, localizer, max_faces=MAX_FACES_PER_VIDEO, mode=SAMPLING_MODE):
+    """Recorta até `max_faces` rostos do vídeo. Retorna ([(índice do frame, recorte BGR)], custo).
+
+    O custo conta os frames decodificados e pulados (grab) e os seeks, incluindo a sondagem
+    de cenas do modo 'scene'.
+    """
+    faces = []
+    if mode == 'consecutive':
+        cost = {'decoded': 0, 'grabbed': 0, 'seeks': 0}
+        frame_idx = 0
+        while cap.isOpened() and len(faces) < max_faces:
+            ret, frame = cap.read()
+            if not ret: break
+            cost['decoded'] += 1
+            face = crop_main_face(localizer, frame)
+            if face is not None:
+                faces.append((frame_idx, face))
+            frame_idx += 1
+        return faces, cost
+
+    planned, cost = plan_sample_frames(cap, max_faces, mode)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    reader = FrameReader(cap)
+    visited = set()
+    for frame_idx in chain(planned, fallback_frames(total_frames, max_faces, FALLBACK_ROUNDS)):
+        if len(faces) >= max_faces:
+            break
+        if frame_idx in visited:
+            continue
+        visited.add(frame_idx)
+        frame = reader.read(frame_idx)
+        if frame is None:
+            continue
+        localizer.reset()  # Frames distantes: detecção completa, sem rastreamento
+        face = crop_main_face(localizer, frame)
+        if face is not None:
+            faces.append((frame_idx, face))
+    for key, value in reader.stats.items():
+        cost[key] += value
+    return faces, cost
 
 def process_single_video(video_path):
     """Processa um único arquivo de vídeo."""
     try:
         video_name = os.path.basename(video_path)
-        if not face_detector:
+        if not face_localizer:
             return f"Detector não inicializado para {video_name}"
+        face_localizer.reset()
 
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened(): return f"Não abriu {video_name}"
 
-        frame_idx = 0
-        faces_saved = 0
-        while cap.isOpened() and faces_saved < MAX_FACES_PER_VIDEO:
-            ret, frame = cap.read()
-            if not ret: break
-            
-            detections = face_detector.detect_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            if detections:
-                main_face = max(detections, key=lambda d: d['box'][2] * d['box'][3])
-                x, y, w, h = main_face['box']
-                if w > 50 and h > 50:
-                    cropped_face = frame[y:y+h, x:x+w]
-                    video_name_no_ext = os.path.splitext(video_name)[0]
-                    face_filename = f"{video_name_no_ext}_frame{frame_idx}.jpg"
-                    save_path = os.path.join(OUTPUT_FACES_FOLDER, face_filename)
-                    cv2.imwrite(save_path, cropped_face)
-                    faces_saved += 1
-            frame_idx += 1
+        faces, _ = extract_faces(cap, face_localizer)
+        video_name_no_ext = os.path.splitext(video_name)[0]
+        for frame_idx, cropped_face in faces:
+            face_filename = f"{video_name_no_ext}_frame{frame_idx}.jpg"
+            save_path = os.path.join(OUTPUT_FACES_FOLDER, face_filename)
+            cv2.imwrite(save_path, cropped_face)
         
         cap.release()
         return None
@@ -82,7 +133,7 @@ if __name__ == '__main__':
         num_processes = cpu_count() - 1 if cpu_count() > 1 else 1
         print(f"Iniciando processamento paralelo com {num_processes} processos.")
 
-        with Pool(processes=num_processes, initializer=init_worker) as pool:
+        with create_worker_pool(num_processes, initializer=init_worker) as pool:
             results = list(tqdm(pool.imap_unordered(process_single_video, video_files), total=len(video_files)))
         
         errors = [r for r in results if r is not None]
@@ -0,0 +1,232 @@
+# src/video_pipeline.py
+# Motor em estágios para a análise de vídeo: decodificação -> detecção -> classificação -> escrita.
+# Cada estágio roda na sua própria thread (a detecção em um pool), ligados por filas limitadas.
+
+import queue
+import threading
+import time
+
+import predict_video
+
+QUEUE_SIZE = 32
+DETECTION_WORKERS = 2
+CLASSIFIER_IDLE_FLUSH_SECONDS = 0.05  # Classifica um lote incompleto se nada chegar nesse intervalo
+
+_SENTINEL = object()
+
+
+class StageStats:
+    """Tempo ocupado e itens processados por um estágio (soma de todas as threads dele)."""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.busy_seconds = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, items=1):
+        with self._lock:
+            self.busy_seconds += seconds
+            self.items += items
+
+    def report(self, wall_seconds):
+        utilization = self.busy_seconds / (wall_seconds * self.workers) if wall_seconds > 0 else 0.0
+        return {'busy_seconds': self.busy_seconds, 'items': self.items,
+                'workers': self.workers, 'utilization': utilization}
+
+
+class VideoPipeline:
+    """Executa a análise de um vídeo com os estágios em paralelo.
+
+    Mantém a ordem dos frames na saída e produz os mesmos votos do caminho serial
+    (`predict_video.analyze_video`). `localizer_factory` é chamado uma vez por
+    thread de detecção, pois o MTCNN não deve ser compartilhado entre threads.
+    Com rastreamento ligado (`redetect_interval > 1`) os frames precisam chegar em
+    ordem ao localizador, então o estágio de detecção usa uma única thread.
+    """
+
+    def __init__(self, localizer_factory, classifier_model, num_detection_workers=DETECTION_WORKERS,
+                 batch_size=predict_video.BATCH_SIZE, frame_interval=predict_video.FRAME_INTERVAL,
+                 queue_size=QUEUE_SIZE, top_k=predict_video.XAI_TOP_K):
+        self.localizer_factory = localizer_factory
+        self.classifier_model = classifier_model
+        self.num_detection_workers = max(1, num_detection_workers)
+        self.batch_size = batch_size
+        self.frame_interval = frame_interval
+        self.queue_size = queue_size
+        self.top_k = top_k
+
+    def run(self, cap, out, pbar=None):
+        localizers = [self.localizer_factory()]
+        if localizers[0].redetect_interval > 1:
+            self.num_detection_workers = 1
+        localizers += [self.localizer_factory() for _ in range(self.num_detection_workers - 1)]
+
+        self._stop = threading.Event()
+        self._errors = []
+        self._decode_q = queue.Queue(maxsize=self.queue_size)
+        self._classify_q = queue.Queue(maxsize=self.queue_size)
+        self._write_q = queue.Queue(maxsize=self.queue_size)
+        self._stats = {
+            'decode': StageStats('decode'),
+            'detect': StageStats('detect', self.num_detection_workers),
+            'classify': StageStats('classify'),
+            'write': StageStats('write'),
+        }
+        self._result = {'frames': 0, 'faces_classified': 0, 'real_votes': 0, 'fake_votes': 0}
+        self._suspicious = predict_video.SuspiciousFrames(self.top_k)
+
+        threads = [threading.Thread(target=self._guard, args=(self._decode, cap), name='decode')]
+        threads += [threading.Thread(target=self._guard, args=(self._detect, localizer), name=f'detect-{i}')
+                    for i, localizer in enumerate(localizers)]
+        threads.append(threading.Thread(target=self._guard, args=(self._classify,), name='classify'))
+        threads.append(threading.Thread(target=self._guard, args=(self._write, out, pbar), name='write'))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+        self._result['suspicious_frames'] = self._suspicious.frames()
+        self._result['wall_seconds'] = wall_seconds
+        self._result['stages'] = {name: stats.report(wall_seconds) for name, stats in self._stats.items()}
+        self._result['localization'] = {
+            key: sum(localizer.stats[key] for localizer in localizers) for key in localizers[0].stats
+        }
+        return self._result
+
+    # --- Utilidades de fila que respeitam o sinal de parada ---
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self._stop.is_set():
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.perf_counter())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return q.get(timeout=wait)
+            except queue.Empty:
+                continue
+        raise queue.Empty
+
+    # --- Estágios ---
+
+    def _decode(self, cap):
+        frame_idx = 0
+        try:
+            while cap.isOpened():
+                t0 = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self._stats['decode'].add(time.perf_counter() - t0)
+                if not self._put(self._decode_q, (frame_idx, frame)):
+                    return
+                frame_idx += 1
+        finally:
+            for _ in range(self.num_detection_workers):
+                self._put(self._decode_q, _SENTINEL)
+
+    def _detect(self, face_localizer):
+        try:
+            while True:
+                item = self._get(self._decode_q)
+                if item is _SENTINEL:
+                    break
+                frame_idx, frame = item
+                box, face = None, None
+                t0 = time.perf_counter()
+                if frame_idx % self.frame_interval == 0:
+                    box = face_localizer.locate(frame)
+                    if box is not None:
+                        face = predict_video.prepare_face(frame, box)
+                    self._stats['detect'].add(time.perf_counter() - t0)
+                if not self._put(self._classify_q, (frame_idx, frame, box, face)):
+                    return
+        finally:
+            self._put(self._classify_q, _SENTINEL)
+
+    def _classify(self):
+        finished_workers = 0
+        pending = []
+        try:
+            while finished_workers < self.num_detection_workers:
+                try:
+                    timeout = CLASSIFIER_IDLE_FLUSH_SECONDS if pending else None
+                    item = self._get(self._classify_q, timeout=timeout)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return
+                    self._flush(pending)
+                    continue
+                if item is _SENTINEL:
+                    finished_workers += 1
+                    continue
+                frame_idx, frame, box, face = item
+                if face is None:
+                    if not self._put(self._write_q, (frame_idx, frame, None, None)):
+                        return
+                    continue
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    self._flush(pending)
+            self._flush(pending)
+        finally:
+            self._put(self._write_q, _SENTINEL)
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        t0 = time.perf_counter()
+        predictions = predict_video.classify_faces(self.classifier_model, [item[3] for item in pending])
+        self._stats['classify'].add(time.perf_counter() - t0, len(pending))
+        self._result['faces_classified'] += len(pending)
+        for (frame_idx, frame, box, _), prediction in zip(pending, predictions):
+            self._put(self._write_q, (frame_idx, frame, box, prediction))
+        pending.clear()
+
+    def _write(self, out, pbar):
+        reorder_buffer = {}
+        next_idx = 0
+        while True:
+            item = self._get(self._write_q)
+            if item is _SENTINEL:
+                break
+            reorder_buffer[item[0]] = item
+            while next_idx in reorder_buffer:
+                _, frame, box, prediction = reorder_buffer.pop(next_idx)
+                t0 = time.perf_counter()
+                if box is not None:
+                    self._suspicious.add(next_idx, box, prediction)
+                    if predict_video.annotate_frame(frame, box, prediction):
+                        self._result['real_votes'] += 1
+                    else:
+                        self._result['fake_votes'] += 1
+                if out is not None:
+                    out.write(frame)
+                self._stats['write'].add(time.perf_counter() - t0)
+                self._result['frames'] += 1
+                next_idx += 1
+                if pbar is not None:
+                    pbar.update(1)
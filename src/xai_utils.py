@@ -3,26 +3,76 @@ import tensorflow as tf
 import numpy as np
 import cv2
 
+_MAX_RESIZE_CHANNELS = 512  # Limite de canais do cv2.resize
+
+
+class GradCAMEngine:
+    """Grad-CAM em lote: o modelo de gradiente é montado e compilado (tf.function) uma única vez."""
+
+    def __init__(self, model, last_conv_layer_name='top_conv'):
+        self.grad_model = tf.keras.models.Model(
+            model.inputs, [model.get_layer(last_conv_layer_name).output, model.output]
+        )
+        self._compute = tf.function(
+            self._heatmaps, input_signature=[tf.TensorSpec(model.inputs[0].shape, tf.float32)]
+        )
+
+    def _heatmaps(self, images):
+        with tf.GradientTape() as tape:
+            last_conv_layer_output, preds = self.grad_model(images, training=False)
+            # As imagens do lote são independentes: o gradiente da soma dá o de cada uma
+            class_output = tf.reduce_sum(preds[:, 0])
+        grads = tape.gradient(class_output, last_conv_layer_output)
+        pooled_grads = tf.reduce_mean(grads, axis=(1, 2))
+        heatmaps = tf.einsum('bhwc,bc->bhw', last_conv_layer_output, pooled_grads)
+        max_val = tf.reduce_max(heatmaps, axis=(1, 2), keepdims=True)
+        # Mesmo comportamento da versão por imagem: sem normalização quando o máximo não é positivo
+        return tf.where(max_val > 0, tf.maximum(heatmaps, 0) / tf.where(max_val > 0, max_val, 1), heatmaps)
+
+    def heatmaps(self, img_batch_preprocessed):
+        """Mapas de calor (N, h, w) de um lote já pré-processado (N, H, W, 3)."""
+        return self._compute(tf.convert_to_tensor(img_batch_preprocessed, tf.float32)).numpy()
+
+
+def get_gradcam_engine(model, last_conv_layer_name='top_conv'):
+    """Retorna o GradCAMEngine do par (modelo, camada), criado uma única vez.
+
+    Os engines ficam num atributo do próprio modelo: são liberados junto com ele e nunca
+    são entregues a outro modelo que reaproveite o mesmo id().
+    """
+    engines = getattr(model, '_gradcam_engines', None)
+    if engines is None:
+        engines = {}
+        object.__setattr__(model, '_gradcam_engines', engines)  # Fora do rastreamento de camadas do Keras
+    if last_conv_layer_name not in engines:
+        engines[last_conv_layer_name] = GradCAMEngine(model, last_conv_layer_name)
+    return engines[last_conv_layer_name]
+
+
 def generate_gradcam_heatmap(img_array_preprocessed, model, last_conv_layer_name='top_conv'):
-    grad_model = tf.keras.models.Model(
-        [model.inputs], [model.get_layer(last_conv_layer_name).output, model.output]
-    )
-    with tf.GradientTape() as tape:
-        last_conv_layer_output, preds = grad_model(img_array_preprocessed)
-        class_output = preds[0]
-    grads = tape.gradient(class_output, last_conv_layer_output)
-    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-    last_conv_layer_output = last_conv_layer_output[0]
-    heatmap = last_conv_layer_output @ pooled_grads[..., tf.newaxis]
-    heatmap = tf.squeeze(heatmap)
-    max_val = tf.math.reduce_max(heatmap)
-    if max_val > 0:
-        heatmap = tf.maximum(heatmap, 0) / max_val
-    return heatmap.numpy()
+    return get_gradcam_engine(model, last_conv_layer_name).heatmaps(img_array_preprocessed)[0]
 
 def overlay_heatmap_on_image(original_image_cv, heatmap, alpha=0.5, colormap=cv2.COLORMAP_JET):
     heatmap_resized = cv2.resize(heatmap, (original_image_cv.shape[1], original_image_cv.shape[0]))
     heatmap_uint8 = np.uint8(255 * heatmap_resized)
     heatmap_colored = cv2.applyColorMap(heatmap_uint8, colormap)
     overlaid_image = cv2.addWeighted(original_image_cv, alpha, heatmap_colored, 1 - alpha, 0)
-    return overlaid_image
\ No newline at end of file
+    return overlaid_image
+
+def overlay_heatmaps_on_images(original_images_cv, heatmaps, alpha=0.5, colormap=cv2.COLORMAP_JET):
+    """Versão em lote de overlay_heatmap_on_image para imagens BGR do mesmo tamanho (N, H, W, 3).
+
+    Os mapas são redimensionados numa única chamada (um canal por mapa) e o lote inteiro é
+    colorido e misturado como uma só imagem (N*H, W), com o mesmo resultado da versão por imagem.
+    """
+    original_images_cv = np.ascontiguousarray(original_images_cv)
+    heatmaps = np.asarray(heatmaps, dtype=np.float32)
+    count, height, width = original_images_cv.shape[:3]
+    resized = np.empty((count, height, width), dtype=np.float32)
+    for start in range(0, count, _MAX_RESIZE_CHANNELS):
+        block = heatmaps[start:start + _MAX_RESIZE_CHANNELS]
+        block = cv2.resize(np.ascontiguousarray(block.transpose(1, 2, 0)), (width, height))
+        resized[start:start + _MAX_RESIZE_CHANNELS] = block.reshape(height, width, -1).transpose(2, 0, 1)
+    heatmaps_colored = cv2.applyColorMap(np.uint8(255 * resized).reshape(count * height, width), colormap)
+    overlaid = cv2.addWeighted(original_images_cv.reshape(count * height, width, 3), alpha, heatmaps_colored, 1 - alpha, 0)
+    return overlaid.reshape(count, height, width, 3)
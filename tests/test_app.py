@@ -0,0 +1,135 @@
+# tests/test_app.py
+# Endpoints do app Flask com o cliente de teste: classificador pequeno aleatório e o detector
+# de cor da mídia sintética, sem o modelo .keras real nem o MTCNN.
+# Uso: python -m pytest -q tests
+
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import app as app_module  # noqa: E402
+import predict_video  # noqa: E402
+from synthetic_media import ColorKeyDetector, synthetic_frame, write_synthetic_video  # noqa: E402
+
+
+def tiny_classifier():
+    """Classificador aleatório com a entrada do real e uma camada 'top_conv' para o Grad-CAM."""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.Input((predict_video.IMG_HEIGHT, predict_video.IMG_WIDTH, 3))
+    x = tf.keras.layers.Conv2D(4, 3, strides=8, activation='relu', name='top_conv')(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    return tf.keras.Model(inputs, tf.keras.layers.Dense(1, activation='sigmoid')(x))
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    app_module.UPLOAD_FOLDER = str(tmp_path_factory.mktemp('uploads'))
+    service = app_module.DetectionService(tiny_classifier(), detector_factory=ColorKeyDetector,
+                                          model_name='teste.keras')
+    service.warm_up()
+    return app_module.create_app(service).test_client()
+
+
+def jpeg_bytes(image_bgr):
+    ok, buffer = cv2.imencode('.jpg', image_bgr)
+    assert ok
+    return buffer.tobytes()
+
+
+def wait_for_job(client, job_id, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = client.get(f'/results/{job_id}')
+        assert response.status_code == 200
+        if response.get_json()['status'] in ('complete', 'error'):
+            return response.get_json()
+        time.sleep(0.2)
+    pytest.fail(f"O trabalho {job_id} não terminou em {timeout}s")
+
+
+def test_predict_image(client):
+    response = client.post('/predict', data=_files({'file': (jpeg_bytes(synthetic_frame(0)), 'rosto.jpg')}),
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['verdict'] in ('REAL', 'FAKE')
+    assert 0.0 <= body['real_score'] <= 1.0
+    assert body['heatmap_b64'] and body['overlaid_b64']
+
+
+def test_predict_image_without_face(client):
+    blank = np.zeros((240, 320, 3), dtype=np.uint8)
+    response = client.post('/predict', data=_files({'file': (jpeg_bytes(blank), 'vazio.jpg')}),
+                           content_type='multipart/form-data')
+    assert response.status_code == 422
+
+
+def test_predict_image_errors(client):
+    assert client.post('/predict', data={}, content_type='multipart/form-data').status_code == 400
+    response = client.post('/predict', data=_files({'file': (b'nao e imagem', 'x.jpg')}),
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+def test_predict_video_job(client, tmp_path):
+    video_path = write_synthetic_video(str(tmp_path / 'clip.mp4'), num_frames=30)
+    with open(video_path, 'rb') as f:
+        response = client.post('/predict_video', data=_files({'file': (f.read(), 'clip.mp4')}),
+                               content_type='multipart/form-data')
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()['job_id'])
+    assert job['status'] == 'complete', job
+    result = job['result']
+    assert result['verdict'] in ('REAL', 'FAKE')
+    assert result['frames_analyzed'] > 0
+    assert result['xai_frames']
+    assert not os.listdir(app_module.UPLOAD_FOLDER)  # O upload é apagado ao fim do trabalho
+
+
+def test_predict_video_invalid_file(client):
+    response = client.post('/predict_video', data=_files({'file': (b'nao e video', 'x.mp4')}),
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()['job_id'])
+    assert job['status'] == 'error'
+    assert job['result']['error']
+
+
+def test_unknown_job(client):
+    assert client.get('/results/nao-existe').status_code == 404
+
+
+def test_status(client):
+    body = client.get('/status').get_json()
+    assert body['model_name'] == 'teste.keras'
+    assert body['inference_backend'] == 'keras'
+    assert 'predict' in body['latency']
+
+
+def _files(data):
+    """Converte {'campo': (bytes, nome)} para o formato de arquivos do cliente de teste."""
+    return {name: (io.BytesIO(content), filename) for name, (content, filename) in data.items()}
+
+
+def test_job_store_keeps_unfinished_jobs():
+    store = app_module.JobStore(max_jobs=2)
+    running = store.create()
+    store.update(running, 'processing')
+    done = store.create()
+    store.update(done, 'complete', {'verdict': 'REAL'})
+    newest = store.create()  # Excesso: só o trabalho terminado pode sair
+    assert store.get(running) is not None and store.get(newest) is not None
+    assert store.get(done) is None
+    extra = store.create()  # Nenhum terminado: o limite é excedido até algum terminar
+    assert all(store.get(job_id) is not None for job_id in (running, newest, extra))
+    store.update(running, 'complete', {})
+    assert store.get(running) is None